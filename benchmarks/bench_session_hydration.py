@@ -0,0 +1,63 @@
+"""Row-hydration throughput: validated SessionRecord.from_row vs from_trusted_row.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session_hydration --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from src.db.database import DatabaseManager
+from src.models.session import SessionRecord
+
+
+def build_db(path, rows):
+    db = DatabaseManager(db_path=path)
+    db.migrate()
+    db.add_subject("Bench")
+    db.add_sessions(
+        (
+            SessionRecord(
+                subject_id=1,
+                date=f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+                start_time=f"{random.randint(6, 22):02d}:{random.choice([0, 30]):02d}",
+                duration_minutes=random.choice([30, 45, 60, 90]),
+                focus_level=random.randint(1, 5),
+                test_score=random.randint(50, 100),
+            )
+            for _ in range(rows)
+        ),
+        chunk_size=50000,
+    )
+    return db
+
+
+def hydrate(db, factory):
+    with db.connection() as conn:
+        rows = conn.execute("SELECT * FROM learning_sessions").fetchall()
+    start = time.perf_counter()
+    records = [factory(row) for row in rows]
+    elapsed = time.perf_counter() - start
+    return len(records), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = build_db(os.path.join(tmp, "bench.sqlite"), args.rows)
+        for label, factory in (
+            ("from_row (validated)", SessionRecord.from_row),
+            ("from_trusted_row", SessionRecord.from_trusted_row),
+        ):
+            n, elapsed = hydrate(db, factory)
+            print(f"{label:22s}: {n} rows in {elapsed:.2f}s ({n / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Longest-streak timing: the previous set/sort/loop version vs src.analytics.streaks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_streaks --rows 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.analytics import streaks
+
+
+def legacy_longest_streak(df):
+    dates = sorted(set(pd.to_datetime(df["date"]).dt.date))
+    if not dates:
+        return 0
+    streak = max_streak = 1
+    for i in range(1, len(dates)):
+        if (dates[i] - dates[i - 1]).days == 1:
+            streak += 1
+        else:
+            if streak > max_streak:
+                max_streak = streak
+            streak = 1
+    return max(max_streak, streak)
+
+
+def build_frame(rows, years=5, seed=0):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64("2021-01-01T00:00:00", "s")
+    offsets = rng.integers(0, years * 365 * 86400, size=rows)
+    ts = pd.Series(start + offsets.astype("timedelta64[s]"), name="start_timestamp")
+    return pd.DataFrame({"start_timestamp": ts, "date": ts.dt.date})
+
+
+def timed(fn, df):
+    start = time.perf_counter()
+    result = fn(df)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    df = build_frame(args.rows)
+    old, old_s = timed(legacy_longest_streak, df)
+    new, new_s = timed(streaks.longest_streak, df)
+    assert old == new, (old, new)
+    print(f"rows: {args.rows}, longest streak: {new} days")
+    print(f"legacy loop : {old_s:.2f}s")
+    print(f"vectorized  : {new_s:.3f}s ({old_s / new_s:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
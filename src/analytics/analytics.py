@@ -1,27 +1,185 @@
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+from src.analytics import streaks
 from src.db.database import DatabaseManager
 
+# Columns df_from_db can project, mapped to their SELECT expressions.
+DF_COLUMNS = {
+    "session_id": "ls.id AS session_id",
+    "learner_id": "ls.learner_id",
+    "subject_id": "s.id AS subject_id",
+    "subject_name": "s.name AS subject_name",
+    "start_timestamp": "ls.start_timestamp",
+    "duration_minutes": "ls.duration_minutes",
+    "focus_level": "ls.focus_level",
+    "test_score": "ls.test_score",
+    "notes": "ls.notes",
+}
+
+
+def _sql_timestamp(ts):
+    return ts.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def session_filter(since=None, until=None, subject_ids=None, learner_ids=None):
+    """WHERE clause and parameters over ``learning_sessions ls``.
+
+    ``since`` is inclusive; ``until`` given as a plain date includes that
+    whole day. Both accept anything ``pd.Timestamp`` parses.
+    """
+    clauses, params = [], []
+    if since is not None:
+        clauses.append("ls.start_timestamp >= ?")
+        params.append(_sql_timestamp(pd.Timestamp(since)))
+    if until is not None:
+        bound = pd.Timestamp(until)
+        if bound == bound.normalize():
+            clauses.append("ls.start_timestamp < ?")
+            params.append(_sql_timestamp(bound + pd.Timedelta(days=1)))
+        else:
+            clauses.append("ls.start_timestamp <= ?")
+            params.append(_sql_timestamp(bound))
+    if subject_ids is not None:
+        subject_ids = list(subject_ids)
+        clauses.append(f"ls.subject_id IN ({', '.join('?' * len(subject_ids))})")
+        params.extend(subject_ids)
+    if learner_ids is not None:
+        learner_ids = list(learner_ids)
+        clauses.append(f"ls.learner_id IN ({', '.join('?' * len(learner_ids))})")
+        params.extend(learner_ids)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+# (db path, filters, columns) -> (data_identity, frame) for df_from_db(cache=True).
+_FRAME_CACHE = {}
+
+# Added by _load_frame to non-empty frames that have start_timestamp.
+DERIVED_COLUMNS = ("date", "week_start")
+
+
+def clear_frame_cache():
+    _FRAME_CACHE.clear()
+
+
+def _disk_cache_prefix(db, identity):
+    db_id, version = identity
+    return f"{Path(db.db_path).name}.frame-{db_id}-{version}-"
+
+
+def _disk_cache_path(db, identity, columns):
+    """Parquet file next to the database, named after ``data_identity()``
+    and a hash of the selected columns.
+
+    ``None`` for in-memory databases or when no Parquet engine is installed;
+    the frame is then only cached in process.
+    """
+    if db.db_path == ":memory:":
+        return None
+    try:
+        pd.io.parquet.get_engine("auto")
+    except ImportError:
+        return None
+    digest = hashlib.sha1(",".join(columns).encode()).hexdigest()[:12]
+    return Path(db.db_path).with_name(f"{_disk_cache_prefix(db, identity)}{digest}.parquet")
+
+
+def _write_disk_cache(db, identity, path, df):
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    # Frames of older versions, or of a database previously at this path;
+    # other column selections of the current version are kept.
+    current = _disk_cache_prefix(db, identity)
+    for stale in path.parent.glob(f"{Path(db.db_path).name}.frame-*.parquet"):
+        if not stale.name.startswith(current):
+            stale.unlink(missing_ok=True)
 
-def df_from_db(db_path=None):
-    db = DatabaseManager(db_path=db_path)
-    conn = db._connect()
+
+def _cached_frame(db, since, until, subject_ids, learner_ids, columns):
     try:
-        query = """
-        SELECT ls.id AS session_id, s.id AS subject_id, s.name AS subject_name,
-               ls.start_timestamp, ls.duration_minutes, ls.focus_level, ls.test_score, ls.notes
+        identity = db.data_identity()
+    except sqlite3.OperationalError:
+        # Databases that predate the change counter cannot be cached safely.
+        return _load_frame(db, since, until, subject_ids, learner_ids, columns)
+    key = (
+        os.path.abspath(db.db_path),
+        None if since is None else str(since),
+        None if until is None else str(until),
+        None if subject_ids is None else tuple(subject_ids),
+        None if learner_ids is None else tuple(learner_ids),
+        tuple(columns),
+    )
+    hit = _FRAME_CACHE.get(key)
+    if hit is not None and hit[0] == identity:
+        return hit[1].copy()
+
+    # Only the unfiltered frame is written to disk, next to the database.
+    unfiltered = key[1:5] == (None, None, None, None) and identity[0] is not None
+    disk_path = _disk_cache_path(db, identity, columns) if unfiltered else None
+    df = None
+    if disk_path is not None and disk_path.exists():
+        try:
+            df = pd.read_parquet(disk_path)
+            expected = key[5]
+            if "start_timestamp" in expected and len(df):
+                expected += DERIVED_COLUMNS
+            if tuple(df.columns) != expected:
+                df = None
+        except Exception:
+            df = None
+    if df is None:
+        df = _load_frame(db, since, until, subject_ids, learner_ids, columns)
+        if disk_path is not None:
+            _write_disk_cache(db, identity, disk_path, df)
+    _FRAME_CACHE[key] = (identity, df)
+    return df.copy()
+
+
+def df_from_db(
+    db_path=None, db=None, since=None, until=None, subject_ids=None, columns=None, cache=False, learner_ids=None
+):
+    """Session frame joined with subject names.
+
+    With ``cache=True`` the frame is reused, in process and from a Parquet
+    file next to the database, for as long as
+    ``DatabaseManager.data_identity()`` is unchanged.
+    """
+    if db is None:
+        db = DatabaseManager(db_path=db_path)
+    if columns is None:
+        columns = list(DF_COLUMNS)
+    unknown = [c for c in columns if c not in DF_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown columns {unknown}, expected some of {list(DF_COLUMNS)}")
+    if cache:
+        return _cached_frame(db, since, until, subject_ids, learner_ids, columns)
+    return _load_frame(db, since, until, subject_ids, learner_ids, columns)
+
+
+def _load_frame(db, since, until, subject_ids, learner_ids, columns):
+    where, params = session_filter(since, until, subject_ids, learner_ids)
+    with db.connection() as conn:
+        query = f"""
+        SELECT {", ".join(DF_COLUMNS[c] for c in columns)}
         FROM learning_sessions ls
         JOIN subjects s ON ls.subject_id = s.id
+        {where}
         """
-        df = pd.read_sql_query(query, conn, parse_dates=["start_timestamp"]) 
-        if df.empty:
+        parse_dates = ["start_timestamp"] if "start_timestamp" in columns else None
+        df = pd.read_sql_query(query, conn, params=params, parse_dates=parse_dates)
+        if df.empty or parse_dates is None:
             return df
         df["date"] = df["start_timestamp"].dt.date
         df["week_start"] = (
             df["start_timestamp"] - pd.to_timedelta(df["start_timestamp"].dt.weekday, unit="d")
         ).dt.normalize()
         return df
-    finally:
-        conn.close()
 
 
 def compute_overall_summary(df):
@@ -60,18 +218,7 @@ def top_subjects(df, n=5):
 
 
 def longest_streak(df):
-    dates = sorted(set(pd.to_datetime(df["date"]).dt.date))
-    if not dates:
-        return 0
-    streak = max_streak = 1
-    for i in range(1, len(dates)):
-        if (dates[i] - dates[i - 1]).days == 1:
-            streak += 1
-        else:
-            if streak > max_streak:
-                max_streak = streak
-            streak = 1
-    return max(max_streak, streak)
+    return streaks.longest_streak(df)
 
 
 def rolling_minutes(df, window_days=7):
@@ -149,7 +296,45 @@ def weakest_subject(df):
 def focus_trend(df):
     if df.empty:
         return pd.Series(dtype="float")
-    return df.set_index("start_timestamp").resample("M")["focus_level"].mean()
+    return df.set_index("start_timestamp").resample(pd.offsets.MonthEnd())["focus_level"].mean()
+
+
+def compute_insights(df):
+    """compute_overall_summary plus best_hour, weakest_subject,
+    most_productive_subject and productivity_index from one per-subject
+    groupby, instead of one scan of ``df`` per metric."""
+    weighted = df["focus_level"] * df["duration_minutes"]
+    per_subject = weighted.groupby(df["subject_name"]).agg(["size", "sum"])
+    scores = df["test_score"].groupby(df["subject_name"]).mean() if "test_score" in df else pd.Series(dtype="float")
+    scored = df["test_score"].dropna() if "test_score" in df else pd.Series(dtype="float")
+
+    sessions_per_subject = per_subject["size"].sort_values(ascending=False)
+    sessions_per_subject.name = None
+    total_sessions = len(df)
+    best = None
+    if total_sessions > 0:
+        # argmax picks the earliest hour among ties, like Series.mode()[0].
+        best = int(np.bincount(df["start_timestamp"].dt.hour.to_numpy(), minlength=24).argmax())
+    return {
+        "total_sessions": total_sessions,
+        "total_minutes": int(df["duration_minutes"].sum()) if total_sessions > 0 else 0,
+        "avg_focus": float(df["focus_level"].mean()) if total_sessions > 0 else None,
+        "avg_score": float(scored.mean()) if not scored.empty else None,
+        "sessions_per_subject": sessions_per_subject,
+        "best_hour": best,
+        "weakest_subject": scores.idxmin() if scores.notna().any() else None,
+        "most_productive_subject": per_subject["sum"].idxmax() if not per_subject.empty else None,
+        "productivity_index": weighted.mean(),
+    }
+
+
+def insights_json(insights):
+    """compute_insights result with plain Python values, ready for json.dumps."""
+    out = dict(insights)
+    out["sessions_per_subject"] = {k: int(v) for k, v in insights["sessions_per_subject"].items()}
+    pidx = insights["productivity_index"]
+    out["productivity_index"] = None if pd.isna(pidx) else float(pidx)
+    return out
 
 
 def most_productive_subject(df):
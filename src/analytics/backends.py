@@ -0,0 +1,225 @@
+"""Pluggable analytics backends.
+
+``get_backend()`` returns the backend named by its argument or by the
+``ANALYTICS_BACKEND`` environment variable ("pandas" by default). Every
+backend loads sessions into its own frame type with ``load()`` and returns
+the same pandas structures as the functions in ``src.analytics.analytics``,
+so callers can switch backends without changing how they read the results.
+
+The "polars" backend needs the optional ``polars`` package
+(``pip install .[polars]``). It reads query results with
+``pl.read_database`` and runs its group-bys and window functions
+multi-threaded on columnar data.
+
+The CLI uses ``get_backend()`` where it loads a frame for a computation
+that both backends provide: ``analytics-streak`` with filters. Unfiltered
+streaks come from the trigger-maintained tables in ``incremental``.
+"""
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+from src.analytics import analytics, streaks
+
+
+class PandasBackend:
+    name = "pandas"
+
+    def load(self, db, since=None, until=None, subject_ids=None, learner_ids=None, columns=None):
+        return analytics.df_from_db(
+            db=db, since=since, until=until, subject_ids=subject_ids, learner_ids=learner_ids, columns=columns
+        )
+
+    def compute_overall_summary(self, frame):
+        return analytics.compute_overall_summary(frame)
+
+    def subject_stats(self, frame):
+        return analytics.subject_stats(frame)
+
+    def top_subjects(self, frame, n=5):
+        return analytics.top_subjects(frame, n=n)
+
+    def weekly_minutes(self, frame):
+        return analytics.weekly_minutes(frame)
+
+    def rolling_minutes(self, frame, window_days=7):
+        return analytics.rolling_minutes(frame, window_days=window_days)
+
+    def focus_trend(self, frame):
+        return analytics.focus_trend(frame)
+
+    def longest_streak(self, frame):
+        return streaks.longest_streak(frame)
+
+    def current_streak(self, frame, today=None):
+        return streaks.current_streak(frame, today=today)
+
+
+class PolarsBackend:
+    name = "polars"
+
+    def __init__(self):
+        try:
+            import polars
+        except ImportError as e:
+            raise ImportError("The polars analytics backend needs the 'polars' package: pip install polars") from e
+        self.pl = polars
+
+    def load(self, db, since=None, until=None, subject_ids=None, learner_ids=None, columns=None):
+        pl = self.pl
+        columns = list(analytics.DF_COLUMNS) if columns is None else columns
+        where, params = analytics.session_filter(since, until, subject_ids, learner_ids)
+        query = f"""
+        SELECT {", ".join(analytics.DF_COLUMNS[c] for c in columns)}
+        FROM learning_sessions ls
+        JOIN subjects s ON ls.subject_id = s.id
+        {where}
+        """
+        with db.connection() as conn:
+            frame = pl.read_database(
+                query, conn, execute_options={"parameters": params},
+                schema_overrides={c: t for c, t in self._schema().items() if c in columns},
+            )
+        if "start_timestamp" in columns:
+            frame = frame.with_columns(pl.col("start_timestamp").str.to_datetime("%Y-%m-%d %H:%M:%S"))
+        return frame
+
+    def _schema(self):
+        pl = self.pl
+        return {
+            "session_id": pl.Int64,
+            "learner_id": pl.Int64,
+            "subject_id": pl.Int64,
+            "subject_name": pl.String,
+            "start_timestamp": pl.String,
+            "duration_minutes": pl.Int64,
+            "focus_level": pl.Int64,
+            "test_score": pl.Int64,
+            "notes": pl.String,
+        }
+
+    def _per_subject(self, frame):
+        pl = self.pl
+        return (
+            frame.group_by("subject_name")
+            .agg(
+                pl.len().cast(pl.Int64).alias("sessions"),
+                pl.col("duration_minutes").sum().alias("total_minutes"),
+                pl.col("focus_level").mean().cast(pl.Float64).alias("avg_focus"),
+                pl.col("test_score").mean().cast(pl.Float64).alias("avg_score"),
+            )
+            .sort("subject_name")
+        )
+
+    def compute_overall_summary(self, frame):
+        total_sessions = frame.height
+        per_subject = self._per_subject(frame).sort(
+            ["sessions", "subject_name"], descending=[True, False]
+        )
+        sessions_per_subject = pd.Series(
+            per_subject["sessions"].to_list(),
+            index=pd.Index(per_subject["subject_name"].to_list(), name="subject_name"),
+            dtype="int64",
+        )
+        scores = frame["test_score"].drop_nulls()
+        return {
+            "total_sessions": total_sessions,
+            "total_minutes": int(frame["duration_minutes"].sum()) if total_sessions > 0 else 0,
+            "avg_focus": float(frame["focus_level"].mean()) if total_sessions > 0 else None,
+            "avg_score": float(scores.mean()) if scores.len() > 0 else None,
+            "sessions_per_subject": sessions_per_subject,
+        }
+
+    def subject_stats(self, frame):
+        # Built from plain columns so the result does not require pyarrow.
+        stats = pd.DataFrame(self._per_subject(frame).to_dict(as_series=False))
+        return stats.set_index("subject_name")
+
+    def top_subjects(self, frame, n=5):
+        pl = self.pl
+        top = (
+            frame.group_by("subject_name")
+            .agg(pl.col("duration_minutes").sum())
+            .sort(["duration_minutes", "subject_name"], descending=[True, False])
+            .head(n)
+        )
+        return pd.Series(
+            top["duration_minutes"].to_list(),
+            index=pd.Index(top["subject_name"].to_list(), name="subject_name"),
+            name="duration_minutes",
+            dtype="int64",
+        )
+
+    def _bucketed(self, frame, every, value, how):
+        pl = self.pl
+        agg = pl.col(value).sum() if how == "sum" else pl.col(value).mean()
+        out = (
+            frame.group_by(pl.col("start_timestamp").dt.truncate(every).alias("bucket"))
+            .agg(agg)
+            .sort("bucket")
+        )
+        return pd.Series(
+            out[value].to_list(),
+            index=pd.DatetimeIndex(out["bucket"].to_list(), name="start_timestamp"),
+            name=value,
+        )
+
+    # Buckets are computed in polars; only the one-row-per-period result is
+    # reindexed in pandas to get the same labels and gap filling as resample().
+    def weekly_minutes(self, frame):
+        if frame.height == 0:
+            return pd.Series(dtype="int")
+        s = self._bucketed(frame, "1w", "duration_minutes", "sum")
+        s.index = s.index + pd.Timedelta(days=6)
+        return s.resample("W").sum()
+
+    def rolling_minutes(self, frame, window_days=7):
+        if frame.height == 0:
+            return pd.Series(dtype="float")
+        s = self._bucketed(frame, "1d", "duration_minutes", "sum").resample("D").sum()
+        return s.rolling(window=window_days).sum()
+
+    def focus_trend(self, frame):
+        if frame.height == 0:
+            return pd.Series(dtype="float")
+        s = self._bucketed(frame, "1mo", "focus_level", "mean")
+        s.index = s.index + pd.offsets.MonthEnd(0)
+        return s.resample(pd.offsets.MonthEnd()).mean()
+
+    def _streak_runs(self, frame):
+        """(last day, length) of every run of consecutive study days."""
+        pl = self.pl
+        days = frame.select(pl.col("start_timestamp").dt.date().unique().sort().alias("day"))
+        return (
+            days.with_columns((pl.col("day").diff().dt.total_days().fill_null(1) != 1).cum_sum().alias("run"))
+            .group_by("run")
+            .agg(pl.col("day").max().alias("end"), pl.len().alias("length"))
+            .sort("end")
+        )
+
+    def longest_streak(self, frame):
+        if frame.height == 0:
+            return 0
+        return int(self._streak_runs(frame)["length"].max())
+
+    def current_streak(self, frame, today=None):
+        """Length of the run that ends today or yesterday, else 0."""
+        if frame.height == 0:
+            return 0
+        last = self._streak_runs(frame).row(-1, named=True)
+        today = date.today() if today is None else pd.Timestamp(today).date()
+        return int(last["length"]) if last["end"] >= today - timedelta(days=1) else 0
+
+
+BACKENDS = {
+    "pandas": PandasBackend,
+    "polars": PolarsBackend,
+}
+
+
+def get_backend(name=None):
+    if name is None:
+        name = os.environ.get("ANALYTICS_BACKEND", "pandas")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown analytics backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
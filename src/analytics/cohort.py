@@ -0,0 +1,194 @@
+"""Run insights, subject stats and recommendations for many learners at once.
+
+Learners come either from a directory of per-learner SQLite files or from
+learner ids inside one database. They are cut into chunks and the chunks
+are spread over a ``ProcessPoolExecutor``. Within a chunk, learners of the
+same database are loaded with one query and then analyzed one by one. A
+learner that fails gets an ``"error"`` record and the rest of the batch
+carries on. Databases are read as they are: one that is missing or not on
+the current schema version is reported as an error, not migrated.
+"""
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict
+from itertools import groupby
+from pathlib import Path
+
+import pandas as pd
+from src.analytics import analytics
+from src.db.database import MIGRATIONS, DatabaseManager
+from src.recommender.recommender import RecommendationEngine
+
+DB_SUFFIXES = (".sqlite", ".db")
+
+# Flat columns written to Parquet; nested fields are stored as JSON text.
+PARQUET_COLUMNS = [
+    "learner", "source", "status", "error",
+    "total_sessions", "total_minutes", "avg_focus", "avg_score", "best_hour",
+    "weakest_subject", "most_productive_subject", "productivity_index",
+    "subject_stats", "recommendations",
+]
+
+
+def learner_files(directory):
+    return sorted(p for p in Path(directory).iterdir() if p.suffix in DB_SUFFIXES)
+
+
+def file_tasks(directory):
+    return [(str(path), None) for path in learner_files(directory)]
+
+
+def learner_tasks(db_path, learner_ids):
+    return [(db_path, int(learner_id)) for learner_id in learner_ids]
+
+
+def _clean(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _analyze(learner, source, df):
+    insights = analytics.insights_json(analytics.compute_insights(df))
+    stats = analytics.subject_stats(df) if not df.empty else pd.DataFrame()
+    return {
+        "learner": learner,
+        "source": source,
+        "status": "ok",
+        "insights": insights,
+        "subject_stats": {
+            subject: {col: _clean(value) for col, value in row.items()}
+            for subject, row in stats.to_dict(orient="index").items()
+        },
+        "recommendations": [asdict(r) for r in RecommendationEngine.from_frame(df).analyze()],
+    }
+
+
+def _name(db_path, learner_id):
+    return Path(db_path).stem if learner_id is None else learner_id
+
+
+def _error(learner, source, exc):
+    return {"learner": learner, "source": source, "status": "error", "error": f"{type(exc).__name__}: {exc}"}
+
+
+def _open(db_path):
+    """Open a learner database read-only; a batch run never creates,
+    migrates or switches the journal mode of one."""
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"No such database: {db_path}")
+    db = DatabaseManager(db_path=db_path, profile="readonly")
+    version, latest = db.schema_version(), MIGRATIONS[-1][0]
+    if version != latest:
+        raise ValueError(f"schema version {version}, expected {latest}; migrate it before the batch run")
+    return db
+
+
+def run_chunk(tasks):
+    """Analyze a list of ``(db_path, learner_id)`` tasks in input order.
+
+    ``learner_id=None`` means the whole file is one learner, named after the
+    file.
+    """
+    records = []
+    for db_path, group in groupby(tasks, key=lambda task: task[0]):
+        learner_ids = [learner_id for _, learner_id in group]
+        source = str(db_path)
+        try:
+            db = _open(db_path)
+            if learner_ids == [None]:
+                frames = {_name(db_path, None): analytics.df_from_db(db=db)}
+            else:
+                df = analytics.df_from_db(db=db, learner_ids=learner_ids)
+                by_learner = dict(iter(df.groupby("learner_id"))) if not df.empty else {}
+                frames = {
+                    learner_id: by_learner[learner_id].reset_index(drop=True) if learner_id in by_learner else df.iloc[0:0]
+                    for learner_id in learner_ids
+                }
+        except Exception as e:
+            records.extend(_error(_name(db_path, learner_id), source, e) for learner_id in learner_ids)
+            continue
+        for learner, df in frames.items():
+            try:
+                records.append(_analyze(learner, source, df))
+            except Exception as e:
+                records.append(_error(learner, source, e))
+    return records
+
+
+def run_cohort(tasks, workers=None, chunk_size=50, progress=None):
+    """Run ``run_chunk`` over ``tasks`` on a process pool.
+
+    ``progress(done, total, errors)`` is called after each chunk finishes.
+    ``workers=None`` or ``0`` uses one per CPU and ``workers=1`` runs in
+    this process. Records come back in task order.
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+    if workers is None or workers < 1:
+        workers = os.cpu_count() or 1
+    chunks = [tasks[i:i + chunk_size] for i in range(0, len(tasks), chunk_size)]
+    results = [None] * len(chunks)
+    done = errors = 0
+
+    def finished(index, records):
+        nonlocal done, errors
+        results[index] = records
+        done += len(records)
+        errors += sum(r["status"] == "error" for r in records)
+        if progress is not None:
+            progress(done, len(tasks), errors)
+
+    if workers == 1:
+        for index, chunk in enumerate(chunks):
+            finished(index, run_chunk(chunk))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_chunk, chunk): index for index, chunk in enumerate(chunks)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    records = future.result()
+                except Exception as e:
+                    # The worker itself died; the chunk's learners are reported as failed.
+                    records = [_error(_name(db_path, learner_id), str(db_path), e) for db_path, learner_id in chunks[index]]
+                finished(index, records)
+    return [record for records in results for record in records]
+
+
+def _flat(record):
+    insights = record.get("insights", {})
+    row = {col: insights.get(col) for col in PARQUET_COLUMNS if col in insights}
+    row.update({
+        "learner": str(record["learner"]),
+        "source": record["source"],
+        "status": record["status"],
+        "error": record.get("error"),
+        "subject_stats": json.dumps(record.get("subject_stats")),
+        "recommendations": json.dumps(record.get("recommendations")),
+    })
+    return row
+
+
+def check_format(fmt):
+    """Fail before any work is done if ``fmt`` cannot be written here."""
+    if fmt not in ("jsonl", "parquet"):
+        raise ValueError(f"Unknown format {fmt!r}, expected 'jsonl' or 'parquet'")
+    if fmt == "parquet":
+        try:
+            pd.io.parquet.get_engine("auto")
+        except ImportError as e:
+            raise ImportError("Parquet output needs 'pyarrow' or 'fastparquet': pip install pyarrow") from e
+
+
+def write_records(records, path, fmt="jsonl"):
+    check_format(fmt)
+    if fmt == "jsonl":
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+    else:
+        frame = pd.DataFrame([_flat(r) for r in records], columns=PARQUET_COLUMNS)
+        frame.to_parquet(path, index=False)
@@ -0,0 +1,116 @@
+"""Overall metrics answered from the trigger-maintained running aggregates.
+
+``session_totals``, ``subject_totals``, ``session_histograms`` and
+``streak_runs`` are updated by SQLite triggers as sessions are inserted,
+updated or deleted (see ``src.db.database``), so these functions read a
+handful of rows instead of the session history. Results match the pandas
+functions of the same name in ``src.analytics.analytics`` for the full,
+unfiltered history of every learner in the database.
+"""
+import math
+from datetime import date
+
+import pandas as pd
+from src.db.database import QUERY_CATALOG, DatabaseManager
+
+# strftime('%w') numbering: 0 is Sunday.
+_WEEKDAYS = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+_TOTALS = "SELECT * FROM session_totals WHERE id = 1"
+_SUBJECT_TOTALS = """
+SELECT s.name, t.sessions FROM subject_totals t
+JOIN subjects s ON t.subject_id = s.id
+ORDER BY s.name
+"""
+_HISTOGRAM = "SELECT bucket, sessions FROM session_histograms WHERE kind = ? AND sessions > 0"
+_LONGEST_STREAK = "SELECT MAX(julianday(end_day) - julianday(start_day)) FROM streak_runs"
+_CURRENT_STREAK = """
+SELECT julianday(end_day) - julianday(start_day) FROM streak_runs
+WHERE end_day >= date(?, '-1 day')
+ORDER BY end_day DESC LIMIT 1
+"""
+
+# subject_totals holds one row per subject and is read whole.
+QUERY_CATALOG.update({
+    "session_totals": (_TOTALS, (), False),
+    "subject_totals": (_SUBJECT_TOTALS, (), True),
+    "session_histogram": (_HISTOGRAM, ("hour",), False),
+    "longest_streak": (_LONGEST_STREAK, (), False),
+    "current_streak": (_CURRENT_STREAK, ("2026-01-01",), False),
+})
+
+
+def _manager(db_path, db):
+    return db if db is not None else DatabaseManager(db_path=db_path)
+
+
+def _totals(conn):
+    return conn.execute(_TOTALS).fetchone()
+
+
+def compute_overall_summary(db_path=None, db=None):
+    with _manager(db_path, db).connection() as conn:
+        totals = _totals(conn)
+        per_subject = conn.execute(_SUBJECT_TOTALS).fetchall()
+    sessions = totals["sessions"]
+    sessions_per_subject = pd.Series(
+        [row[1] for row in per_subject],
+        index=pd.Index([row[0] for row in per_subject], name="subject_name"),
+        dtype="int64",
+    ).sort_values(ascending=False, kind="stable")
+    return {
+        "total_sessions": sessions,
+        "total_minutes": totals["minutes"],
+        "avg_focus": totals["focus_sum"] / sessions if sessions else None,
+        "avg_score": totals["score_sum"] / totals["scored"] if totals["scored"] else None,
+        "sessions_per_subject": sessions_per_subject,
+    }
+
+
+def focus_score_corr(db_path=None, db=None):
+    with _manager(db_path, db).connection() as conn:
+        t = _totals(conn)
+    n = t["scored"]
+    if n == 0:
+        return None
+    cov = n * t["focus_score"] - t["scored_focus_sum"] * t["score_sum"]
+    var_focus = n * t["scored_focus_sq"] - t["scored_focus_sum"] ** 2
+    var_score = n * t["score_sq"] - t["score_sum"] ** 2
+    if var_focus <= 0 or var_score <= 0:
+        return float("nan")
+    return float(cov / math.sqrt(var_focus * var_score))
+
+
+def _histogram(kind, db_path, db):
+    with _manager(db_path, db).connection() as conn:
+        rows = conn.execute(_HISTOGRAM, (kind,)).fetchall()
+    return {row[0]: row[1] for row in rows}
+
+
+def best_hour(db_path=None, db=None):
+    counts = _histogram("hour", db_path, db)
+    if not counts:
+        return None
+    # Same tie-break as Series.mode()[0]: the smallest of the most frequent.
+    return min(counts, key=lambda hour: (-counts[hour], hour))
+
+
+def best_weekday(db_path=None, db=None):
+    counts = {_WEEKDAYS[day]: n for day, n in _histogram("weekday", db_path, db).items()}
+    if not counts:
+        return None
+    return min(counts, key=lambda name: (-counts[name], name))
+
+
+def longest_streak(db_path=None, db=None):
+    with _manager(db_path, db).connection() as conn:
+        days = conn.execute(_LONGEST_STREAK).fetchone()[0]
+    return 0 if days is None else int(days) + 1
+
+
+def current_streak(db_path=None, db=None, today=None):
+    """Length of the streak ending today or yesterday, else 0."""
+    today = date.today() if today is None else pd.Timestamp(today).date()
+    with _manager(db_path, db).connection() as conn:
+        days = conn.execute(_CURRENT_STREAK, (today.isoformat(),)).fetchone()
+    return 0 if days is None else int(days[0]) + 1
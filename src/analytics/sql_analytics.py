@@ -0,0 +1,266 @@
+"""Aggregates from ``analytics`` computed inside SQLite.
+
+Each function returns the same structure as its pandas namesake in
+``src.analytics.analytics`` but runs a GROUP BY over learning_sessions
+instead of loading every row, so the cost does not grow with the size of the
+frame on the Python side. ``since`` / ``until`` / ``subject_ids`` filter the
+sessions the same way they do for ``df_from_db``. The time-series functions
+read the daily/weekly rollup tables, so their date filters work on whole
+days.
+"""
+import pandas as pd
+from src.analytics.analytics import session_filter
+from src.db.database import QUERY_CATALOG, DatabaseManager
+
+_AGGREGATES = """
+       COUNT(*) AS sessions,
+       SUM(ls.duration_minutes) AS total_minutes,
+       SUM(ls.focus_level) AS focus_sum,
+       AVG(ls.focus_level) AS avg_focus,
+       AVG(ls.test_score) AS avg_score,
+       COUNT(ls.test_score) AS scored,
+       SUM(ls.test_score) AS score_sum,
+       SUM(ls.focus_level * ls.duration_minutes) AS weighted_focus
+"""
+
+# Grouped by name like the pandas functions, so learners' subjects that
+# share a name are one row.
+_PER_SUBJECT = f"""
+SELECT s.name AS subject_name, {_AGGREGATES}
+FROM learning_sessions ls
+JOIN subjects s ON ls.subject_id = s.id
+{{where}}
+GROUP BY s.name
+ORDER BY s.name
+"""
+
+# Same aggregates for every learner at once; idx_session_learner_metrics
+# covers the session columns.
+_PER_LEARNER_SUBJECT = f"""
+SELECT ls.learner_id, s.name AS subject_name, {_AGGREGATES}
+FROM learning_sessions ls
+JOIN subjects s ON ls.subject_id = s.id
+{{where}}
+GROUP BY ls.learner_id, s.id
+ORDER BY ls.learner_id, s.name
+"""
+
+_ROLLUP = """
+SELECT r.{key} AS bucket, SUM(r.minutes) AS minutes, SUM(r.sessions) AS sessions,
+       SUM(r.focus_sum) AS focus_sum
+FROM {table} r
+JOIN subjects s ON r.subject_id = s.id
+{where}
+GROUP BY r.{key}
+ORDER BY r.{key}
+"""
+
+_STATS_COLUMNS = ["sessions", "total_minutes", "avg_focus", "avg_score"]
+
+
+def _manager(db_path, db):
+    return db if db is not None else DatabaseManager(db_path=db_path)
+
+
+def _per_subject(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    where, params = session_filter(since, until, subject_ids)
+    with _manager(db_path, db).connection() as conn:
+        df = pd.read_sql_query(_PER_SUBJECT.format(where=where), conn, params=params, index_col="subject_name")
+    for col in ("avg_focus", "avg_score"):
+        df[col] = df[col].astype("float64")
+    return df
+
+
+def _per_learner_subject(db_path=None, db=None, since=None, until=None, learner_ids=None):
+    where, params = session_filter(since, until, learner_ids=learner_ids)
+    with _manager(db_path, db).connection() as conn:
+        df = pd.read_sql_query(
+            _PER_LEARNER_SUBJECT.format(where=where), conn, params=params, index_col=["learner_id", "subject_name"]
+        )
+    for col in ("avg_focus", "avg_score"):
+        df[col] = df[col].astype("float64")
+    return df
+
+
+def _summary(per_subject):
+    total_sessions = int(per_subject["sessions"].sum())
+    scored = int(per_subject["scored"].sum())
+    if total_sessions:
+        total_minutes = int(per_subject["total_minutes"].sum())
+        avg_focus = float(per_subject["focus_sum"].sum() / total_sessions)
+    else:
+        total_minutes, avg_focus = 0, None
+    avg_score = float(per_subject["score_sum"].sum() / scored) if scored else None
+    sessions_per_subject = per_subject["sessions"].sort_values(ascending=False, kind="stable")
+    sessions_per_subject.name = None
+    return {
+        "total_sessions": total_sessions,
+        "total_minutes": total_minutes,
+        "avg_focus": avg_focus,
+        "avg_score": avg_score,
+        "sessions_per_subject": sessions_per_subject,
+    }
+
+
+def compute_overall_summary(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    return _summary(_per_subject(db_path, db, since, until, subject_ids))
+
+
+def subject_stats(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    return _per_subject(db_path, db, since, until, subject_ids)[_STATS_COLUMNS]
+
+
+def cohort_summary(db_path=None, db=None, since=None, until=None, learner_ids=None):
+    """compute_overall_summary for every learner from one grouped query.
+
+    Returns ``{learner_id: summary}``; learners with no matching sessions
+    are left out.
+    """
+    per_learner = _per_learner_subject(db_path, db, since, until, learner_ids)
+    return {
+        int(learner_id): _summary(group.droplevel("learner_id"))
+        for learner_id, group in per_learner.groupby(level="learner_id", sort=True)
+    }
+
+
+def cohort_subject_stats(db_path=None, db=None, since=None, until=None, learner_ids=None):
+    """subject_stats for every learner, indexed by (learner_id, subject_name)."""
+    return _per_learner_subject(db_path, db, since, until, learner_ids)[_STATS_COLUMNS]
+
+
+def top_subjects(n=5, db_path=None, db=None, since=None, until=None, subject_ids=None):
+    s = _per_subject(db_path, db, since, until, subject_ids)["total_minutes"]
+    s = s.sort_values(ascending=False, kind="stable").head(n)
+    s.name = "duration_minutes"
+    return s
+
+
+def weakest_subject(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    scores = _per_subject(db_path, db, since, until, subject_ids)["avg_score"].dropna()
+    if scores.empty:
+        return None
+    return scores.idxmin()
+
+
+def most_productive_subject(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    s = _per_subject(db_path, db, since, until, subject_ids)["weighted_focus"]
+    if s.empty:
+        return None
+    return s.idxmax()
+
+
+def _rollup_filter(key, since=None, until=None, subject_ids=None):
+    clauses, params = [], []
+    if since is not None:
+        clauses.append(f"r.{key} >= ?")
+        params.append(pd.Timestamp(since).strftime("%Y-%m-%d"))
+    if until is not None:
+        clauses.append(f"r.{key} <= ?")
+        params.append(pd.Timestamp(until).strftime("%Y-%m-%d"))
+    if subject_ids is not None:
+        subject_ids = list(subject_ids)
+        clauses.append(f"r.subject_id IN ({', '.join('?' * len(subject_ids))})")
+        params.extend(subject_ids)
+    where = " WHERE " + " AND ".join(clauses) if clauses else ""
+    return where, params
+
+
+def _rollup_frame(table, key, db_path=None, db=None, since=None, until=None, subject_ids=None):
+    where, params = _rollup_filter(key, since, until, subject_ids)
+    query = _ROLLUP.format(table=table, key=key, where=where)
+    with _manager(db_path, db).connection() as conn:
+        return pd.read_sql_query(query, conn, params=params, parse_dates=["bucket"], index_col="bucket")
+
+
+def daily_rollups(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    return _rollup_frame("daily_rollups", "day", db_path, db, since, until, subject_ids)
+
+
+def _weekly_frame(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    # A date window can cut a week in half, so only the unfiltered case can
+    # read the weekly table directly.
+    if since is None and until is None:
+        frame = _rollup_frame("weekly_rollups", "week_start", db_path, db, subject_ids=subject_ids)
+        frame.index = frame.index + pd.Timedelta(days=6)
+    else:
+        frame = daily_rollups(db_path, db, since, until, subject_ids)
+    if frame.empty:
+        return frame
+    frame = frame.resample("W").sum()
+    frame.index.name = "start_timestamp"
+    return frame
+
+
+def weekly_minutes(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    frame = _weekly_frame(db_path, db, since, until, subject_ids)
+    if frame.empty:
+        return pd.Series(dtype="int")
+    s = frame["minutes"]
+    s.name = "duration_minutes"
+    return s
+
+
+def weekly_focus(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    """Average focus per week; NaN for weeks without sessions."""
+    frame = _weekly_frame(db_path, db, since, until, subject_ids)
+    if frame.empty:
+        return pd.Series(dtype="float")
+    s = frame["focus_sum"] / frame["sessions"]
+    s.name = "focus_level"
+    return s
+
+
+def rolling_minutes(window_days=7, db_path=None, db=None, since=None, until=None, subject_ids=None):
+    frame = daily_rollups(db_path, db, since, until, subject_ids)
+    if frame.empty:
+        return pd.Series(dtype="float")
+    s = frame["minutes"].resample("D").sum().fillna(0)
+    s.index.name = "start_timestamp"
+    s.name = "duration_minutes"
+    return s.rolling(window=window_days).sum()
+
+
+def growth_rate(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    s = weekly_minutes(db_path, db, since, until, subject_ids)
+    if len(s) < 2:
+        return None
+    prev = s.iloc[-2]
+    last = s.iloc[-1]
+    if prev == 0:
+        return None
+    return float((last - prev) / prev)
+
+
+def focus_trend(db_path=None, db=None, since=None, until=None, subject_ids=None):
+    frame = daily_rollups(db_path, db, since, until, subject_ids)
+    if frame.empty:
+        return pd.Series(dtype="float")
+    monthly = frame[["focus_sum", "sessions"]].resample(pd.offsets.MonthEnd()).sum()
+    s = monthly["focus_sum"] / monthly["sessions"]
+    s.index.name = "start_timestamp"
+    s.name = "focus_level"
+    return s
+
+
+def _catalog_entries():
+    filtered, filtered_params = session_filter("2026-01-01", "2026-01-31", [1])
+    by_learner, by_learner_params = session_filter(learner_ids=[1])
+    rollup_filtered, rollup_params = _rollup_filter("day", "2026-01-01", "2026-01-31", [1])
+    # Unfiltered calls aggregate every subject or rollup row by design;
+    # filtered ones must stay on the indexes.
+    return {
+        "subject_stats": (_PER_SUBJECT.format(where=""), (), True),
+        "subject_stats_filtered": (_PER_SUBJECT.format(where=filtered), tuple(filtered_params), False),
+        "cohort_subject_stats": (_PER_LEARNER_SUBJECT.format(where=""), (), True),
+        "cohort_subject_stats_learners": (
+            _PER_LEARNER_SUBJECT.format(where=by_learner), tuple(by_learner_params), False
+        ),
+        "daily_rollups": (_ROLLUP.format(table="daily_rollups", key="day", where=""), (), True),
+        "daily_rollups_filtered": (
+            _ROLLUP.format(table="daily_rollups", key="day", where=rollup_filtered), tuple(rollup_params), False
+        ),
+        "weekly_rollups": (_ROLLUP.format(table="weekly_rollups", key="week_start", where=""), (), True),
+    }
+
+
+QUERY_CATALOG.update(_catalog_entries())
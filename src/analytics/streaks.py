@@ -0,0 +1,87 @@
+"""Vectorized study-streak metrics.
+
+Days are turned into integer ordinals and run-length encoded with NumPy, so
+every metric is a handful of array passes instead of a Python loop over
+dates. A streak is a run of consecutive calendar days with at least one
+session.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+def _day_ordinals(df):
+    if "start_timestamp" in df:
+        values = df["start_timestamp"].to_numpy(dtype="datetime64[ns]")
+    else:
+        values = pd.to_datetime(df["date"]).to_numpy(dtype="datetime64[ns]")
+    return values.astype("datetime64[D]").astype(np.int64)
+
+
+def _runs(days):
+    """(start ordinal, length) of every maximal run of days present in ``days``."""
+    if days.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    first = days.min()
+    present = np.bincount(days - first) > 0
+    edges = np.flatnonzero(np.diff(np.concatenate(([False], present, [False])).astype(np.int8)))
+    starts, ends = edges[::2], edges[1::2]
+    return starts + first, ends - starts
+
+
+def _today_ordinal(today):
+    today = date.today() if today is None else pd.Timestamp(today).date()
+    return np.datetime64(today, "D").astype(np.int64)
+
+
+def longest_streak(df):
+    _, lengths = _runs(_day_ordinals(df))
+    return int(lengths.max()) if lengths.size else 0
+
+
+def current_streak(df, today=None):
+    """Length of the run that ends today or yesterday, else 0."""
+    starts, lengths = _runs(_day_ordinals(df))
+    if not lengths.size:
+        return 0
+    last_end = starts[-1] + lengths[-1] - 1
+    return int(lengths[-1]) if last_end >= _today_ordinal(today) - 1 else 0
+
+
+def streak_histogram(df):
+    """Number of streaks of each length, indexed by length in days."""
+    _, lengths = _runs(_day_ordinals(df))
+    counts = np.bincount(lengths)
+    nonzero = np.flatnonzero(counts)
+    return pd.Series(counts[nonzero], index=pd.Index(nonzero, name="length"), name="streaks")
+
+
+def subject_streaks(df, today=None):
+    """Longest and current streak per subject, indexed by subject_name."""
+    if df.empty:
+        return pd.DataFrame(
+            {"longest": pd.Series(dtype="int64"), "current": pd.Series(dtype="int64")},
+            index=pd.Index([], name="subject_name"),
+        )
+    codes, names = pd.factorize(df["subject_name"], sort=True)
+    days = _day_ordinals(df)
+    first = days.min()
+    # Leave a gap of at least one day between subjects so runs never cross.
+    stride = int(days.max() - first) + 2
+    keys = np.unique(codes.astype(np.int64) * stride + (days - first))
+    new_run = np.concatenate(([True], np.diff(keys) != 1))
+    run_start = np.flatnonzero(new_run)
+    lengths = np.diff(np.append(run_start, keys.size))
+    run_subject = keys[run_start] // stride
+    run_end = keys[run_start] % stride + lengths - 1 + first
+
+    longest = np.zeros(len(names), dtype=np.int64)
+    np.maximum.at(longest, run_subject, lengths)
+    current = np.zeros(len(names), dtype=np.int64)
+    alive = run_end >= _today_ordinal(today) - 1
+    current[run_subject[alive]] = lengths[alive]
+    return pd.DataFrame(
+        {"longest": longest, "current": current},
+        index=pd.Index(names, name="subject_name"),
+    )
@@ -1,25 +1,48 @@
 import argparse
+import csv
+import json
 import sqlite3
 import os
+import sys
 from src.db.database import DatabaseManager
 from src.models.session import SessionRecord
-from src.analytics import analytics
+from src.analytics import analytics, backends, cohort, incremental, sql_analytics
 from src import visualization
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from src.ml import preprocessing, features, train, model, predict
+from src.ml import preprocessing, features, train, model, predict, pipeline, registry, client, server
 from src.recommender.recommender import RecommendationEngine, print_recommendation_summary
 
 
+def _db(args):
+    db = getattr(args, "db", None)
+    return db if db is not None else DatabaseManager()
+
+def _filters(args):
+    return {
+        "since": getattr(args, "since", None),
+        "until": getattr(args, "until", None),
+        "subject_ids": getattr(args, "subject_ids", None),
+    }
+
+def _has_filters(args):
+    return any(value is not None for value in _filters(args).values())
+
+def _add_filter_args(parser):
+    parser.add_argument("--since", default=None, help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--until", default=None, help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--subject", dest="subject_ids", type=int, action="append", default=None,
+                        help="subject id, repeat for several")
+
 def cmd_init(args=None):
-    db = DatabaseManager()
+    db = _db(args)
     db.migrate()
     print(f"Database initialized at {db.db_path}")
 
 def cmd_add_subject(args):
-    db = DatabaseManager()
+    db = _db(args)
     try:
-        sid = db.add_subject(args.name)
+        sid = db.add_subject(args.name, learner_id=args.learner)
         print(f"Subject '{args.name}' added with id={sid}")
     except sqlite3.IntegrityError:
         print(f"Subject '{args.name}' already exists")
@@ -27,7 +50,7 @@ def cmd_add_subject(args):
         print(e)
 
 def cmd_delete_subject(args):
-    db = DatabaseManager()
+    db = _db(args)
     rc = db.delete_subject(args.subject_id)
     if rc > 0:
         print(f"Deleted subject id={args.subject_id} and associated sessions")
@@ -35,7 +58,7 @@ def cmd_delete_subject(args):
         print(f"No subject found with id={args.subject_id}")
 
 def cmd_show_subject(args):
-    db = DatabaseManager()
+    db = _db(args)
     subj = db.get_subject(args.subject_id)
     if subj:
         print(f"Subject id={subj.id}: {subj.name}")
@@ -43,13 +66,13 @@ def cmd_show_subject(args):
         print(f"No subject found with id={args.subject_id}")
 
 def cmd_list_subjects(args):
-    db = DatabaseManager()
+    db = _db(args)
     subjects = db.get_subjects()
     for s in subjects:
         print(f"{s.id}: {s.name}")
 
 def cmd_add_session(args):
-    db = DatabaseManager()
+    db = _db(args)
     session = SessionRecord(
         subject_id=args.subject_id,
         date=args.date,
@@ -59,11 +82,15 @@ def cmd_add_session(args):
         test_score=args.score,
         notes=args.notes
     )
-    row_id = db.add_session(session)
+    try:
+        row_id = db.add_session(session)
+    except sqlite3.IntegrityError:
+        print(f"No subject found with id={args.subject_id}")
+        raise SystemExit(1)
     print(f"Added session id={row_id}")
     
 def cmd_show_session(args):
-    db = DatabaseManager()
+    db = _db(args)
     session = db.get_session(args.session_id)
     if session:
         print(f"Session id={session.id}: Subject ID={session.subject_id}, "
@@ -73,7 +100,7 @@ def cmd_show_session(args):
         print(f"No session found with id={args.session_id}")
     
 def cmd_delete_session(args):
-    db = DatabaseManager()
+    db = _db(args)
     rc = db.delete_session(args.session_id)
     if rc > 0:
         print(f"Deleted session id={args.session_id}")
@@ -81,12 +108,83 @@ def cmd_delete_session(args):
         print(f"No session found with id={args.session_id}")
 
 def cmd_list_sessions(args):
-    db = DatabaseManager()
-    sessions = db.list_sessions(limit=args.limit)
+    db = _db(args)
+    if args.all:
+        sessions = db.iter_sessions(after_id=args.after)
+    else:
+        sessions = db.list_sessions(limit=args.limit, after_id=args.after)
     for s in sessions:
         print(f"{s.id}: subject_id={s.subject_id}, {s.start_time} {s.date}, "
               f"{s.duration_minutes}min, focus={s.focus_level}, score={s.test_score}")
 
+def cmd_rebuild_rollups(args):
+    db = _db(args)
+    db.rebuild_rollups()
+    print("Rebuilt daily and weekly rollups")
+
+def cmd_explain(args):
+    db = _db(args)
+    regressions = 0
+    for entry in db.explain():
+        if entry["full_scan"] and not entry["scan_expected"]:
+            flag = "FULL SCAN"
+            regressions += 1
+        elif entry["full_scan"]:
+            flag = "full scan (expected)"
+        else:
+            flag = "ok"
+        print(f"{entry['query']}: {flag}")
+        for detail in entry["plan"]:
+            print(f"  {detail}")
+    if regressions:
+        print(f"{regressions} queries fall back to a full table scan")
+        raise SystemExit(1)
+
+def _read_session_rows(path, fmt):
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+def cmd_import_sessions(args):
+    db = _db(args)
+    fmt = args.format or ("jsonl" if args.path.endswith((".jsonl", ".ndjson")) else "csv")
+    rows = _read_session_rows(args.path, fmt)
+    try:
+        ids = db.add_sessions((SessionRecord.from_dict(r) for r in rows), chunk_size=args.chunk_size)
+    except (ValueError, KeyError, sqlite3.IntegrityError) as e:
+        print(f"Import failed: {e!r}")
+        return
+    print(f"Imported {len(ids)} sessions from {args.path}")
+
+def cmd_cohort_run(args):
+    if args.dir:
+        tasks = cohort.file_tasks(args.dir)
+    else:
+        db = _db(args)
+        tasks = cohort.learner_tasks(db.db_path, args.learner_ids or db.learner_ids())
+    fmt = args.format or ("parquet" if args.out.endswith(".parquet") else "jsonl")
+    try:
+        cohort.check_format(fmt)
+    except ImportError as e:
+        print(e)
+        raise SystemExit(1)
+
+    def progress(done, total, errors):
+        print(f"cohort-run: {done}/{total} learners, {errors} errors", file=sys.stderr)
+
+    records = cohort.run_cohort(tasks, workers=args.workers, chunk_size=args.chunk_size, progress=progress)
+    cohort.write_records(records, args.out, fmt)
+    failed = [r for r in records if r["status"] == "error"]
+    for record in failed:
+        print(f"  {record['learner']}: {record['error']}", file=sys.stderr)
+    print(f"Wrote {len(records)} learner results to {args.out} ({len(failed)} failed)")
+    if failed:
+        raise SystemExit(1)
+
 def main():
     parser = argparse.ArgumentParser(prog="slearn")
     sub = parser.add_subparsers(dest="command")
@@ -96,6 +194,7 @@ def main():
 
     p_add_subj = sub.add_parser("add-subject")
     p_add_subj.add_argument("name")
+    p_add_subj.add_argument("--learner", type=int, default=1)
     p_add_subj.set_defaults(func=cmd_add_subject)
     
     p_del_subj = sub.add_parser("delete-subject")
@@ -123,8 +222,32 @@ def main():
     p_add_sess.add_argument("--notes")
     p_add_sess.set_defaults(func=cmd_add_session)
 
+    p_rollups = sub.add_parser("rebuild-rollups")
+    p_rollups.set_defaults(func=cmd_rebuild_rollups)
+
+    p_explain = sub.add_parser("explain")
+    p_explain.set_defaults(func=cmd_explain)
+
+    p_import = sub.add_parser("import-sessions")
+    p_import.add_argument("path")
+    p_import.add_argument("--format", choices=["csv", "jsonl"], default=None, help="default: from file extension")
+    p_import.add_argument("--chunk-size", type=int, default=1000)
+    p_import.set_defaults(func=cmd_import_sessions)
+
+    p_cohort = sub.add_parser("cohort-run")
+    p_cohort.add_argument("--dir", default=None, help="directory of per-learner .sqlite/.db files")
+    p_cohort.add_argument("--learner", dest="learner_ids", type=int, action="append", default=None,
+                          help="learner id in DB_PATH, repeat for several (default: all)")
+    p_cohort.add_argument("--out", required=True)
+    p_cohort.add_argument("--format", choices=["jsonl", "parquet"], default=None, help="default: from --out extension")
+    p_cohort.add_argument("--workers", type=int, default=None, help="worker processes, 0 or default = one per CPU")
+    p_cohort.add_argument("--chunk-size", type=int, default=50, help="learners per worker task")
+    p_cohort.set_defaults(func=cmd_cohort_run)
+
     p_list_sess = sub.add_parser("list-sessions")
     p_list_sess.add_argument("--limit", type=int, default=10)
+    p_list_sess.add_argument("--after", type=int, default=None, help="only sessions with id greater than this")
+    p_list_sess.add_argument("--all", action="store_true", help="stream every session, ignoring --limit")
     p_list_sess.set_defaults(func=cmd_list_sessions)
     
     p_show_sess = sub.add_parser("show-session")
@@ -132,73 +255,97 @@ def main():
     p_show_sess.set_defaults(func=cmd_show_session)
 
     p_analytics = sub.add_parser("analytics-summary")
+    _add_filter_args(p_analytics)
     p_analytics.set_defaults(func=cmd_analytics_summary)
 
     p_plot = sub.add_parser("analytics-plot")
     p_plot.add_argument("--chart", choices=["sessions_over_time", "focus_dist", "subject_breakdown", "all"], default="all")
     p_plot.add_argument("--out-dir", default="data/plots")
+    _add_filter_args(p_plot)
     p_plot.set_defaults(func=cmd_analytics_plot)
 
     p_streak = sub.add_parser("analytics-streak")
+    _add_filter_args(p_streak)
     p_streak.set_defaults(func=cmd_analytics_streak)
 
     p_focus_plot = sub.add_parser("analytics-plot-focus-trend")
     p_focus_plot.add_argument("--out-dir", default="data/plots")
+    _add_filter_args(p_focus_plot)
     p_focus_plot.set_defaults(func=cmd_analytics_plot_focus)
 
     p_best_hours = sub.add_parser("analytics-best-hours")
     p_best_hours.add_argument("--out-dir", default="data/plots")
+    _add_filter_args(p_best_hours)
     p_best_hours.set_defaults(func=cmd_analytics_best_hours)
 
     p_rolling = sub.add_parser("analytics-rolling")
+    _add_filter_args(p_rolling)
     p_rolling.set_defaults(func=cmd_analytics_rolling)
 
     p_growth = sub.add_parser("analytics-growth-rate")
+    _add_filter_args(p_growth)
     p_growth.set_defaults(func=cmd_analytics_growth)
 
     p_corr = sub.add_parser("analytics-focus-corr")
+    _add_filter_args(p_corr)
     p_corr.set_defaults(func=cmd_analytics_corr)
 
     p_recs = sub.add_parser("analytics-recommendations")
+    _add_filter_args(p_recs)
     p_recs.set_defaults(func=cmd_analytics_recommendations)
 
     p_daily_plan = sub.add_parser("recommend-daily-plan")
     p_daily_plan.add_argument("--date", default=None, help="YYYY-MM-DD, default today")
+    _add_filter_args(p_daily_plan)
     p_daily_plan.set_defaults(func=cmd_recommend_daily_plan)
 
     p_weekly_plan = sub.add_parser("recommend-weekly-plan")
+    _add_filter_args(p_weekly_plan)
     p_weekly_plan.set_defaults(func=cmd_recommend_weekly_plan)
 
     p_rec_dashboard = sub.add_parser("recommend-dashboard")
+    _add_filter_args(p_rec_dashboard)
     p_rec_dashboard.set_defaults(func=cmd_recommend_dashboard)
 
     p_all = sub.add_parser("analytics-all-plots")
     p_all.add_argument("--out-dir", default="data/plots")
+    _add_filter_args(p_all)
     p_all.set_defaults(func=cmd_analytics_all_plots)
 
     p_quality = sub.add_parser("analytics-quality")
+    _add_filter_args(p_quality)
     p_quality.set_defaults(func=cmd_analytics_quality)
 
     p_dashboard = sub.add_parser("analytics-dashboard")
     p_dashboard.add_argument("--out-dir", default="data/plots")
+    _add_filter_args(p_dashboard)
     p_dashboard.set_defaults(func=cmd_analytics_dashboard)
 
     p_insights = sub.add_parser("analytics-insights")
+    p_insights.add_argument("--format", choices=["text", "json"], default="text")
+    _add_filter_args(p_insights)
     p_insights.set_defaults(func=cmd_analytics_insights)
 
     p_report = sub.add_parser("analytics-report")
     p_report.add_argument("--out-dir", default="data/exports")
+    p_report.add_argument("--format", choices=["text", "json"], default="text")
+    _add_filter_args(p_report)
     p_report.set_defaults(func=cmd_analytics_report)
 
     #ML Commands
     p_ml_train = sub.add_parser("ml-train")
+    p_ml_train.add_argument("--jobs", type=int, default=1, help="models trained in parallel, 0 = one per CPU")
     p_ml_train.set_defaults(func=cmd_ml_train)
     
     p_ml_predict = sub.add_parser("ml-predict")
     p_ml_predict.add_argument("--model", dest='model_name', default='RandomForest')
+    p_ml_predict.add_argument("--server", metavar="ADDRESS", help="ask a running ml-serve instead of loading the model")
+    p_ml_predict.add_argument("--focus", type=float, help="with --duration, predict this one session instead of the database")
+    p_ml_predict.add_argument("--duration", type=float)
     p_ml_predict.set_defaults(func=cmd_ml_predict)
     
     p_ml_eval = sub.add_parser("ml-evaluate")
+    p_ml_eval.add_argument("--jobs", type=int, default=1, help="models cross-validated in parallel, 0 = one per CPU")
     p_ml_eval.set_defaults(func=cmd_ml_evaluate)
     
     p_ml_list = sub.add_parser("ml-list-models")
@@ -217,16 +364,29 @@ def main():
     p_ml_info.add_argument("model_name")
     p_ml_info.set_defaults(func=cmd_ml_info)
 
+    p_ml_serve = sub.add_parser("ml-serve")
+    p_ml_serve.add_argument("--address", default=client.DEFAULT_ADDRESS, help="Unix socket path or host:port")
+    p_ml_serve.add_argument("--models", default=','.join(server.DEFAULT_MODELS))
+    p_ml_serve.add_argument("--batch-wait-ms", type=float, default=0.0, help="extra time to gather a batch")
+    p_ml_serve.add_argument("--max-batch-rows", type=int, default=server.MAX_BATCH_ROWS)
+    p_ml_serve.set_defaults(func=cmd_ml_serve)
+
     args = parser.parse_args()
     if hasattr(args, "func"):
-        args.func(args)
+        with DatabaseManager(pool_size=1) as db:
+            # A single PRAGMA read when the schema is current.
+            db.migrate()
+            args.db = db
+            args.func(args)
     else:
         parser.print_help()
 
 
 def cmd_analytics_summary(args):
-    df = analytics.df_from_db()
-    summary = analytics.compute_overall_summary(df)
+    if _has_filters(args):
+        summary = sql_analytics.compute_overall_summary(db=_db(args), **_filters(args))
+    else:
+        summary = incremental.compute_overall_summary(db=_db(args))
     print(f"Total sessions: {summary['total_sessions']}")
     print(f"Total minutes: {summary['total_minutes']}")
     print(f"Average focus: {summary['avg_focus']}")
@@ -236,13 +396,22 @@ def cmd_analytics_summary(args):
         print(f"  {subj}: {cnt}")
 
 
+def _weekly_series(args):
+    """Weekly minutes and average focus from the rollup tables."""
+    db = _db(args)
+    return (
+        sql_analytics.weekly_minutes(db=db, **_filters(args)),
+        sql_analytics.weekly_focus(db=db, **_filters(args)),
+    )
+
+
 def cmd_analytics_plot(args):
-    df = analytics.df_from_db()
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
     out_dir = args.out_dir
     os.makedirs(out_dir, exist_ok=True)
     charts = []
     if args.chart in ("sessions_over_time", "all"):
-        fig = visualization.plot_sessions_over_time(df)
+        fig = visualization.plot_sessions_over_time(sql_analytics.weekly_minutes(db=_db(args), **_filters(args)))
         path = os.path.join(out_dir, "sessions_over_time.png")
         fig.savefig(path)
         charts.append(path)
@@ -265,23 +434,29 @@ def cmd_analytics_plot(args):
 
 
 def cmd_analytics_streak(args):
-    df = analytics.df_from_db()
-    s = analytics.longest_streak(df)
+    if _has_filters(args):
+        backend = backends.get_backend()
+        frame = backend.load(_db(args), columns=["start_timestamp"], **_filters(args))
+        s = backend.longest_streak(frame)
+        current = backend.current_streak(frame)
+    else:
+        s = incremental.longest_streak(db=_db(args))
+        current = incremental.current_streak(db=_db(args))
     print(f"Longest streak: {s} days")
+    print(f"Current streak: {current} days")
 
 
 def cmd_analytics_plot_focus(args):
-    df = analytics.df_from_db()
     out_dir = args.out_dir
     os.makedirs(out_dir, exist_ok=True)
-    fig = visualization.plot_focus_trend(df)
+    fig = visualization.plot_focus_trend(sql_analytics.weekly_focus(db=_db(args), **_filters(args)))
     path = os.path.join(out_dir, "focus_trend.png")
     fig.savefig(path)
     print(f"Saved focus trend: {path}")
 
 
 def cmd_analytics_best_hours(args):
-    df = analytics.df_from_db()
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
     out_dir = args.out_dir
     os.makedirs(out_dir, exist_ok=True)
     fig = visualization.plot_best_hours(df)
@@ -291,30 +466,31 @@ def cmd_analytics_best_hours(args):
 
 
 def cmd_analytics_rolling(args):
-    df = analytics.df_from_db()
-    r = analytics.rolling_minutes(df)
+    r = sql_analytics.rolling_minutes(db=_db(args), **_filters(args))
     print(r.tail(10))
 
 
 def cmd_analytics_growth(args):
-    df = analytics.df_from_db()
-    gr = analytics.growth_rate(df)
+    gr = sql_analytics.growth_rate(db=_db(args), **_filters(args))
     print(f"Growth rate (last week vs prev): {gr}")
 
 
 def cmd_analytics_corr(args):
-    df = analytics.df_from_db()
-    c = analytics.focus_score_corr(df)
+    if _has_filters(args):
+        df = analytics.df_from_db(db=_db(args), columns=["focus_level", "test_score"], cache=True, **_filters(args))
+        c = analytics.focus_score_corr(df)
+    else:
+        c = incremental.focus_score_corr(db=_db(args))
     print(f"Focus/test_score correlation: {c}")
 
 
 def cmd_analytics_recommendations(args):
-    engine = RecommendationEngine()
+    engine = RecommendationEngine(db=_db(args), cache=True, **_filters(args))
     print(engine.get_text_advice())
 
 
 def cmd_recommend_daily_plan(args):
-    engine = RecommendationEngine()
+    engine = RecommendationEngine(db=_db(args), cache=True, **_filters(args))
     plan = engine.generate_daily_plan(args.date)
     
     print(f"Daily Plan - {plan['date']}")
@@ -328,7 +504,7 @@ def cmd_recommend_daily_plan(args):
 
 
 def cmd_recommend_weekly_plan(args):
-    engine = RecommendationEngine()
+    engine = RecommendationEngine(db=_db(args), cache=True, **_filters(args))
     plan = engine.generate_weekly_plan()
     
     print(f"Weekly Plan - {plan['week']}")
@@ -340,8 +516,12 @@ def cmd_recommend_weekly_plan(args):
         print(f"   Sessions this week: {subj['sessions']}")
         print(f"   Total time: {subj['total_minutes']} minutes\n")
 
+    for day in plan["days"]:
+        slots = ", ".join(f"{s['time']} {s['subject']}" for s in day["sessions"]) or "rest"
+        print(f"{day['date']}: {slots}")
+
 def cmd_recommend_dashboard(args):
-    engine = RecommendationEngine()
+    engine = RecommendationEngine(db=_db(args), cache=True, **_filters(args))
     dashboard = engine.get_dashboard()
     
     print("Learning Dashboard")
@@ -365,17 +545,17 @@ def cmd_recommend_dashboard(args):
 
 
 def cmd_analytics_all_plots(args):
-    df = analytics.df_from_db()
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
     out_dir = args.out_dir
     os.makedirs(out_dir, exist_ok=True)
-    fig = visualization.plot_all_charts(df)
+    fig = visualization.plot_all_charts(df, *_weekly_series(args))
     path = os.path.join(out_dir, "all_charts.png")
     fig.savefig(path)
     print(f"Saved combined charts: {path}")
 
 
 def cmd_analytics_quality(args):
-    df = analytics.df_from_db()
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
     miss = analytics.missing_report(df)
     for col, cnt in miss.items():
         if int(cnt) > 0:
@@ -383,47 +563,53 @@ def cmd_analytics_quality(args):
 
 
 def cmd_analytics_dashboard(args):
-    df = analytics.df_from_db()
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
     out_dir = args.out_dir
     os.makedirs(out_dir, exist_ok=True)
-    fig = visualization.plot_dashboard(df)
+    fig = visualization.plot_dashboard(df, *_weekly_series(args))
     path = os.path.join(out_dir, "dashboard.png")
     fig.savefig(path)
     print(f"Saved dashboard: {path}")
 
 
 def cmd_analytics_insights(args):
-    df = analytics.df_from_db()
-    best = analytics.best_hour(df)
-    prod = analytics.most_productive_subject(df)
-    weak = analytics.weakest_subject(df)
-    pidx = analytics.productivity_index(df)
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
+    insights = analytics.compute_insights(df)
+    if args.format == "json":
+        print(json.dumps(analytics.insights_json(insights), indent=2))
+        return
+    pidx = insights["productivity_index"]
 
     print("Learning Insights")
     print("-----------------")
-    print(f"Best study hour: {best}")
-    print(f"Most productive subject: {prod}")
-    print(f"Weakest subject: {weak}")
+    print(f"Best study hour: {insights['best_hour']}")
+    print(f"Most productive subject: {insights['most_productive_subject']}")
+    print(f"Weakest subject: {insights['weakest_subject']}")
     print(f"Productivity index: {round(pidx,2) if pidx is not None else 'n/a'}")
 
 
 def cmd_analytics_report(args):
-    df = analytics.df_from_db()
+    df = analytics.df_from_db(db=_db(args), cache=True, **_filters(args))
     out_dir = args.out_dir
     os.makedirs(out_dir, exist_ok=True)
-    total_minutes = analytics.compute_overall_summary(df)["total_minutes"]
-    best = analytics.best_hour(df)
-    weak = analytics.weakest_subject(df)
-    prod = analytics.most_productive_subject(df)
+    insights = analytics.compute_insights(df)
+
+    if args.format == "json":
+        path = os.path.join(out_dir, "report.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(analytics.insights_json(insights), f, indent=2)
+        print(f"Exported report: {path}")
+        return
 
+    total_minutes = insights["total_minutes"]
     path = os.path.join(out_dir, "report.txt")
     with open(path, "w", encoding="utf-8") as f:
         f.write("Learning Summary\n")
         f.write("----------------\n")
         f.write(f"Total time: {total_minutes//60}h {total_minutes%60}min\n")
-        f.write(f"Best hour: {best}\n")
-        f.write(f"Most productive subject: {prod}\n")
-        f.write(f"Weakest subject: {weak}\n")
+        f.write(f"Best hour: {insights['best_hour']}\n")
+        f.write(f"Most productive subject: {insights['most_productive_subject']}\n")
+        f.write(f"Weakest subject: {insights['weakest_subject']}\n")
     print(f"Exported report: {path}")
 
 
@@ -431,13 +617,15 @@ def cmd_analytics_report(args):
 
 def cmd_ml_train(args):
     try:
-        df = analytics.df_from_db()
+        df = analytics.df_from_db(db=_db(args), cache=True)
         if df.empty:
             print("No session data available. Add some sessions first.")
             return
         
         print(f"Loading {len(df)} sessions...")
-        feature_cols = ['focus_level', 'duration_minutes']
+        feature_cols = pipeline.FEATURE_COLUMNS
+        # Sessions without a test score have no target to learn from.
+        df = df.dropna(subset=['test_score'])
         X = df[feature_cols].copy()
         y = df['test_score'].copy()
         
@@ -456,19 +644,26 @@ def cmd_ml_train(args):
         print(f"Test set: {X_test_scaled.shape[0]} samples")
         
         print("Training models...")
-        models_dict = train.train_all_models(X_train_scaled, y_train)
+        models_dict = train.train_all_models(X_train_scaled, y_train, jobs=args.jobs)
         
         print("\nModel Performance on Test Set:")
         print("-" * 60)
+        test_metrics = {}
         for model_name, mod in models_dict.items():
             y_pred = mod.predict(X_test_scaled)
-            metrics = model.evaluate_model(y_test, y_pred)
+            metrics = test_metrics[model_name] = model.evaluate_model(y_test, y_pred)
             print(f"\n{model_name}:")
             for metric_name, value in metrics.items():
                 print(f"  {metric_name:10s}: {value:.4f}")
         
         print("\nSaving models...")
-        predict.save_all_models(models_dict, 'models')
+        cleaner = preprocessing.cleaner_params(X_train)
+        pipelines = {
+            name: pipeline.InferencePipeline(mod, scaler, cleaner, feature_cols)
+            for name, mod in models_dict.items()
+        }
+        fingerprint = registry.data_fingerprint(X_train, y_train)
+        predict.save_all_models(pipelines, 'models', test_metrics, fingerprint)
         print("Models saved to 'models/' directory")
         
     except Exception as e:
@@ -481,20 +676,22 @@ def cmd_ml_predict(args):
     try:
         model_name = args.model_name if hasattr(args, 'model_name') else 'RandomForest'
         
-        print(f"Loading model: {model_name}...")
-        mod = predict.load_model(model_name, 'models')
-        
-        df = analytics.df_from_db()
-        if df.empty:
-            print("No session data available.")
-            return
-        
-        feature_cols = ['focus_level', 'duration_minutes']
-        X = df[feature_cols].copy()
-        
-        X_clean = preprocessing.clean_data(X.assign(test_score=df['test_score'])).drop('test_score', axis=1)
-        
-        predictions = predict.predict(mod, X_clean)
+        if args.focus is not None or args.duration is not None:
+            df = pd.DataFrame({'focus_level': [args.focus], 'duration_minutes': [args.duration]})
+        else:
+            df = analytics.df_from_db(db=_db(args), cache=True)
+            if df.empty:
+                print("No session data available.")
+                return
+        
+        if args.server:
+            rows = df[pipeline.FEATURE_COLUMNS].astype('float64').to_dict('records')
+            rows = [{k: (None if pd.isna(v) else v) for k, v in row.items()} for row in rows]
+            predictions = pd.Series(client.predict_remote(rows, model_name, args.server))
+        else:
+            print(f"Loading model: {model_name}...")
+            mod = predict.load_pipeline(model_name, 'models')
+            predictions = mod.predict(df)
         
         print(f"\nPredictions from {model_name}:")
         print(f"Total predictions: {len(predictions)}")
@@ -516,14 +713,16 @@ def cmd_ml_predict(args):
 
 def cmd_ml_evaluate(args):
     try:
-        df = analytics.df_from_db()
+        df = analytics.df_from_db(db=_db(args), cache=True)
         if df.empty:
             print("No session data available.")
             return
         
         print(f"Loading {len(df)} sessions...")
         
-        feature_cols = ['focus_level', 'duration_minutes']
+        feature_cols = pipeline.FEATURE_COLUMNS
+        # Sessions without a test score have no target to learn from.
+        df = df.dropna(subset=['test_score'])
         X = df[feature_cols].copy()
         y = df['test_score'].copy()
         X_clean = preprocessing.clean_data(X.assign(test_score=y)).drop('test_score', axis=1)
@@ -534,26 +733,11 @@ def cmd_ml_evaluate(args):
         print("\nModel Performance (Cross-Validation):")
         print("-" * 60)
         
-        lin_mod = train.LinearModel()
-        lin_mod.train(X_clean, y)
-        cv_lin = train.cross_validate_model(lin_mod, X_clean, y, cv_folds)
-        print(f"\nLinearModel:")
-        for metric, value in cv_lin.items():
-            print(f"  {metric:20s}: {value:.4f}")
-
-        rf_mod = train.RandomForestModel()
-        rf_mod.train(X_clean, y)
-        cv_rf = train.cross_validate_model(rf_mod, X_clean, y, cv_folds)
-        print(f"\nRandomForestModel:")
-        for metric, value in cv_rf.items():
-            print(f"  {metric:20s}: {value:.4f}")
-
-        gb_mod = train.GradientBoostingModel()
-        gb_mod.train(X_clean, y)
-        cv_gb = train.cross_validate_model(gb_mod, X_clean, y, cv_folds)
-        print(f"\nGradientBoostingModel:")
-        for metric, value in cv_gb.items():
-            print(f"  {metric:20s}: {value:.4f}")
+        results = train.cross_validate_all_models(X_clean, y, cv_folds, jobs=args.jobs)
+        for name, metrics in results.items():
+            print(f"\n{name}:")
+            for metric, value in metrics.items():
+                print(f"  {metric:20s}: {value:.4f}")
         
     except Exception as e:
         print(f"Error during evaluation: {e}")
@@ -563,20 +747,19 @@ def cmd_ml_evaluate(args):
 
 def cmd_ml_list_models(args):
     try:
-        import os
-        model_dir = 'models'
-        if not os.path.exists(model_dir):
+        entries = registry.get_registry('models').entries()
+        if not entries:
             print("No models found. Train models first with 'ml-train'")
             return
         
-        models = [f[:-4] for f in os.listdir(model_dir) if f.endswith('.pkl')]
-        if not models:
-            print("No models found.")
-            return
-        
         print("Trained Models:")
-        for m in sorted(models):
-            print(f"  - {m}")
+        for name, entry in entries.items():
+            if 'version' not in entry:
+                print(f"  - {name} (not indexed, {entry['size_bytes']} bytes)")
+                continue
+            r2 = entry['metrics'].get('r2')
+            score = f", r2 {r2:.4f}" if r2 is not None else ""
+            print(f"  - {name} v{entry['version']} ({entry['estimator']}{score}, {entry['size_bytes']} bytes)")
         
     except Exception as e:
         print(f"Error: {e}")
@@ -585,11 +768,7 @@ def cmd_ml_list_models(args):
 def cmd_ml_delete_model(args):
     try:
         model_name = args.model_name
-        import os
-        filepath = f"models/{model_name}.pkl"
-        
-        if os.path.exists(filepath):
-            os.remove(filepath)
+        if registry.get_registry('models').delete(model_name):
             print(f"Deleted {model_name}")
         else:
             print(f"Model not found: {model_name}")
@@ -605,19 +784,14 @@ def cmd_ml_ensemble_predict(args):
         
         print(f"Loading ensemble: {', '.join(model_names)}...")
         
-        models_dict = predict.load_all_models(model_names, 'models')
+        models_dict = predict.load_all_pipelines(model_names, 'models')
         
-        df = analytics.df_from_db()
+        df = analytics.df_from_db(db=_db(args), cache=True)
         if df.empty:
             print("No session data available.")
             return
         
-        feature_cols = ['focus_level', 'duration_minutes']
-        X = df[feature_cols].copy()
-        
-        X_clean = preprocessing.clean_data(X.assign(test_score=df['test_score'])).drop('test_score', axis=1)
-        
-        ensemble_preds = predict.ensemble_predict(models_dict, X_clean, ensemble_method)
+        ensemble_preds = predict.ensemble_predict(models_dict, df, ensemble_method)
         
         print(f"\nEnsemble Prediction ({ensemble_method}):")
         print(f"Total predictions: {len(ensemble_preds)}")
@@ -639,14 +813,39 @@ def cmd_ml_ensemble_predict(args):
 def cmd_ml_info(args):
     try:
         model_name = args.model_name
-        mod = predict.load_model(model_name, 'models')
+        entry = registry.get_registry('models').info(model_name)
         
         print(f"Model: {model_name}")
-        print(f"Type: {type(mod).__name__}")
-        print(f"Loaded from: models/{model_name}.pkl")
+        if 'version' not in entry:
+            print("Not in the model index (saved before it existed); retrain it with 'ml-train'")
+        else:
+            print(f"Version: {entry['version']}")
+            print(f"Type: {entry['type']}")
+            print(f"Pipeline version: {entry['pipeline_version']}")
+            print(f"Estimator: {entry['estimator']}")
+            print(f"Features: {', '.join(entry['features'])}")
+            print(f"Trained at: {entry['trained_at']}")
+            print(f"Training data: {entry['data_fingerprint']}")
+            for metric_name, value in entry['metrics'].items():
+                print(f"  {metric_name:10s}: {value:.4f}")
+        print(f"Size: {entry['size_bytes']} bytes")
+        print(f"File: models/{entry['file']}")
         
     except Exception as e:
         print(f"Error: {e}")
 
+def cmd_ml_serve(args):
+    models = [m for m in args.models.split(',') if m]
+    try:
+        server.serve(
+            args.address, 'models', models, args.max_batch_rows, args.batch_wait_ms / 1000,
+            ready=lambda _: print(f"Serving {', '.join(models)} on {args.address}", flush=True),
+        )
+    except KeyboardInterrupt:
+        pass
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
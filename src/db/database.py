@@ -1,9 +1,17 @@
+import logging
 import os
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
 from src.models.session import SessionRecord
+from src.models.session_batch import SessionBatch
 from src.models.subject import Subject
 
+logger = logging.getLogger(__name__)
+
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS subjects (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -25,120 +33,729 @@ CREATE TABLE IF NOT EXISTS learning_sessions (
 CREATE INDEX IF NOT EXISTS idx_session_date ON learning_sessions(start_timestamp);
 """
 
+# Applied to every connection, in order. Both profiles use WAL so readers
+# keep going while a writer holds its transaction; "durable" fsyncs on every
+# commit, "fast" only at checkpoints and adds a larger cache and mmap window.
+# foreign_keys makes deleting a subject cascade to its sessions, which fires
+# the session delete triggers that keep the summary tables in step.
+PRAGMA_PROFILES = {
+    "durable": (
+        ("foreign_keys", "ON"),
+        ("busy_timeout", 5000),
+        ("journal_mode", "WAL"),
+        ("synchronous", "FULL"),
+    ),
+    "fast": (
+        ("foreign_keys", "ON"),
+        ("busy_timeout", 5000),
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("cache_size", -64000),
+        ("mmap_size", 268435456),
+        ("temp_store", "MEMORY"),
+    ),
+    # Opens the file with mode=ro and leaves its journal mode alone, for
+    # reading databases this process does not own.
+    "readonly": (
+        ("busy_timeout", 5000),
+        ("query_only", "ON"),
+        ("cache_size", -64000),
+        ("temp_store", "MEMORY"),
+    ),
+}
+
+# Per-subject daily and weekly (Monday-start) totals over learning_sessions,
+# kept current by the triggers below on every insert, update and delete.
+ROLLUP_TABLES = {
+    "daily_rollups": ("day", "date({row}.start_timestamp)"),
+    "weekly_rollups": ("week_start", "date({row}.start_timestamp, 'weekday 0', '-6 days')"),
+}
+
+_ROLLUP_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    subject_id INTEGER NOT NULL,
+    {key} TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    sessions INTEGER NOT NULL,
+    focus_sum INTEGER NOT NULL,
+    score_sum INTEGER NOT NULL,
+    score_count INTEGER NOT NULL,
+    PRIMARY KEY (subject_id, {key})
+) WITHOUT ROWID;
+"""
+
+_ROLLUP_ADD = """
+    INSERT INTO {table} (subject_id, {key}, minutes, sessions, focus_sum, score_sum, score_count)
+    VALUES (NEW.subject_id, {bucket}, NEW.duration_minutes, 1, NEW.focus_level,
+            COALESCE(NEW.test_score, 0), NEW.test_score IS NOT NULL)
+    ON CONFLICT (subject_id, {key}) DO UPDATE SET
+        minutes = minutes + excluded.minutes,
+        sessions = sessions + 1,
+        focus_sum = focus_sum + excluded.focus_sum,
+        score_sum = score_sum + excluded.score_sum,
+        score_count = score_count + excluded.score_count;
+"""
+
+_ROLLUP_REMOVE = """
+    UPDATE {table} SET
+        minutes = minutes - OLD.duration_minutes,
+        sessions = sessions - 1,
+        focus_sum = focus_sum - OLD.focus_level,
+        score_sum = score_sum - COALESCE(OLD.test_score, 0),
+        score_count = score_count - (OLD.test_score IS NOT NULL)
+    WHERE subject_id = OLD.subject_id AND {key} = {bucket};
+    DELETE FROM {table} WHERE subject_id = OLD.subject_id AND {key} = {bucket} AND sessions <= 0;
+"""
+
+_ROLLUP_REBUILD = """
+INSERT INTO {table} (subject_id, {key}, minutes, sessions, focus_sum, score_sum, score_count)
+SELECT subject_id, {bucket}, SUM(duration_minutes), COUNT(*), SUM(focus_level),
+       COALESCE(SUM(test_score), 0), COUNT(test_score)
+FROM learning_sessions
+GROUP BY 1, 2
+"""
+
+
+def _rollup_ddl():
+    add, remove, tables = [], [], []
+    for table, (key, bucket) in ROLLUP_TABLES.items():
+        tables.append(_ROLLUP_TABLE.format(table=table, key=key))
+        add.append(_ROLLUP_ADD.format(table=table, key=key, bucket=bucket.format(row="NEW")))
+        remove.append(_ROLLUP_REMOVE.format(table=table, key=key, bucket=bucket.format(row="OLD")))
+    return tables + [
+        f"CREATE TRIGGER IF NOT EXISTS trg_rollup_insert AFTER INSERT ON learning_sessions BEGIN {''.join(add)} END;",
+        f"CREATE TRIGGER IF NOT EXISTS trg_rollup_delete AFTER DELETE ON learning_sessions BEGIN {''.join(remove)} END;",
+        "CREATE TRIGGER IF NOT EXISTS trg_rollup_update AFTER UPDATE OF "
+        "subject_id, start_timestamp, duration_minutes, focus_level, test_score ON learning_sessions "
+        f"BEGIN {''.join(remove)}{''.join(add)} END;",
+    ]
+
+
+def _rebuild_rollups(conn):
+    for table, (key, bucket) in ROLLUP_TABLES.items():
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(_ROLLUP_REBUILD.format(table=table, key=key, bucket=bucket.format(row="learning_sessions")))
+
+
+def _add_rollups(conn):
+    for statement in _rollup_ddl():
+        conn.execute(statement)
+    _rebuild_rollups(conn)
+
+
+# Single-row counter bumped by every write to subjects or learning_sessions.
+# It persists across connections and processes, so readers can compare it
+# to decide whether anything derived from the tables is stale.
+_CHANGE_COUNTER = [
+    "CREATE TABLE IF NOT EXISTS change_counter (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO change_counter (id, version) VALUES (1, 0)",
+] + [
+    f"CREATE TRIGGER IF NOT EXISTS trg_change_{table}_{event.lower()} AFTER {event} ON {table} "
+    "BEGIN UPDATE change_counter SET version = version + 1 WHERE id = 1; END"
+    for table in ("subjects", "learning_sessions")
+    for event in ("INSERT", "UPDATE", "DELETE")
+]
+
+
+def _add_change_counter(conn):
+    for statement in _CHANGE_COUNTER:
+        conn.execute(statement)
+
+
+# Running aggregates over every learning_sessions row, kept current by the
+# trg_stats_* triggers so overall metrics can be read without scanning
+# sessions. Sums are exact integers and are retracted on delete/update;
+# streak_runs holds maximal runs of consecutive study days and is merged
+# or split as days gain their first or lose their last session.
+_STATS_TABLES = [
+    """CREATE TABLE IF NOT EXISTS session_totals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        sessions INTEGER NOT NULL DEFAULT 0,
+        minutes INTEGER NOT NULL DEFAULT 0,
+        focus_sum INTEGER NOT NULL DEFAULT 0,
+        scored INTEGER NOT NULL DEFAULT 0,
+        score_sum INTEGER NOT NULL DEFAULT 0,
+        score_sq INTEGER NOT NULL DEFAULT 0,
+        scored_focus_sum INTEGER NOT NULL DEFAULT 0,
+        scored_focus_sq INTEGER NOT NULL DEFAULT 0,
+        focus_score INTEGER NOT NULL DEFAULT 0
+    )""",
+    """CREATE TABLE IF NOT EXISTS subject_totals (
+        subject_id INTEGER PRIMARY KEY,
+        sessions INTEGER NOT NULL,
+        minutes INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS session_histograms (
+        kind TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        sessions INTEGER NOT NULL,
+        PRIMARY KEY (kind, bucket)
+    ) WITHOUT ROWID""",
+    "CREATE TABLE IF NOT EXISTS study_days (day TEXT PRIMARY KEY, sessions INTEGER NOT NULL) WITHOUT ROWID",
+    "CREATE TABLE IF NOT EXISTS streak_runs (start_day TEXT PRIMARY KEY, end_day TEXT NOT NULL) WITHOUT ROWID",
+    "CREATE INDEX IF NOT EXISTS idx_streak_end ON streak_runs(end_day)",
+    "CREATE INDEX IF NOT EXISTS idx_streak_length ON streak_runs((julianday(end_day) - julianday(start_day)))",
+]
+
+_HISTOGRAMS = {
+    "hour": "CAST(strftime('%H', {row}.start_timestamp) AS INTEGER)",
+    "weekday": "CAST(strftime('%w', {row}.start_timestamp) AS INTEGER)",
+}
+
+_STATS_TOTALS = """
+    UPDATE session_totals SET
+        sessions = sessions {op} 1,
+        minutes = minutes {op} {row}.duration_minutes,
+        focus_sum = focus_sum {op} {row}.focus_level,
+        scored = scored {op} ({row}.test_score IS NOT NULL),
+        score_sum = score_sum {op} COALESCE({row}.test_score, 0),
+        score_sq = score_sq {op} COALESCE({row}.test_score * {row}.test_score, 0),
+        scored_focus_sum = scored_focus_sum {op} IIF({row}.test_score IS NULL, 0, {row}.focus_level),
+        scored_focus_sq = scored_focus_sq {op} IIF({row}.test_score IS NULL, 0, {row}.focus_level * {row}.focus_level),
+        focus_score = focus_score {op} COALESCE({row}.focus_level * {row}.test_score, 0)
+    WHERE id = 1;
+"""
+
+_STATS_ADD = """
+    INSERT INTO subject_totals (subject_id, sessions, minutes) VALUES (NEW.subject_id, 1, NEW.duration_minutes)
+    ON CONFLICT (subject_id) DO UPDATE SET sessions = sessions + 1, minutes = minutes + excluded.minutes;
+    INSERT INTO study_days (day, sessions) VALUES (date(NEW.start_timestamp), 1)
+    ON CONFLICT (day) DO UPDATE SET sessions = sessions + 1;
+"""
+
+_STATS_REMOVE = """
+    UPDATE subject_totals SET sessions = sessions - 1, minutes = minutes - OLD.duration_minutes
+    WHERE subject_id = OLD.subject_id;
+    DELETE FROM subject_totals WHERE subject_id = OLD.subject_id AND sessions <= 0;
+    UPDATE study_days SET sessions = sessions - 1 WHERE day = date(OLD.start_timestamp);
+    DELETE FROM study_days WHERE day = date(OLD.start_timestamp) AND sessions <= 0;
+"""
+
+_HISTOGRAM_ADD = """
+    INSERT INTO session_histograms (kind, bucket, sessions) VALUES ('{kind}', {bucket}, 1)
+    ON CONFLICT (kind, bucket) DO UPDATE SET sessions = sessions + 1;
+"""
+
+_HISTOGRAM_REMOVE = """
+    UPDATE session_histograms SET sessions = sessions - 1 WHERE kind = '{kind}' AND bucket = {bucket};
+    DELETE FROM session_histograms WHERE kind = '{kind}' AND bucket = {bucket} AND sessions <= 0;
+"""
+
+# A new study day extends the run ending the day before (or starts a run)
+# and absorbs the run starting the day after; losing a day splits the run
+# that contained it.
+_STREAK_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS trg_streak_day_added AFTER INSERT ON study_days BEGIN
+        UPDATE streak_runs
+        SET end_day = COALESCE((SELECT end_day FROM streak_runs WHERE start_day = date(NEW.day, '+1 day')), NEW.day)
+        WHERE end_day = date(NEW.day, '-1 day');
+        INSERT INTO streak_runs (start_day, end_day)
+        SELECT NEW.day, COALESCE((SELECT end_day FROM streak_runs WHERE start_day = date(NEW.day, '+1 day')), NEW.day)
+        WHERE NOT EXISTS (SELECT 1 FROM streak_runs WHERE start_day <= NEW.day AND end_day >= NEW.day);
+        DELETE FROM streak_runs WHERE start_day = date(NEW.day, '+1 day');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_streak_day_removed AFTER DELETE ON study_days BEGIN
+        INSERT INTO streak_runs (start_day, end_day)
+        SELECT date(OLD.day, '+1 day'), end_day FROM streak_runs
+        WHERE start_day <= OLD.day AND end_day > OLD.day;
+        UPDATE streak_runs SET end_day = date(OLD.day, '-1 day')
+        WHERE start_day < OLD.day AND end_day >= OLD.day;
+        DELETE FROM streak_runs WHERE start_day = OLD.day;
+    END""",
+]
+
+_STATS_REBUILD = [
+    "DELETE FROM session_totals",
+    """INSERT INTO session_totals
+    SELECT 1, COUNT(*), COALESCE(SUM(duration_minutes), 0), COALESCE(SUM(focus_level), 0),
+           COUNT(test_score), COALESCE(SUM(test_score), 0), COALESCE(SUM(test_score * test_score), 0),
+           COALESCE(SUM(IIF(test_score IS NULL, 0, focus_level)), 0),
+           COALESCE(SUM(IIF(test_score IS NULL, 0, focus_level * focus_level)), 0),
+           COALESCE(SUM(focus_level * test_score), 0)
+    FROM learning_sessions""",
+    "DELETE FROM subject_totals",
+    """INSERT INTO subject_totals (subject_id, sessions, minutes)
+    SELECT subject_id, COUNT(*), SUM(duration_minutes) FROM learning_sessions GROUP BY subject_id""",
+    "DELETE FROM session_histograms",
+] + [
+    f"""INSERT INTO session_histograms (kind, bucket, sessions)
+    SELECT '{kind}', {bucket.format(row="learning_sessions")}, COUNT(*) FROM learning_sessions GROUP BY 2"""
+    for kind, bucket in _HISTOGRAMS.items()
+] + [
+    # Drop the runs before the days so the day-removed trigger has nothing to split.
+    "DELETE FROM streak_runs",
+    "DELETE FROM study_days",
+    "INSERT INTO study_days (day, sessions) SELECT date(start_timestamp), COUNT(*) FROM learning_sessions GROUP BY 1",
+    "DELETE FROM streak_runs",
+    """INSERT INTO streak_runs (start_day, end_day)
+    SELECT MIN(day), MAX(day) FROM (
+        SELECT day, julianday(day) - ROW_NUMBER() OVER (ORDER BY day) AS island FROM study_days
+    ) GROUP BY island""",
+]
+
+
+def _stats_ddl():
+    add = [_STATS_TOTALS.format(op="+", row="NEW"), _STATS_ADD]
+    remove = [_STATS_TOTALS.format(op="-", row="OLD"), _STATS_REMOVE]
+    for kind, bucket in _HISTOGRAMS.items():
+        add.append(_HISTOGRAM_ADD.format(kind=kind, bucket=bucket.format(row="NEW")))
+        remove.append(_HISTOGRAM_REMOVE.format(kind=kind, bucket=bucket.format(row="OLD")))
+    return _STATS_TABLES + _STREAK_TRIGGERS + [
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_insert AFTER INSERT ON learning_sessions BEGIN {''.join(add)} END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_stats_delete AFTER DELETE ON learning_sessions BEGIN {''.join(remove)} END",
+        "CREATE TRIGGER IF NOT EXISTS trg_stats_update AFTER UPDATE OF "
+        "subject_id, start_timestamp, duration_minutes, focus_level, test_score ON learning_sessions "
+        f"BEGIN {''.join(remove)}{''.join(add)} END",
+    ]
+
+
+def _rebuild_stats(conn):
+    for statement in _STATS_REBUILD:
+        conn.execute(statement)
+
+
+def _add_stats(conn):
+    for statement in _stats_ddl():
+        conn.execute(statement)
+    _rebuild_stats(conn)
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# Every subject belongs to a learner and sessions carry their subject's
+# learner_id, so one database can hold a whole cohort. subjects is rebuilt
+# because its name must now be unique per learner rather than globally.
+_LEARNER_SUBJECTS = [
+    "DROP TABLE IF EXISTS subjects_new",
+    """CREATE TABLE subjects_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        learner_id INTEGER NOT NULL DEFAULT 1,
+        UNIQUE (learner_id, name)
+    )""",
+    "INSERT INTO subjects_new (id, name) SELECT id, name FROM subjects",
+    # Carry the AUTOINCREMENT high-water mark over so deleted ids stay unused.
+    "DELETE FROM sqlite_sequence WHERE name = 'subjects_new'",
+    "UPDATE sqlite_sequence SET name = 'subjects_new' WHERE name = 'subjects'",
+    "DROP TABLE subjects",
+    "ALTER TABLE subjects_new RENAME TO subjects",
+]
+
+_LEARNER_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_session_learner_start ON learning_sessions(learner_id, start_timestamp)",
+    """CREATE INDEX IF NOT EXISTS idx_session_learner_metrics
+        ON learning_sessions(learner_id, subject_id, duration_minutes, focus_level, test_score)""",
+]
+
+
+def _add_learners(conn):
+    # Each part is skipped when already applied, so the step can be re-run.
+    if "learner_id" not in _columns(conn, "subjects"):
+        for statement in _LEARNER_SUBJECTS:
+            conn.execute(statement)
+    if "learner_id" not in _columns(conn, "learning_sessions"):
+        conn.execute("ALTER TABLE learning_sessions ADD COLUMN learner_id INTEGER NOT NULL DEFAULT 1")
+    for statement in _LEARNER_INDEXES:
+        conn.execute(statement)
+    # Dropping subjects dropped its change-counter triggers.
+    _add_change_counter(conn)
+
+
+def _add_database_id(conn):
+    # A random id per database file, so state derived from one database
+    # (cached frames) is never mistaken for another's when the file is
+    # recreated and its change counter starts over.
+    if "db_id" not in _columns(conn, "change_counter"):
+        conn.execute("ALTER TABLE change_counter ADD COLUMN db_id TEXT")
+    conn.execute("UPDATE change_counter SET db_id = lower(hex(randomblob(16))) WHERE db_id IS NULL")
+
+
+_ORPHAN_SESSIONS = "FROM learning_sessions WHERE subject_id NOT IN (SELECT id FROM subjects)"
+
+
+def _quarantine_orphan_sessions(conn):
+    # Sessions left behind by subjects deleted while foreign keys were off
+    # are moved to orphaned_sessions rather than dropped, so they can be
+    # restored by hand; the delete triggers retract them from the summary
+    # tables.
+    conn.execute(f"CREATE TABLE IF NOT EXISTS orphaned_sessions AS SELECT * {_ORPHAN_SESSIONS} AND 0")
+    moved = conn.execute(f"INSERT INTO orphaned_sessions SELECT * {_ORPHAN_SESSIONS}").rowcount
+    conn.execute(f"DELETE {_ORPHAN_SESSIONS}")
+    if moved:
+        logger.warning(
+            "Moved %d sessions whose subject no longer exists from learning_sessions to orphaned_sessions", moved
+        )
+
+
+# Ordered (version, step) pairs applied on top of SCHEMA. A step is either a
+# SQL script or a callable taking the connection; it runs in its own
+# transaction together with the PRAGMA user_version bump, so a failed step
+# leaves the database at the previous version. Steps must be idempotent
+# (IF NOT EXISTS, PRAGMA table_info checks) because databases created before
+# versioning start at 0.
+MIGRATIONS = [
+    (1, """
+    CREATE INDEX IF NOT EXISTS idx_session_subject_start
+        ON learning_sessions(subject_id, start_timestamp);
+    CREATE INDEX IF NOT EXISTS idx_session_subject_metrics
+        ON learning_sessions(subject_id, duration_minutes, focus_level, test_score);
+    """),
+    (2, _add_rollups),
+    (3, _add_change_counter),
+    (4, _add_stats),
+    (5, _add_learners),
+    (6, _add_database_id),
+    (7, _quarantine_orphan_sessions),
+]
+
+# Sessions take learner_id from their subject on every insert and update.
+INSERT_SESSION = """
+INSERT INTO learning_sessions (subject_id, start_timestamp, duration_minutes, focus_level, test_score, notes, learner_id)
+VALUES (?1, ?2, ?3, ?4, ?5, ?6, COALESCE((SELECT learner_id FROM subjects WHERE id = ?1), 1))
+"""
+
+INSERT_SUBJECT = "INSERT INTO subjects (name, learner_id) VALUES (?, ?)"
+SELECT_SUBJECTS = "SELECT * FROM subjects ORDER BY id"
+SELECT_LEARNER_SUBJECTS = "SELECT * FROM subjects WHERE learner_id = ? ORDER BY id"
+SELECT_LEARNERS = "SELECT DISTINCT learner_id FROM subjects ORDER BY learner_id"
+SELECT_SUBJECT = "SELECT * FROM subjects WHERE id = ?"
+UPDATE_SUBJECT = "UPDATE subjects SET name = ? WHERE id = ?"
+DELETE_SUBJECT = "DELETE FROM subjects WHERE id = ?"
+SELECT_SESSION = "SELECT * FROM learning_sessions WHERE id = ?"
+UPDATE_SESSION = """
+UPDATE learning_sessions
+SET subject_id = ?1, start_timestamp = ?2, duration_minutes = ?3, focus_level = ?4, test_score = ?5, notes = ?6,
+    learner_id = COALESCE((SELECT learner_id FROM subjects WHERE id = ?1), learner_id)
+WHERE id = ?7
+"""
+DELETE_SESSION = "DELETE FROM learning_sessions WHERE id = ?"
+LIST_SESSIONS = "SELECT * FROM learning_sessions WHERE id > ? ORDER BY id LIMIT ?"
+ITER_SESSIONS = "SELECT * FROM learning_sessions WHERE id > ? ORDER BY id"
+LIST_SESSIONS_FOR_SUBJECT = """
+SELECT * FROM learning_sessions
+WHERE subject_id = ?
+ORDER BY start_timestamp DESC
+LIMIT ?
+"""
+SELECT_SESSION_BATCH = """
+SELECT id, subject_id, CAST(strftime('%s', start_timestamp) AS INTEGER),
+       duration_minutes, focus_level, COALESCE(test_score, -1)
+FROM learning_sessions
+WHERE id > ?
+ORDER BY id
+"""
+
+# Every query DatabaseManager issues, with sample parameters for EXPLAIN QUERY
+# PLAN and whether walking the whole table or index is the intended plan.
+# sql_analytics and incremental add their queries when imported.
+QUERY_CATALOG = {
+    "add_subject": (INSERT_SUBJECT, ("x", 1), False),
+    "get_subjects": (SELECT_SUBJECTS, (), True),
+    "get_learner_subjects": (SELECT_LEARNER_SUBJECTS, (1,), False),
+    "learner_ids": (SELECT_LEARNERS, (), True),
+    "get_subject": (SELECT_SUBJECT, (1,), False),
+    "update_subject": (UPDATE_SUBJECT, ("x", 1), False),
+    "delete_subject": (DELETE_SUBJECT, (1,), False),
+    "add_session": (INSERT_SESSION, (1, "2026-01-01 00:00:00", 1, 1, None, None), False),
+    "get_session": (SELECT_SESSION, (1,), False),
+    "update_session": (UPDATE_SESSION, (1, "2026-01-01 00:00:00", 1, 1, None, None, 1), False),
+    "delete_session": (DELETE_SESSION, (1,), False),
+    "list_sessions": (LIST_SESSIONS, (0, 10), False),
+    "iter_sessions": (ITER_SESSIONS, (0,), False),
+    "load_session_batch": (SELECT_SESSION_BATCH, (0,), False),
+    "list_sessions_for_subject": (LIST_SESSIONS_FOR_SUBJECT, (1, 100), False),
+}
+
+
+def _split_script(script: str):
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            if statement.strip():
+                yield statement.strip()
+            statement = ""
+    if statement.strip():
+        yield statement.strip()
+
+
+def is_full_scan(detail: str) -> bool:
+    # "SCAN t USING COVERING INDEX i" still reads every entry of the index.
+    return detail.startswith("SCAN") and detail != "SCAN CONSTANT ROW"
+
 class DatabaseManager:
-    def __init__(self, db_path: str | None = None):
+    """SQLite access layer.
+
+    With ``pool_size=0`` (the default) every call opens and closes its own
+    connection. A positive ``pool_size`` keeps up to that many idle
+    connections open and hands them back out, so repeated calls reuse warm
+    connections; call ``close()`` or use the manager as a context manager to
+    release them.
+
+    ``profile`` picks the pragma set from ``PRAGMA_PROFILES`` applied to each
+    new connection ("fast" by default, or ``DB_PROFILE`` from the
+    environment).
+    """
+
+    def __init__(self, db_path: str | None = None, pool_size: int = 0, profile: str | None = None):
         if db_path is None:
             db_path = os.environ.get("DB_PATH", "data/database.sqlite")
+        if profile is None:
+            profile = os.environ.get("DB_PROFILE", "fast")
+        if pool_size < 0:
+            raise ValueError(f"pool_size must be >= 0, got {pool_size}")
+        if profile not in PRAGMA_PROFILES:
+            raise ValueError(f"Unknown profile {profile!r}, expected one of {sorted(PRAGMA_PROFILES)}")
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.profile = profile
+        self._pool = queue.LifoQueue(maxsize=pool_size) if pool_size else None
+        self._pool_lock = threading.Lock()
+        self._closed = False
         p = Path(self.db_path)
         if p.parent and not p.parent.exists():
             p.parent.mkdir(parents=True, exist_ok=True)
 
     def _connect(self):
-            conn = sqlite3.connect(self.db_path)
+            if self.profile == "readonly":
+                conn = sqlite3.connect(
+                    Path(self.db_path).resolve().as_uri() + "?mode=ro", uri=True,
+                    check_same_thread=self._pool is None,
+                )
+            else:
+                conn = sqlite3.connect(self.db_path, check_same_thread=self._pool is None)
             conn.row_factory = sqlite3.Row 
+            for name, value in PRAGMA_PROFILES[self.profile]:
+                conn.execute(f"PRAGMA {name} = {value}")
             return conn
-    
-    def migrate(self):
-        conn = self._connect()
+
+    def _acquire(self):
+        if self._pool is not None:
+            try:
+                return self._pool.get_nowait()
+            except queue.Empty:
+                pass
+        return self._connect()
+
+    def _release(self, conn):
+        if self._pool is not None:
+            with self._pool_lock:
+                if not self._closed:
+                    try:
+                        self._pool.put_nowait(conn)
+                        return
+                    except queue.Full:
+                        pass
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self._acquire()
         try:
-            cur = conn.cursor()
-            cur.executescript(SCHEMA)
+            yield conn
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                conn.close()
+            else:
+                self._release(conn)
+            raise
+        else:
+            self._release(conn)
+
+    def close(self):
+        with self._pool_lock:
+            self._closed = True
+        if self._pool is None:
+            return
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def schema_version(self):
+        with self.connection() as conn:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        latest = MIGRATIONS[-1][0] if MIGRATIONS else 0
+        with self.connection() as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version >= latest and version > 0:
+                return version
+            if version == 0:
+                conn.executescript(SCHEMA)
+            # Table rebuilds drop subjects, which must not cascade to sessions.
+            foreign_keys = conn.execute("PRAGMA foreign_keys").fetchone()[0]
+            conn.execute("PRAGMA foreign_keys = OFF")
+            try:
+                for step, action in MIGRATIONS:
+                    if step <= version:
+                        continue
+                    # Each step takes the write lock on its own, so under WAL readers
+                    # keep working and a concurrent migrate() waits and then skips it.
+                    conn.execute("BEGIN IMMEDIATE")
+                    if conn.execute("PRAGMA user_version").fetchone()[0] >= step:
+                        conn.rollback()
+                        continue
+                    if callable(action):
+                        action(conn)
+                    else:
+                        for statement in _split_script(action):
+                            conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {step}")
+                    conn.commit()
+            finally:
+                conn.execute(f"PRAGMA foreign_keys = {foreign_keys}")
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+
+    def data_version(self):
+        """Counter that changes whenever subjects or sessions are written."""
+        with self.connection() as conn:
+            return conn.execute("SELECT version FROM change_counter WHERE id = 1").fetchone()[0]
+
+    def data_identity(self):
+        """``(database id, data_version())``; unlike the counter alone it
+        differs between a database and one recreated at the same path."""
+        with self.connection() as conn:
+            return tuple(conn.execute("SELECT db_id, version FROM change_counter WHERE id = 1").fetchone())
+
+    def rebuild_rollups(self):
+        """Recompute every trigger-maintained summary table from learning_sessions."""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            _rebuild_rollups(conn)
+            _rebuild_stats(conn)
             conn.commit()
-        finally:
-            conn.close()
+
+    def explain(self):
+        # Imported for the queries they add to QUERY_CATALOG.
+        from src.analytics import incremental, sql_analytics  # noqa: F401
+
+        report = []
+        with self.connection() as conn:
+            for name, (sql, params, scan_expected) in QUERY_CATALOG.items():
+                rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+                plan = [row["detail"] for row in rows]
+                full_scans = [d for d in plan if is_full_scan(d)]
+                report.append({
+                    "query": name,
+                    "plan": plan,
+                    "full_scan": bool(full_scans),
+                    "scan_expected": scan_expected,
+                })
+        return report
     
     def add_session(self, session):
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO learning_sessions (subject_id, start_timestamp, duration_minutes, focus_level, test_score, notes)
-                VALUES (?, ?, ?, ?, ?, ?)
-                """, session.to_tuple())
+            cur.execute(INSERT_SESSION, session.to_tuple())
             conn.commit()
             return cur.lastrowid
-        finally:
-            conn.close()
-    def add_subject(self, name: str):
-        conn = self._connect()
-        try:
+
+    def add_sessions(self, sessions, chunk_size: int = 1000):
+        """Insert many sessions with one ``executemany`` and commit per chunk.
+
+        ``sessions`` may mix ``SessionRecord`` objects, which were validated
+        when they were built and are inserted as-is, and plain mappings,
+        which go through ``SessionRecord.from_dict`` first. It may also be a
+        ``SessionBatch``, whose columns are inserted without building a
+        record per row. Chunks that were committed stay in place if a later
+        chunk fails. Returns the new ids in input order.
+        """
+        if chunk_size <= 0:
+            raise ValueError(f"chunk_size must be > 0, got {chunk_size}")
+        ids = []
+        if isinstance(sessions, SessionBatch):
+            it = iter(sessions.to_rows())
+        else:
+            it = (
+                s.to_tuple() if isinstance(s, SessionRecord) else SessionRecord.from_dict(s).to_tuple()
+                for s in sessions
+            )
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute("INSERT INTO subjects (name) VALUES (?)", (name,))
+            while True:
+                rows = list(islice(it, chunk_size))
+                if not rows:
+                    break
+                cur.executemany(INSERT_SESSION, rows)
+                # The chunk holds the write lock until commit, so its
+                # AUTOINCREMENT ids are contiguous and end at last_insert_rowid().
+                last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+                conn.commit()
+                ids.extend(range(last_id - len(rows) + 1, last_id + 1))
+        return ids
+    def add_subject(self, name: str, learner_id: int = 1):
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(INSERT_SUBJECT, (name, learner_id))
             conn.commit()
             return cur.lastrowid
-        finally:
-            conn.close()
 
-    def get_subjects(self):
-        conn = self._connect()
-        try:
+    def get_subjects(self, learner_id: int | None = None):
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM subjects ORDER BY id")
+            if learner_id is None:
+                cur.execute(SELECT_SUBJECTS)
+            else:
+                cur.execute(SELECT_LEARNER_SUBJECTS, (learner_id,))
             rows = cur.fetchall()
-            return [Subject(id=row["id"], name=row["name"]) for row in rows]
-        finally:
-            conn.close()
+            return [Subject(id=row["id"], name=row["name"], learner_id=row["learner_id"]) for row in rows]
+
+    def learner_ids(self):
+        with self.connection() as conn:
+            return [row[0] for row in conn.execute(SELECT_LEARNERS)]
+
     def get_subject(self, subject_id: int):
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute("SELECT * FROM subjects WHERE id = ?", (subject_id,))
+            cur.execute(SELECT_SUBJECT, (subject_id,))
             row = cur.fetchone()
             if row:
-                return Subject(id=row["id"], name=row["name"])
+                return Subject(id=row["id"], name=row["name"], learner_id=row["learner_id"])
             return None
-        finally:
-            conn.close()
 
     def update_subject(self, subject_id: int, name: str):
         if not name or not name.strip():
             raise ValueError("Subject name must be a non-empty string")
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute("UPDATE subjects SET name = ? WHERE id = ?", (name, subject_id))
+            cur.execute(UPDATE_SUBJECT, (name, subject_id))
             conn.commit()
             return cur.rowcount
-        finally:
-            conn.close()
 
     def delete_subject(self, subject_id: int):
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute("DELETE FROM subjects WHERE id = ?", (subject_id,))
+            cur.execute(DELETE_SUBJECT, (subject_id,))
             conn.commit()
             return cur.rowcount
-        finally:
-            conn.close()
     def get_session(self, session_id):
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT * FROM learning_sessions WHERE id = ?
-                """, (session_id,))
+            cur.execute(SELECT_SESSION, (session_id,))
             row = cur.fetchone()
             if row:
-                return SessionRecord.from_row(row)
+                return SessionRecord.from_trusted_row(row)
             return None
-        finally:
-            conn.close()
     def update_session(self, session: SessionRecord):
         if session.id is None:
             raise ValueError("session.id is required to update a session")
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
             cur.execute(
-                """
-                UPDATE learning_sessions
-                SET subject_id = ?, start_timestamp = ?, duration_minutes = ?, focus_level = ?, test_score = ?, notes = ?
-                WHERE id = ?
-                """,
+                UPDATE_SESSION,
                 (
                     session.subject_id,
                     session.get_start_timestamp(),
@@ -151,45 +768,62 @@ class DatabaseManager:
             )
             conn.commit()
             return cur.rowcount
-        finally:
-            conn.close()
 
     def delete_session(self, session_id: int):
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute("DELETE FROM learning_sessions WHERE id = ?", (session_id,))
+            cur.execute(DELETE_SESSION, (session_id,))
             conn.commit()
             return cur.rowcount
-        finally:
-            conn.close()
-    def list_sessions(self, limit = 10):
-        conn = self._connect()
-        try:
+    def list_sessions(self, limit = 10, after_id: int | None = None):
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT * FROM learning_sessions ORDER BY id LIMIT ?
-                """, (limit,))
+            cur.execute(LIST_SESSIONS, (after_id or 0, limit))
             rows = cur.fetchall()
-            return [SessionRecord.from_row(row) for row in rows]
-        finally:
-            conn.close()
+            return [SessionRecord.from_trusted_row(row) for row in rows]
+
+    def iter_sessions(self, after_id: int | None = None, batch_size: int = 500):
+        """Yield sessions in id order, reading ``batch_size`` rows at a time.
+
+        The connection stays checked out until the iterator is exhausted or
+        closed; memory use does not depend on the number of rows.
+        """
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be > 0, got {batch_size}")
+        with self.connection() as conn:
+            cur = conn.cursor()
+            cur.execute(ITER_SESSIONS, (after_id or 0,))
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield SessionRecord.from_trusted_row(row)
+
+    def iter_session_batches(self, after_id: int | None = None, batch_size: int = 65536):
+        """Like ``iter_sessions`` but yields a ``SessionBatch`` per
+        ``batch_size`` rows instead of one ``SessionRecord`` per row."""
+        if batch_size <= 0:
+            raise ValueError(f"batch_size must be > 0, got {batch_size}")
+        with self.connection() as conn:
+            cur = conn.execute(SELECT_SESSION_BATCH, (after_id or 0,))
+            while True:
+                batch = SessionBatch.from_rows(cur.fetchmany(batch_size))
+                if not len(batch):
+                    break
+                yield batch
+
+    def load_session_batch(self, after_id: int | None = None, chunk_size: int = 65536):
+        with self.connection() as conn:
+            cur = conn.execute(SELECT_SESSION_BATCH, (after_id or 0,))
+            return SessionBatch.from_cursor(cur, chunk_size=chunk_size)
+
     def get_sessions(self, limit: int = 10):
         return self.list_sessions(limit=limit)
     
     def list_sessions_for_subject(self, subject_id: int, limit: int = 100):
-        conn = self._connect()
-        try:
+        with self.connection() as conn:
             cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT * FROM learning_sessions 
-                WHERE subject_id = ? 
-                ORDER BY start_timestamp DESC 
-                LIMIT ?
-                """, (subject_id, limit))
+            cur.execute(LIST_SESSIONS_FOR_SUBJECT, (subject_id, limit))
             rows = cur.fetchall()
-            return [SessionRecord.from_row(row) for row in rows]
-        finally:
-            conn.close()
\ No newline at end of file
+            return [SessionRecord.from_trusted_row(row) for row in rows]
\ No newline at end of file
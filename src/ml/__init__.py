@@ -5,14 +5,21 @@ Simple ML functions for learning analytics:
 - Training: Train three regression models
 - Evaluation: Calculate performance metrics
 - Predictions: Load models and make predictions
+- Pipeline: Model plus the preprocessing it was trained with, saved together
+- Registry: Metadata index and load cache for saved models
+- Server/Client: Long-lived prediction service and its socket client
 """
 
-from . import preprocessing, features, train, model, predict
+from . import preprocessing, features, train, model, predict, pipeline, registry, server, client
 
 __all__ = [
     'preprocessing',
     'features', 
     'train',
     'model',
-    'predict'
+    'predict',
+    'pipeline',
+    'registry',
+    'server',
+    'client'
 ]
\ No newline at end of file
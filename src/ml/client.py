@@ -0,0 +1,58 @@
+"""Client for the prediction server (``src.ml.server``).
+
+Uses only the standard library. Requests and responses are one JSON
+object per line.
+"""
+import json
+import socket
+
+DEFAULT_ADDRESS = 'models/predict.sock'
+
+
+def parse_address(address):
+    """``host:port`` is a TCP address; anything else is a Unix socket path."""
+    host, sep, port = str(address).rpartition(':')
+    if sep and port.isdigit() and '/' not in host:
+        return host or '127.0.0.1', int(port)
+    return str(address)
+
+
+class PredictionClient:
+    """One connection to the server, reused across requests."""
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=5.0):
+        target = parse_address(address)
+        family = socket.AF_INET if isinstance(target, tuple) else socket.AF_UNIX
+        self.sock = socket.socket(family, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(target)
+        if family == socket.AF_INET:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.file = self.sock.makefile('rwb')
+
+    def predict(self, rows, model='RandomForest'):
+        """Predicted test scores for ``rows``, a list of feature dicts."""
+        self.file.write(json.dumps({'model': model, 'rows': rows}).encode() + b'\n')
+        self.file.flush()
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError("Prediction server closed the connection")
+        response = json.loads(line)
+        if 'error' in response:
+            raise ValueError(f"Prediction server: {response['error']}")
+        return response['predictions']
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def predict_remote(rows, model='RandomForest', address=DEFAULT_ADDRESS, timeout=5.0):
+    with PredictionClient(address, timeout) as client:
+        return client.predict(rows, model)
@@ -0,0 +1,69 @@
+import hashlib
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# Bumped whenever the pickled layout of InferencePipeline changes.
+PIPELINE_VERSION = 1
+FEATURE_COLUMNS = ['focus_level', 'duration_minutes']
+
+
+class InferencePipeline:
+    """Feature selection, cleaning, scaling and a trained model saved as one artifact.
+
+    ``cleaner`` holds what ``preprocessing.cleaner_params`` learned on the
+    training features: NaNs are filled with the training medians and values
+    are clipped to the training IQR fences instead of dropping rows, so
+    every input row gets a prediction.
+    """
+
+    def __init__(self, model, scaler, cleaner, features=None):
+        self.version = PIPELINE_VERSION
+        self.features = list(features or FEATURE_COLUMNS)
+        self.cleaner = cleaner
+        self.scaler = scaler
+        self.model = model
+        self.trained_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    def get_name(self):
+        return self.model.get_name()
+
+    def preprocessing_key(self):
+        """Identifies the transform, so pipelines from one training run share it."""
+        h = hashlib.sha1()
+        h.update(repr((self.features, sorted(self.cleaner.items()))).encode())
+        h.update(np.asarray(self.scaler.mean_).tobytes())
+        h.update(np.asarray(self.scaler.scale_).tobytes())
+        return h.hexdigest()
+
+    def transform(self, df):
+        missing = [c for c in self.features if c not in df]
+        if missing:
+            raise ValueError(f"Missing feature columns: {missing}")
+        # numpy rather than pandas fillna/clip: this runs on every served request.
+        fill, lower, upper = (
+            np.array([self.cleaner[key][col] for col in self.features], dtype='float64')
+            for key in ('fill', 'lower', 'upper')
+        )
+        X = df[self.features].to_numpy(dtype='float64')
+        X = np.clip(np.where(np.isnan(X), fill, X), lower, upper)
+        # StandardScaler.transform, with the column names the model was fitted with.
+        X = (X - self.scaler.mean_) / self.scaler.scale_
+        return pd.DataFrame(X, columns=self.features, index=df.index)
+
+    def predict_transformed(self, X):
+        return self.model.predict(X)
+
+    def predict(self, df):
+        return self.predict_transformed(self.transform(df))
+
+
+def check_pipeline(obj, name='model'):
+    if not isinstance(obj, InferencePipeline):
+        raise ValueError(
+            f"{name} was saved without its preprocessing (pre-pipeline format); retrain it with 'ml-train'"
+        )
+    if obj.version != PIPELINE_VERSION:
+        raise ValueError(f"{name} is pipeline version {obj.version}, expected {PIPELINE_VERSION}; retrain it")
+    return obj
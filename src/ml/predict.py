@@ -1,28 +1,32 @@
-import joblib
 import numpy as np
 import pandas as pd
-from pathlib import Path
+from src.ml.pipeline import InferencePipeline, check_pipeline
+from src.ml.registry import get_registry
 
 
-def save_model(model, model_name, model_dir='models'):
-    Path(model_dir).mkdir(exist_ok=True)
-    filepath = Path(model_dir) / f"{model_name}.pkl"
-    joblib.dump(model, filepath)
+def save_model(model, model_name, model_dir='models', metrics=None, fingerprint=None):
+    filepath = get_registry(model_dir).save(model_name, model, metrics, fingerprint)
     print(f"Model saved: {filepath}")
     return filepath
 
 
 def load_model(model_name, model_dir='models'):
-    filepath = Path(model_dir) / f"{model_name}.pkl"
-    if not filepath.exists():
-        raise FileNotFoundError(f"Model not found: {filepath}")
-    
-    model = joblib.load(filepath)
-    print(f"Model loaded: {filepath}")
+    model = get_registry(model_dir).load(model_name)
+    print(f"Model loaded: {model_dir}/{model_name}.pkl")
     return model
 
 
+def load_pipeline(model_name, model_dir='models'):
+    return check_pipeline(load_model(model_name, model_dir), model_name)
+
+
+def load_all_pipelines(model_names, model_dir='models'):
+    return {name: load_pipeline(name, model_dir) for name in model_names}
+
+
 def predict(model, X):
+    if isinstance(model, InferencePipeline):
+        return model.predict(X)
     if isinstance(X, pd.DataFrame):
         X = X.values
     return model.predict(X)
@@ -37,9 +41,10 @@ def predict_with_uncertainty(model, X):
         'uncertainty': uncertainty}
 
 
-def save_all_models(models_dict, model_dir='models'):
+def save_all_models(models_dict, model_dir='models', metrics=None, fingerprint=None):
+    metrics = metrics or {}
     for name, model in models_dict.items():
-        save_model(model, name, model_dir)
+        save_model(model, name, model_dir, metrics.get(name), fingerprint)
 
 
 def load_all_models(model_names, model_dir='models'):
@@ -51,9 +56,16 @@ def load_all_models(model_names, model_dir='models'):
 
 def ensemble_predict(models_dict, X, method='average'):
     predictions = []
-    
+    # Pipelines from the same training run share one transform of X.
+    transformed = {}
     for model in models_dict.values():
-        preds = predict(model, X)
+        if isinstance(model, InferencePipeline):
+            key = model.preprocessing_key()
+            if key not in transformed:
+                transformed[key] = model.transform(X)
+            preds = model.predict_transformed(transformed[key])
+        else:
+            preds = predict(model, X)
         predictions.append(preds)
     pred_array = np.array(predictions)
     if method == 'average':
@@ -24,6 +24,21 @@ def clean_data(df):
     return df
 
 
+def cleaner_params(X):
+    """Medians and IQR fences of ``X``'s numeric columns, for cleaning rows at inference time."""
+    numeric = X.select_dtypes(include=[np.number])
+    fill = numeric.median()
+    filled = numeric.fillna(fill)
+    q1 = filled.quantile(0.25)
+    q3 = filled.quantile(0.75)
+    iqr = q3 - q1
+    return {
+        'fill': {c: float(v) for c, v in fill.items()},
+        'lower': {c: float(v) for c, v in (q1 - 1.5 * iqr).items()},
+        'upper': {c: float(v) for c, v in (q3 + 1.5 * iqr).items()},
+    }
+
+
 def scale_features(X_train, X_test):
     scaler = StandardScaler()
     X_train_scaled = scaler.fit_transform(X_train)
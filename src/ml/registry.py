@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+INDEX_FILE = 'index.json'
+
+
+def data_fingerprint(X, y=None):
+    """Stable hash of the training rows, so a model can be traced to its data."""
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    if y is not None:
+        h.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """Saved models plus a JSON index of their metadata.
+
+    ``index.json`` in ``model_dir`` maps each model name to its version
+    (bumped on every save), pipeline format, training-data fingerprint,
+    metrics, feature schema, estimator type and file size, so listing and
+    inspecting models never unpickles them. ``load`` keeps up to
+    ``cache_size`` models in an LRU cache, reused while their indexed
+    version is unchanged. Models are saved uncompressed and loaded with
+    ``mmap_mode='r'``, so the arrays in the pickle are mapped rather than
+    read into intermediate buffers; sklearn trees still copy their node
+    tables on unpickling, so for forests this lowers peak load memory, not
+    resident size.
+    """
+
+    def __init__(self, model_dir='models', cache_size=4):
+        self.model_dir = Path(model_dir)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._index = None
+        self._index_mtime = None
+        self._lock = threading.Lock()
+
+    def _index_path(self):
+        return self.model_dir / INDEX_FILE
+
+    def _read_index(self):
+        path = self._index_path()
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._index_mtime:
+            with open(path, encoding='utf-8') as f:
+                self._index = json.load(f)['models']
+            self._index_mtime = mtime
+        return self._index
+
+    def _write_index(self, index):
+        self.model_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self._index_path().with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'models': index}, f, indent=2, sort_keys=True)
+        os.replace(tmp, self._index_path())
+        self._index = None
+        self._index_mtime = None
+
+    def save(self, name, obj, metrics=None, fingerprint=None):
+        """Write ``obj`` to ``<model_dir>/<name>.pkl`` and record it in the index."""
+        with self._lock:
+            self.model_dir.mkdir(parents=True, exist_ok=True)
+            path = self.model_dir / f"{name}.pkl"
+            # Uncompressed, so load() can memory-map the arrays. Written
+            # aside and renamed over the old file, so models already mapped
+            # from it keep reading the old data.
+            tmp = path.with_name(path.name + '.tmp')
+            joblib.dump(obj, tmp)
+            os.replace(tmp, path)
+            index = dict(self._read_index())
+            previous = index.get(name, {})
+            estimator = getattr(getattr(obj, 'model', None), 'model', None)
+            index[name] = {
+                'name': name,
+                'version': previous.get('version', 0) + 1,
+                'pipeline_version': getattr(obj, 'version', None),
+                'type': type(obj).__name__,
+                'estimator': type(estimator).__name__ if estimator is not None else None,
+                'features': list(getattr(obj, 'features', []) or []),
+                'trained_at': getattr(obj, 'trained_at', None),
+                'saved_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'data_fingerprint': fingerprint,
+                'metrics': {k: float(v) for k, v in (metrics or {}).items()},
+                'file': path.name,
+                'size_bytes': path.stat().st_size,
+            }
+            self._write_index(index)
+            self._cache.pop(name, None)
+        return path
+
+    def entries(self):
+        """Index entries by name. ``.pkl`` files missing from the index (saved
+        before the registry existed) are listed with only their file size."""
+        with self._lock:
+            index = dict(self._read_index())
+        if self.model_dir.exists():
+            for path in self.model_dir.glob('*.pkl'):
+                if path.stem not in index:
+                    index[path.stem] = {'name': path.stem, 'file': path.name, 'size_bytes': path.stat().st_size}
+        return dict(sorted(index.items()))
+
+    def info(self, name):
+        entry = self.entries().get(name)
+        if entry is None:
+            raise FileNotFoundError(f"Model not found: {self.model_dir / (name + '.pkl')}")
+        return entry
+
+    def load(self, name, mmap=True):
+        with self._lock:
+            version = self._read_index().get(name, {}).get('version')
+            hit = self._cache.get(name)
+            if hit is not None and version is not None and hit[0] == version:
+                self._cache.move_to_end(name)
+                return hit[1]
+            path = self.model_dir / f"{name}.pkl"
+            if not path.exists():
+                raise FileNotFoundError(f"Model not found: {path}")
+            obj = joblib.load(path, mmap_mode='r' if mmap else None)
+            if version is not None and self.cache_size > 0:
+                self._cache[name] = (version, obj)
+                self._cache.move_to_end(name)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return obj
+
+    def delete(self, name):
+        with self._lock:
+            path = self.model_dir / f"{name}.pkl"
+            index = dict(self._read_index())
+            found = path.exists() or name in index
+            if path.exists():
+                path.unlink()
+            if name in index:
+                del index[name]
+                self._write_index(index)
+            self._cache.pop(name, None)
+            return found
+
+
+_REGISTRIES = {}
+
+
+def get_registry(model_dir='models'):
+    """Shared registry per model directory, so its cache outlives a single call."""
+    key = os.path.abspath(model_dir)
+    if key not in _REGISTRIES:
+        _REGISTRIES[key] = ModelRegistry(model_dir)
+    return _REGISTRIES[key]
@@ -0,0 +1,204 @@
+"""Long-lived prediction server that keeps trained pipelines loaded.
+
+Listens on a Unix socket or a localhost TCP port (see
+``client.parse_address``). Each request line is
+``{"model": "RandomForest", "rows": [{"focus_level": 3, "duration_minutes": 40}, ...]}``
+and is answered with ``{"model": ..., "predictions": [...]}`` or
+``{"error": ...}``. ``"model": "ensemble"`` averages ``ENSEMBLE_MODELS``.
+
+Requests are handled with asyncio, and each model has a ``MicroBatcher``.
+Its predictions run on a worker thread, so the event loop keeps accepting
+requests while a batch is predicting; those are queued and then sent to the
+model together in the next ``predict`` call. Models come from the
+registry cache, so a model retrained with ``ml-train`` is picked up on the
+next batch.
+"""
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from src.ml import predict
+from src.ml.client import DEFAULT_ADDRESS, parse_address
+from src.ml.pipeline import FEATURE_COLUMNS, check_pipeline
+from src.ml.registry import get_registry
+
+ENSEMBLE_MODELS = ['LinearRegression', 'RandomForest', 'GradientBoosting']
+DEFAULT_MODELS = ['RandomForest', 'GradientBoosting', 'ensemble']
+MAX_BATCH_ROWS = 4096
+
+
+def rows_to_array(rows):
+    """``FEATURE_COLUMNS`` of each row dict as floats; missing values are NaN
+    and filled by the pipeline like any other missing feature."""
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("'rows' must be a list of objects")
+    values = [[row.get(col) for col in FEATURE_COLUMNS] for row in rows]
+    return np.array(values, dtype='float64').reshape(len(rows), len(FEATURE_COLUMNS))
+
+
+class MicroBatcher:
+    """Collects concurrent requests for one model into a single predict call.
+
+    After the first queued request it waits ``max_wait`` seconds (0 only
+    yields to the event loop, so requests that are already readable get
+    queued) and then takes everything queued, up to ``max_batch_rows``.
+    """
+
+    def __init__(self, predict_fn, max_batch_rows=MAX_BATCH_ROWS, max_wait=0.0):
+        self.predict_fn = predict_fn
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self._task = None
+        # One thread, so a model only ever predicts one batch at a time.
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='predict')
+
+    async def predict(self, X):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((X, future))
+        return await future
+
+    async def _run(self):
+        pending = None
+        while True:
+            batch = [pending or await self.queue.get()]
+            pending = None
+            await asyncio.sleep(self.max_wait)
+            rows = len(batch[0][0])
+            while not self.queue.empty():
+                item = self.queue.get_nowait()
+                if rows + len(item[0]) > self.max_batch_rows:
+                    pending = item  # starts the next batch
+                    break
+                batch.append(item)
+                rows += len(item[0])
+            await self._predict(batch)
+
+    def _predict_arrays(self, arrays):
+        return np.asarray(self.predict_fn(pd.DataFrame(np.concatenate(arrays), columns=FEATURE_COLUMNS)))
+
+    async def _predict(self, batch):
+        self.batches += 1
+        arrays = [X for X, _ in batch]
+        try:
+            preds = await asyncio.get_running_loop().run_in_executor(self._executor, self._predict_arrays, arrays)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for part, (_, future) in zip(np.split(preds, np.cumsum([len(X) for X in arrays])[:-1]), batch):
+            if not future.done():
+                future.set_result(part.tolist())
+
+    def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        self._executor.shutdown(wait=False)
+
+
+class PredictionServer:
+    def __init__(self, model_dir='models', models=None, max_batch_rows=MAX_BATCH_ROWS, max_wait=0.0):
+        self.registry = get_registry(model_dir)
+        self.registry.cache_size = max(self.registry.cache_size, len(ENSEMBLE_MODELS) + 1)
+        self.models = list(models or DEFAULT_MODELS)
+        self.max_batch_rows = max_batch_rows
+        self.max_wait = max_wait
+        self.batchers = {}
+
+    def _pipeline(self, name):
+        return check_pipeline(self.registry.load(name), name)
+
+    def predict_frame(self, name, df):
+        if name == 'ensemble':
+            return predict.ensemble_predict({m: self._pipeline(m) for m in ENSEMBLE_MODELS}, df)
+        return self._pipeline(name).predict(df)
+
+    def warm(self):
+        """Load every served model now, so a missing one fails at startup."""
+        for name in self.models:
+            for model_name in (ENSEMBLE_MODELS if name == 'ensemble' else [name]):
+                self._pipeline(model_name)
+
+    def batcher(self, name):
+        if name not in self.batchers:
+            if name not in self.models:
+                raise ValueError(f"Model {name!r} is not served; available: {', '.join(self.models)}")
+            self.batchers[name] = MicroBatcher(
+                lambda df: self.predict_frame(name, df), self.max_batch_rows, self.max_wait,
+            )
+        return self.batchers[name]
+
+    async def respond(self, request):
+        try:
+            model = request.get('model', self.models[0])
+            X = rows_to_array(request.get('rows'))
+            predictions = await self.batcher(model).predict(X) if len(X) else []
+            return {'model': model, 'predictions': predictions}
+        except Exception as e:
+            return {'error': f"{type(e).__name__}: {e}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {'error': f"Invalid JSON: {e}"}
+                else:
+                    response = await self.respond(request if isinstance(request, dict) else {})
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, address=DEFAULT_ADDRESS):
+        target = parse_address(address)
+        if isinstance(target, tuple):
+            return await asyncio.start_server(self.handle, *target)
+        if os.path.exists(target):
+            os.unlink(target)  # left behind by a server that did not shut down cleanly
+        return await asyncio.start_unix_server(self.handle, target)
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+async def _serve(server, address, ready=None):
+    try:
+        # Stop like on Ctrl-C, so the socket file is removed.
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass  # no signal handlers on Windows or outside the main thread
+    listener = await server.start(address)
+    if ready is not None:
+        ready(listener)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+        target = parse_address(address)
+        if not isinstance(target, tuple) and os.path.exists(target):
+            os.unlink(target)
+
+
+def serve(address=DEFAULT_ADDRESS, model_dir='models', models=None, max_batch_rows=MAX_BATCH_ROWS,
+          max_wait=0.0, ready=None):
+    """Warm the models and serve until interrupted."""
+    server = PredictionServer(model_dir, models, max_batch_rows, max_wait)
+    server.warm()
+    try:
+        asyncio.run(_serve(server, address, ready))
+    except asyncio.CancelledError:
+        pass
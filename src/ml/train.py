@@ -1,8 +1,15 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.model_selection import cross_val_score
+from sklearn.model_selection import cross_validate
 import numpy as np
 
+# Up to this many rows RandomForestModel.predict runs single-threaded.
+SMALL_BATCH_ROWS = 256
+
+
 class LinearModel:
     def __init__(self):
         self.model = LinearRegression()
@@ -40,6 +47,15 @@ class RandomForestModel:
     def predict(self, X):
         if not self.is_trained:
             raise ValueError("Model not trained yet")
+        n_jobs = self.model.n_jobs
+        if len(X) <= SMALL_BATCH_ROWS and n_jobs != 1:
+            # Spreading a handful of rows over worker threads costs more
+            # than predicting them in this thread.
+            self.model.set_params(n_jobs=1)
+            try:
+                return self.model.predict(X)
+            finally:
+                self.model.set_params(n_jobs=n_jobs)
         return self.model.predict(X)
     
     def get_name(self):
@@ -70,31 +86,74 @@ class GradientBoostingModel:
         return "GradientBoosting"
 
 
-def train_all_models(X_train, y_train):
-    models = {
-        'LinearRegression': LinearModel(),
-        'RandomForest': RandomForestModel(),
-        'GradientBoosting': GradientBoostingModel()
-    }
-    
-    for name, model in models.items():
-        print(f"Training {name}...")
-        model.train(X_train, y_train)
-    
-    return models
+MODEL_CLASSES = {
+    'LinearRegression': LinearModel,
+    'RandomForest': RandomForestModel,
+    'GradientBoosting': GradientBoostingModel,
+}
+
+
+def _workers(jobs, tasks):
+    if jobs is None or jobs < 1:
+        jobs = os.cpu_count() or 1
+    return min(jobs, tasks)
+
+
+def _run_all(fn, names, jobs, *args):
+    """{name: fn(name, *args)} for every model name, on a process pool when jobs > 1."""
+    workers = _workers(jobs, len(names))
+    if workers <= 1:
+        return {name: fn(name, *args) for name in names}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {name: pool.submit(fn, name, *args) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def _single_threaded(model_obj, parallel):
+    # Models that parallelise internally would oversubscribe the pool's workers.
+    if parallel and 'n_jobs' in model_obj.model.get_params():
+        model_obj.model.set_params(n_jobs=1)
+    return model_obj
+
+
+def _train_one(name, X_train, y_train, parallel=False):
+    model_obj = MODEL_CLASSES[name]()
+    n_jobs = model_obj.model.get_params().get('n_jobs')
+    _single_threaded(model_obj, parallel).train(X_train, y_train)
+    if n_jobs is not None:
+        model_obj.model.set_params(n_jobs=n_jobs)
+    return model_obj
+
+
+def _cross_validate_one(name, X, y, cv_folds, parallel=False):
+    return cross_validate_model(_single_threaded(MODEL_CLASSES[name](), parallel), X, y, cv_folds)
+
+
+def train_all_models(X_train, y_train, jobs=1):
+    """Train every model in MODEL_CLASSES; ``jobs`` > 1 trains them concurrently
+    in separate processes, ``jobs=None`` or ``0`` uses one per CPU."""
+    names = list(MODEL_CLASSES)
+    parallel = _workers(jobs, len(names)) > 1
+    print(f"Training {', '.join(names)}" + (" in parallel..." if parallel else "..."))
+    return _run_all(_train_one, names, jobs, X_train, y_train, parallel)
 
 
 def cross_validate_model(model_obj, X, y, cv_folds=5):
-    #R^2 score
-    r2_scores = cross_val_score(model_obj.model, X, y, cv=cv_folds, scoring='r2')
-    
-    #RMSE score
-    mse_scores = cross_val_score(model_obj.model, X, y, cv=cv_folds, scoring='neg_mean_squared_error')
-    rmse_scores = np.sqrt(-mse_scores)
-    
+    # One pass over the folds scores both metrics.
+    scores = cross_validate(model_obj.model, X, y, cv=cv_folds, scoring=('r2', 'neg_mean_squared_error'))
+    r2_scores = scores['test_r2']
+    rmse_scores = np.sqrt(-scores['test_neg_mean_squared_error'])
+
     return {
         'r2_mean': r2_scores.mean(),
         'r2_std': r2_scores.std(),
         'rmse_mean': rmse_scores.mean(),
         'rmse_std': rmse_scores.std()
-    }
\ No newline at end of file
+    }
+
+
+def cross_validate_all_models(X, y, cv_folds=5, jobs=1):
+    """cross_validate_model for every model in MODEL_CLASSES, one process per model when jobs > 1."""
+    names = list(MODEL_CLASSES)
+    parallel = _workers(jobs, len(names)) > 1
+    return _run_all(_cross_validate_one, names, jobs, X, y, cv_folds, parallel)
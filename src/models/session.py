@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 
-@dataclass
+@dataclass(slots=True)
 class SessionRecord:
     subject_id: int
     date: str # YYYY-MM-DD
@@ -48,4 +48,39 @@ class SessionRecord:
             focus_level=row["focus_level"],
             test_score=row["test_score"],
             notes=row["notes"],
-            id=row["id"],)
\ No newline at end of file
+            id=row["id"],)
+
+    @classmethod
+    def from_trusted_row(cls, row):
+        """Build from a learning_sessions row without re-running validation.
+
+        Only for rows read back from the database, where the table's CHECK
+        constraints already enforce the ranges ``__post_init__`` checks.
+        """
+        record = object.__new__(cls)
+        timestamp = row["start_timestamp"]
+        record.subject_id = row["subject_id"]
+        record.date = timestamp[:10]
+        record.start_time = timestamp[11:16]
+        record.duration_minutes = row["duration_minutes"]
+        record.focus_level = row["focus_level"]
+        record.test_score = row["test_score"]
+        record.notes = row["notes"]
+        record.id = row["id"]
+        return record
+
+    @classmethod
+    def from_dict(cls, data):
+        def optional_int(value):
+            return None if value is None or value == "" else int(value)
+
+        return cls(
+            subject_id=int(data["subject_id"]),
+            date=data["date"],
+            start_time=data.get("start_time") or None,
+            duration_minutes=int(data["duration_minutes"]),
+            focus_level=int(data["focus_level"]),
+            test_score=optional_int(data.get("test_score")),
+            notes=data.get("notes") or None,
+            id=optional_int(data.get("id")),
+        )
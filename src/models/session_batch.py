@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Column order expected from the cursor passed to SessionBatch.from_cursor.
+# start_timestamp arrives as unix seconds and test_score as -1 for NULL, so
+# every value is an integer and SQLite does the timestamp parsing.
+BATCH_COLUMNS = ("id", "subject_id", "start_seconds", "duration_minutes", "focus_level", "test_score")
+
+_INT16_MAX = np.iinfo(np.int16).max
+
+
+@dataclass(slots=True)
+class SessionBatch:
+    """Sessions stored column-wise in typed NumPy arrays.
+
+    Takes a fraction of the memory of a list of ``SessionRecord`` objects and
+    converts to a DataFrame without copying the column buffers.
+    """
+
+    ids: np.ndarray               # int64
+    subject_ids: np.ndarray       # int32
+    starts: np.ndarray            # datetime64[s]
+    durations: np.ndarray         # int16
+    focus_levels: np.ndarray      # int8
+    test_scores: np.ma.MaskedArray  # int8, masked where NULL
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        return (
+            self.ids.nbytes
+            + self.subject_ids.nbytes
+            + self.starts.nbytes
+            + self.durations.nbytes
+            + self.focus_levels.nbytes
+            + self.test_scores.data.nbytes
+            + np.ma.getmaskarray(self.test_scores).nbytes
+        )
+
+    @classmethod
+    def empty(cls):
+        return cls._from_matrix(np.empty((0, len(BATCH_COLUMNS)), dtype=np.int64))
+
+    @classmethod
+    def from_cursor(cls, cursor, chunk_size: int = 65536):
+        """Read every remaining row of ``cursor`` (columns as in BATCH_COLUMNS)."""
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunks.append(np.array(rows, dtype=np.int64).reshape(-1, len(BATCH_COLUMNS)))
+        if not chunks:
+            return cls.empty()
+        return cls._from_matrix(np.concatenate(chunks) if len(chunks) > 1 else chunks[0])
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Batch from already fetched rows (columns as in BATCH_COLUMNS)."""
+        if not rows:
+            return cls.empty()
+        return cls._from_matrix(np.array(rows, dtype=np.int64).reshape(-1, len(BATCH_COLUMNS)))
+
+    @classmethod
+    def _from_matrix(cls, matrix):
+        durations = matrix[:, 3]
+        if durations.size and durations.max() > _INT16_MAX:
+            raise ValueError(f"duration_minutes above {_INT16_MAX} does not fit the int16 column")
+        scores = matrix[:, 5]
+        return cls(
+            ids=np.ascontiguousarray(matrix[:, 0]),
+            subject_ids=matrix[:, 1].astype(np.int32),
+            starts=np.ascontiguousarray(matrix[:, 2]).view("datetime64[s]"),
+            durations=durations.astype(np.int16),
+            focus_levels=matrix[:, 4].astype(np.int8),
+            test_scores=np.ma.MaskedArray(scores.astype(np.int8), mask=scores < 0),
+        )
+
+    def to_rows(self):
+        """Rows in ``SessionRecord.to_tuple`` order, for inserting with
+        ``DatabaseManager.add_sessions``. Notes are not part of a batch and
+        are inserted as NULL."""
+        starts = np.char.replace(np.datetime_as_string(self.starts, unit="s"), "T", " ")
+        scores = np.where(np.ma.getmaskarray(self.test_scores), None, self.test_scores.data.astype(object))
+        return list(zip(
+            self.subject_ids.tolist(),
+            starts.tolist(),
+            self.durations.tolist(),
+            self.focus_levels.tolist(),
+            scores.tolist(),
+            [None] * len(self),
+        ))
+
+    def to_pandas(self):
+        """DataFrame view of the batch, using the column names of ``df_from_db``."""
+        scores = pd.arrays.IntegerArray(
+            self.test_scores.data, np.ma.getmaskarray(self.test_scores)
+        )
+        return pd.DataFrame(
+            {
+                "session_id": self.ids,
+                "subject_id": self.subject_ids,
+                "start_timestamp": self.starts,
+                "duration_minutes": self.durations,
+                "focus_level": self.focus_levels,
+                "test_score": scores,
+            },
+            copy=False,
+        )
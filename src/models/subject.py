@@ -1,10 +1,11 @@
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class Subject:
     id: int | None = None
     name: str = ""
+    learner_id: int = 1
 
     def __repr__(self) -> str:
         return f"Subject(id={self.id}, name='{self.name}')"
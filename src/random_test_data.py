@@ -19,8 +19,8 @@ subjects = ["Math","History","Physics","Chemistry","English"]
 for name in subjects:
     db.add_subject(name)
 
-for i in range(100):
-    s = SessionRecord(
+db.add_sessions(
+    SessionRecord(
         subject_id=random.randint(1,5),
         date=f"2026-02-{random.randint(1,28):02d}",
         start_time=f"{random.randint(6,22):02d}:{random.choice([0,30]):02d}",
@@ -28,4 +28,5 @@ for i in range(100):
         focus_level=random.randint(1,5),
         test_score=random.randint(50,100)
     )
-    db.add_session(s)
\ No newline at end of file
+    for i in range(100)
+)
\ No newline at end of file
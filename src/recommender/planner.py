@@ -0,0 +1,171 @@
+"""Study plan scheduling.
+
+Every subject gets a weight from two parts: its score deficit (how far its
+average test score is below 100) and its recency (days since it was last
+studied, saturating after ``RECENCY_DAYS``). Each day has one slot per
+session that fits under ``daily_cap``. The slots go to the learner's best
+hours, ranked by mean focus at that hour. A greedy allocator walks the
+slots from the best hour down and gives each slot to the subject with the
+highest weight. The weight is divided by ``1 + sessions already planned``
+so time spreads across subjects. A subject studied on one day counts as
+recent again the next.
+
+``plan_cohort`` builds the per-subject and per-hour tables for every
+learner with grouped pandas operations. Only the small per-learner
+allocation runs in a Python loop.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from src.recommender.rules import learner_keys
+
+DEFICIT_WEIGHT = 0.6
+RECENCY_WEIGHT = 0.4
+RECENCY_DAYS = 7
+# Deficit assumed for subjects that have no test scores yet.
+UNSCORED_DEFICIT = 0.5
+# Slot hours used, in this order, when a learner has no history at enough hours.
+DEFAULT_HOURS = (9, 14, 18, 20, 11, 16, 8, 21)
+DAILY_CAP = 120
+
+
+def _weight(deficit, recency):
+    return DEFICIT_WEIGHT * deficit + RECENCY_WEIGHT * recency
+
+
+def _start_date(start):
+    if start is None:
+        return date.today()
+    return pd.Timestamp(start).date()
+
+
+def subject_priorities(df, start=None, by="learner_id"):
+    """Per (learner_id, subject_name): avg_score, days_since, deficit, recency, weight."""
+    start = pd.Timestamp(_start_date(start))
+    learner = pd.Series(learner_keys(df, by), index=df.index, name="learner_id")
+    table = df.groupby([learner, df["subject_name"]], sort=True).agg(
+        avg_score=("test_score", "mean"),
+        last=("start_timestamp", "max"),
+    )
+    table["days_since"] = (start - table.pop("last").dt.normalize()).dt.days.clip(lower=0)
+    table["deficit"] = ((100 - table["avg_score"]) / 100).clip(lower=0).fillna(UNSCORED_DEFICIT)
+    table["recency"] = (table["days_since"] / RECENCY_DAYS).clip(upper=1)
+    table["weight"] = _weight(table["deficit"], table["recency"])
+    return table
+
+
+def focus_by_hour(df, by="learner_id"):
+    """Mean focus and session count per (learner_id, hour)."""
+    learner = pd.Series(learner_keys(df, by), index=df.index, name="learner_id")
+    hours = df["start_timestamp"].dt.hour.rename("hour")
+    return df["focus_level"].groupby([learner, hours]).agg(["mean", "size"])
+
+
+def _split(keys, *columns):
+    """Slice each column into per-key runs; ``keys`` must be sorted."""
+    uniques, starts = np.unique(keys, return_index=True)
+    bounds = list(starts[1:]) + [len(keys)]
+    return {
+        key: [column[lo:hi] for column in columns]
+        for key, lo, hi in zip(uniques.tolist(), starts.tolist(), bounds)
+    }
+
+
+def _ranked_hours(ranked, n):
+    hours = [int(h) for h in ranked[:n]]
+    hours += [h for h in DEFAULT_HOURS if h not in hours][:n - len(hours)]
+    return hours
+
+
+def _allocate(subjects, deficit, days_since, hours, start, days, session_minutes, break_minutes, max_per_day):
+    planned = np.zeros(len(subjects))
+    days_since = days_since.astype(float)
+    plans = []
+    for offset in range(days):
+        today = np.zeros(len(subjects))
+        sessions = []
+        for hour in hours:
+            if not len(subjects):
+                break
+            recency = np.minimum(days_since / RECENCY_DAYS, 1)
+            score = _weight(deficit, recency) / (1 + planned)
+            score[today >= max_per_day] = -np.inf
+            pick = int(np.argmax(score))
+            if score[pick] == -np.inf:
+                break
+            today[pick] += 1
+            planned[pick] += 1
+            sessions.append({
+                "time": f"{hour:02d}:00",
+                "subject": subjects[pick],
+                "duration": session_minutes,
+                "break_after": break_minutes,
+            })
+        sessions.sort(key=lambda s: s["time"])
+        plans.append({
+            "date": (start + timedelta(days=offset)).strftime("%Y-%m-%d"),
+            "sessions": sessions,
+            "total_time": session_minutes * len(sessions),
+        })
+        days_since = np.where(today > 0, 1, days_since + 1)
+    return plans
+
+
+def plan_cohort(df, start=None, days=7, by="learner_id", daily_cap=DAILY_CAP, session_minutes=None,
+                break_minutes=10, max_per_subject_per_day=2):
+    """``{learner_id: [day plan, ...]}`` for ``days`` days from ``start``.
+
+    ``session_minutes`` defaults per learner to 25 when average focus is
+    below 2.5 and to 40 otherwise. Each day gets
+    ``daily_cap // session_minutes`` slots at the learner's best hours.
+    """
+    start = _start_date(start)
+    if df.empty:
+        return {}
+    learner = pd.Series(learner_keys(df, by), index=df.index, name="learner_id")
+    avg_focus = df["focus_level"].groupby(learner).mean()
+    # Both tables are ordered by learner, so each learner's rows are one slice.
+    priorities = subject_priorities(df, start, by)
+    subjects = _split(
+        priorities.index.get_level_values("learner_id").to_numpy(),
+        priorities.index.get_level_values("subject_name").to_numpy(),
+        priorities["deficit"].to_numpy(),
+        priorities["days_since"].to_numpy(),
+    )
+    hour_table = focus_by_hour(df, by).reset_index().sort_values(
+        ["learner_id", "mean", "size", "hour"], ascending=[True, False, False, True]
+    )
+    ranked = _split(hour_table["learner_id"].to_numpy(), hour_table["hour"].to_numpy())
+
+    plans = {}
+    for learner_id, focus in zip(avg_focus.index.tolist(), avg_focus.tolist()):
+        minutes = session_minutes or (25 if focus < 2.5 else 40)
+        names, deficit, days_since = subjects[learner_id]
+        hours = _ranked_hours(ranked[learner_id][0], max(daily_cap // minutes, 0))
+        plans[int(learner_id)] = _allocate(
+            names.tolist(), deficit, days_since, hours, start, days, minutes, break_minutes, max_per_subject_per_day,
+        )
+    return plans
+
+
+def plan(df, start=None, days=1, **options):
+    """Day plans for a single learner's frame; see ``plan_cohort``."""
+    if df.empty:
+        start = _start_date(start)
+        return [
+            {"date": (start + timedelta(days=offset)).strftime("%Y-%m-%d"), "sessions": [], "total_time": 0}
+            for offset in range(days)
+        ]
+    return plan_cohort(df, start, days, by=None, **options)[1]
+
+
+def weekly_summary(day_plans):
+    """Sessions and minutes per subject over ``day_plans``, most minutes first."""
+    totals = {}
+    for day in day_plans:
+        for session in day["sessions"]:
+            entry = totals.setdefault(session["subject"], {"subject": session["subject"], "sessions": 0, "total_minutes": 0})
+            entry["sessions"] += 1
+            entry["total_minutes"] += session["duration"]
+    return sorted(totals.values(), key=lambda e: (-e["total_minutes"], e["subject"]))
@@ -1,153 +1,73 @@
 from datetime import datetime, timedelta
-from dataclasses import dataclass
 import pandas as pd
 from src.analytics.analytics import (
     df_from_db,
     compute_overall_summary,
-    subject_stats,
 )
-
-
-@dataclass
-class Recommendation:
-    category: str
-    title: str
-    advice: str
-    priority: int
+from src.db.database import DatabaseManager
+from src.recommender import planner, rules
+from src.recommender.rules import Recommendation
 
 
 class RecommendationEngine:
-    def __init__(self, db_path=None):
-        self.df = df_from_db(db_path=db_path)
+    def __init__(
+        self, db_path=None, db=None, since=None, until=None, subject_ids=None, cache=False, learner_ids=None
+    ):
+        self.df = df_from_db(
+            db_path=db_path, db=db, since=since, until=until, subject_ids=subject_ids, cache=cache,
+            learner_ids=learner_ids,
+        )
         self.recommendations = []
 
+    @classmethod
+    def from_frame(cls, df):
+        engine = cls.__new__(cls)
+        engine.df = df
+        engine.recommendations = []
+        return engine
+
+    # Assigning a new frame drops everything derived from the old one.
+    @property
+    def df(self):
+        return self._df
+
+    @df.setter
+    def df(self, value):
+        self._df = value
+        self._context = None
+        self._analysis = None
+
+    def context(self):
+        """Summary and the rules' feature tables, computed once per frame."""
+        if self._context is None:
+            self._context = {
+                "summary": compute_overall_summary(self.df),
+                "features": rules.feature_tables(self.df, by=None) if not self.df.empty else None,
+            }
+        return self._context
+
     def analyze(self):
         if self.df.empty:
             return []
-
-        self.recommendations = []
-        self._check_low_focus()
-        self._check_weak_subjects()
-        self._check_burnout()
-        self._check_schedule()
-        self.recommendations.sort(key=lambda x: x.priority)
+        if self._analysis is None:
+            self._analysis = rules.evaluate(self.df, by=None, tables=self.context()["features"])[1]
+        self.recommendations = self._analysis
         return self.recommendations
 
-    def _check_low_focus(self):
-        avg_focus = self.df["focus_level"].mean()
-        if avg_focus < 2.5:
-            self.recommendations.append(
-                Recommendation(
-                    category="focus",
-                    title="Low Focus Detected",
-                    advice="Your focus is low. Try shorter sessions (25-30 min) with breaks.",
-                    priority=1,
-                )
-            )
-        elif avg_focus < 3:
-            self.recommendations.append(
-                Recommendation(
-                    category="focus",
-                    title="Focus Could Be Better",
-                    advice="Moderate focus. Consider 40-min sessions with 10-min breaks.",
-                    priority=2,
-                )
-            )
-
-    def _check_weak_subjects(self):
-        stats = subject_stats(self.df)
-        for subject, row in stats.iterrows():
-            avg_score = row["avg_score"]
-            sessions = row["sessions"]
-            if sessions >= 2 and pd.notna(avg_score) and avg_score < 60:
-                self.recommendations.append(
-                    Recommendation(
-                        category="subject",
-                        title=f"Boost {subject}",
-                        advice=f"Your score in {subject} is low ({avg_score:.0f}%). Try 2-3 focused sessions this week.",
-                        priority=1,
-                    )
-                )
-
-    def _check_burnout(self):
-        weekly = self.df.groupby("date").size()
-        if len(weekly) >= 2:
-            recent_days = weekly.iloc[-7:].sum()
-            prev_days = weekly.iloc[-14:-7].sum()
-            if recent_days == 0:
-                self.recommendations.append(
-                    Recommendation(
-                        category="burnout",
-                        title="Time to Rest",
-                        advice="You haven't studied recently. Take a break, then restart fresh!",
-                        priority=1,
-                    )
-                )
-            elif prev_days > 0 and recent_days < (prev_days * 0.5):
-                self.recommendations.append(
-                    Recommendation(
-                        category="burnout",
-                        title="Burnout Alert",
-                        advice="Your study activity is dropping. Time for a rest day!",
-                        priority=1,
-                    )
-                )
-        if len(self.df) >= 3:
-            recent_avg = self.df.iloc[-3:]["duration_minutes"].mean()
-            prev_avg = self.df.iloc[-10:-3]["duration_minutes"].mean() if len(self.df) >= 10 else recent_avg
-            if recent_avg < (prev_avg * 0.5) and prev_avg > 0:
-                self.recommendations.append(
-                    Recommendation(
-                        category="burnout",
-                        title="Energy Low",
-                        advice="Sessions are getting shorter. Get rest and hydrate!",
-                        priority=2,
-                    )
-                )
-
-    def _check_schedule(self):
-        summary = compute_overall_summary(self.df)
-        if summary["total_sessions"] > 0:
-            sessions_per_day = summary["total_sessions"] / max(len(set(self.df["date"])), 1)
-            if sessions_per_day < 1:
-                self.recommendations.append(
-                    Recommendation(
-                        category="schedule",
-                        title="Build Daily Habit",
-                        advice="Aim for at least 1 study session per day.",
-                        priority=2,
-                    )
-                )
-
     def generate_daily_plan(self, date_str=None):
         if date_str is None:
             date_str = datetime.now().strftime("%Y-%m-%d")
-        summary = compute_overall_summary(self.df)
-        weak_subjects = subject_stats(self.df).sort_values("avg_score").index.tolist()[:3]
-        plan = {"date": date_str, "sessions": [], "total_time": 0}
-        session_time = 25 if summary["avg_focus"] and summary["avg_focus"] < 2.5 else 40
-        times = ["09:00", "14:00", "18:00"]
-        for i, subject in enumerate(weak_subjects[:3]):
-            plan["sessions"].append({
-                "time": times[i],
-                "subject": subject,
-                "duration": session_time,
-                "break_after": 10,
-            })
-            plan["total_time"] += session_time
-        return plan
-
-    def generate_weekly_plan(self):
-        stats = subject_stats(self.df)
-        plan = {"week": datetime.now().strftime("%Y-W%W"), "daily_target": 90, "subjects": []}
-        if not stats.empty:
-            for subject in stats.index[:5]:
-                plan["subjects"].append({
-                    "subject": subject,
-                    "sessions": 3,
-                    "total_minutes": 120,
-                })
-        return plan
+        return planner.plan(self.df, start=date_str, days=1)[0]
+
+    def generate_weekly_plan(self, start=None):
+        start = datetime.now() if start is None else pd.Timestamp(start)
+        days = planner.plan(self.df, start=start, days=7)
+        return {
+            "week": start.strftime("%Y-W%W"),
+            "daily_target": planner.DAILY_CAP,
+            "days": days,
+            "subjects": planner.weekly_summary(days),
+        }
 
     def get_text_advice(self):
         self.analyze()
@@ -159,13 +79,14 @@ class RecommendationEngine:
         return text
 
     def get_dashboard(self):
-        summary = compute_overall_summary(self.df)
+        summary = self.context()["summary"]
+        features = self.context()["features"]
         self.analyze()
         dashboard = {
             "metrics": {
                 "focus_level": summary["avg_focus"],
                 "avg_score": summary["avg_score"],
-                "study_consistency": len(set(self.df["date"])),
+                "study_consistency": int(features["learner"]["study_days"].sum()) if features else 0,
                 "recommendation_count": len(self.recommendations),
             },
             "top_subjects": summary["sessions_per_subject"].head(5).to_dict(),
@@ -189,6 +110,22 @@ class RecommendationEngine:
             return "Action Required"
 
 
+def cohort_recommendations(db_path=None, db=None, since=None, until=None, learner_ids=None, cache=False):
+    """``{learner_id: analyze()}`` for many learners from a single frame load.
+
+    Defaults to every learner in the database; learners without sessions
+    map to an empty list.
+    """
+    if db is None:
+        db = DatabaseManager(db_path=db_path)
+    if learner_ids is None:
+        learner_ids = db.learner_ids()
+    df = df_from_db(db=db, since=since, until=until, learner_ids=learner_ids, cache=cache)
+    results = {int(learner_id): [] for learner_id in learner_ids}
+    results.update(rules.evaluate(df))
+    return results
+
+
 def print_recommendation_summary(engine):
     print(engine.get_text_advice())
     print("\nDaily Plan for Today:")
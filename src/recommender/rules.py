@@ -0,0 +1,170 @@
+"""Declarative recommendation rules evaluated for many learners at once.
+
+Each ``Rule`` is a vectorized predicate over a feature table: one row per
+learner (``learner_features``) or one row per learner and subject
+(``subject_features``). ``evaluate`` builds both tables with a few grouped
+pandas operations over the whole session frame, applies every predicate to
+every row in one pass and only formats ``Recommendation`` objects for the
+rows where a rule fires. Adding a rule therefore adds one column-wise
+comparison, not a loop over learners.
+"""
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Recommendation:
+    category: str
+    title: str
+    advice: str
+    priority: int
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    level: str  # "learner" or "subject"
+    when: Callable[[pd.DataFrame], pd.Series]
+    category: str
+    title: str  # str.format template over the feature row
+    advice: str
+    priority: int
+
+
+RULES = [
+    Rule(
+        "low_focus", "learner",
+        lambda f: f["avg_focus"] < 2.5,
+        "focus", "Low Focus Detected",
+        "Your focus is low. Try shorter sessions (25-30 min) with breaks.", 1,
+    ),
+    Rule(
+        "moderate_focus", "learner",
+        lambda f: (f["avg_focus"] >= 2.5) & (f["avg_focus"] < 3),
+        "focus", "Focus Could Be Better",
+        "Moderate focus. Consider 40-min sessions with 10-min breaks.", 2,
+    ),
+    Rule(
+        "weak_subject", "subject",
+        lambda f: (f["sessions"] >= 2) & (f["avg_score"] < 60),
+        "subject", "Boost {subject_name}",
+        "Your score in {subject_name} is low ({avg_score:.0f}%). Try 2-3 focused sessions this week.", 1,
+    ),
+    Rule(
+        "no_recent_study", "learner",
+        lambda f: (f["study_days"] >= 2) & (f["recent_sessions"] == 0),
+        "burnout", "Time to Rest",
+        "You haven't studied recently. Take a break, then restart fresh!", 1,
+    ),
+    Rule(
+        "activity_drop", "learner",
+        lambda f: (f["study_days"] >= 2) & (f["recent_sessions"] > 0) & (f["prev_sessions"] > 0)
+        & (f["recent_sessions"] < f["prev_sessions"] * 0.5),
+        "burnout", "Burnout Alert",
+        "Your study activity is dropping. Time for a rest day!", 1,
+    ),
+    Rule(
+        "shorter_sessions", "learner",
+        lambda f: (f["total_sessions"] >= 3) & (f["prev_duration"] > 0)
+        & (f["recent_duration"] < f["prev_duration"] * 0.5),
+        "burnout", "Energy Low",
+        "Sessions are getting shorter. Get rest and hydrate!", 2,
+    ),
+    Rule(
+        "no_daily_habit", "learner",
+        lambda f: f["total_sessions"] / f["study_days"].clip(lower=1) < 1,
+        "schedule", "Build Daily Habit",
+        "Aim for at least 1 study session per day.", 2,
+    ),
+]
+
+
+def learner_keys(df, by):
+    if by is not None and by in df:
+        return df[by].to_numpy()
+    return np.ones(len(df), dtype="int64")
+
+
+def learner_features(df, by="learner_id"):
+    """One row per learner (the ``by`` column; ``by=None`` treats the whole
+    frame as learner 1).
+
+    Recent/previous windows follow frame order: the last 7 study days
+    against the 7 before them, and the last 3 sessions against the 7 before
+    them (or against the last 3 again for learners with fewer than 10).
+    """
+    learner = pd.Series(learner_keys(df, by), index=df.index, name="learner_id")
+    by_learner = df.groupby(learner, sort=True)
+    features = pd.DataFrame({
+        "total_sessions": by_learner.size(),
+        "avg_focus": by_learner["focus_level"].mean(),
+    })
+
+    daily = df.groupby([learner, df["date"]]).size().rename("sessions").reset_index()
+    day_from_end = daily.groupby("learner_id").cumcount(ascending=False) + 1
+    features["study_days"] = daily.groupby("learner_id").size()
+    features["recent_sessions"] = daily["sessions"].where(day_from_end <= 7, 0).groupby(daily["learner_id"]).sum()
+    features["prev_sessions"] = (
+        daily["sessions"].where((day_from_end > 7) & (day_from_end <= 14), 0).groupby(daily["learner_id"]).sum()
+    )
+
+    from_end = by_learner.cumcount(ascending=False) + 1
+    durations = df["duration_minutes"]
+    recent = durations.where(from_end <= 3).groupby(learner).mean()
+    prev = durations.where((from_end > 3) & (from_end <= 10)).groupby(learner).mean()
+    features["recent_duration"] = recent
+    features["prev_duration"] = prev.where(features["total_sessions"] >= 10, recent)
+    return features
+
+
+def subject_features(df, by="learner_id"):
+    """One row per (learner_id, subject_name), ordered by subject name."""
+    learner = pd.Series(learner_keys(df, by), index=df.index, name="learner_id")
+    return df.groupby([learner, df["subject_name"]], sort=True).agg(
+        sessions=("duration_minutes", "size"),
+        avg_score=("test_score", "mean"),
+    )
+
+
+def feature_tables(df, by="learner_id"):
+    """The tables rules are evaluated over, keyed by ``Rule.level``."""
+    return {
+        "learner": learner_features(df, by).reset_index(),
+        "subject": subject_features(df, by).reset_index(),
+    }
+
+
+def evaluate(df, rules=RULES, by="learner_id", tables=None):
+    """``{learner_id: [Recommendation, ...]}`` for every learner in ``df``.
+
+    ``tables`` reuses ``feature_tables(df, by)`` computed by the caller.
+    Recommendations are ordered by priority, then by rule order, then by
+    subject name.
+    """
+    if df.empty:
+        return {}
+    if tables is None:
+        tables = feature_tables(df, by)
+    hits = []
+    for order, rule in enumerate(rules):
+        table = tables[rule.level]
+        fired = table[rule.when(table).fillna(False).to_numpy(dtype=bool)]
+        if fired.empty:
+            continue
+        for row_order, row in enumerate(fired.to_dict("records")):
+            hits.append((
+                row["learner_id"], rule.priority, order, row_order,
+                Recommendation(
+                    category=rule.category,
+                    title=rule.title.format(**row),
+                    advice=rule.advice.format(**row),
+                    priority=rule.priority,
+                ),
+            ))
+    results = {int(learner_id): [] for learner_id in tables["learner"]["learner_id"]}
+    for learner_id, *_, rec in sorted(hits, key=lambda hit: hit[:4]):
+        results[int(learner_id)].append(rec)
+    return results
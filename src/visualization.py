@@ -2,12 +2,13 @@ import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
 
-def plot_sessions_over_time(df, ax=None):
-    if df.empty:
+def plot_sessions_over_time(weekly_minutes, ax=None):
+    """``weekly_minutes`` as returned by ``sql_analytics.weekly_minutes``."""
+    if weekly_minutes.empty:
         fig, ax = plt.subplots()
         ax.text(0.5, 0.5, 'No data', ha='center')
         return fig
-    s = df.set_index('start_timestamp').resample('W')['duration_minutes'].sum()
+    s = weekly_minutes
     if ax is None:
         fig, ax = plt.subplots()
     else:
@@ -50,22 +51,23 @@ def plot_subject_breakdown(df, ax=None):
     return fig
 
 
-def plot_dashboard(df):
+def plot_dashboard(df, weekly_minutes, weekly_focus):
     fig, axs = plt.subplots(2, 2, figsize=(12, 8))
-    plot_sessions_over_time(df, axs[0, 0])
+    plot_sessions_over_time(weekly_minutes, axs[0, 0])
     plot_focus_distribution(df, axs[0, 1])
     plot_subject_breakdown(df, axs[1, 0])
-    plot_focus_trend(df, axs[1, 1])
+    plot_focus_trend(weekly_focus, axs[1, 1])
     fig.tight_layout()
     return fig
 
 
-def plot_focus_trend(df, ax=None):
-    if df.empty:
+def plot_focus_trend(weekly_focus, ax=None):
+    """``weekly_focus`` as returned by ``sql_analytics.weekly_focus``."""
+    if weekly_focus.empty:
         fig, ax = plt.subplots()
         ax.text(0.5, 0.5, 'No data', ha='center')
         return fig
-    s = df.set_index('start_timestamp').resample('W')['focus_level'].mean()
+    s = weekly_focus
     if ax is None:
         fig, ax = plt.subplots()
     else:
@@ -96,7 +98,7 @@ def plot_best_hours(df, ax=None):
     fig.tight_layout()
     return fig
 
-def plot_all_charts(df):
+def plot_all_charts(df, weekly_minutes, weekly_focus):
 
     fig = plt.figure(constrained_layout=True, figsize=(14, 10))
     gs = fig.add_gridspec(3, 3)
@@ -106,8 +108,8 @@ def plot_all_charts(df):
     ax_subject = fig.add_subplot(gs[1, 2])
     ax_hours = fig.add_subplot(gs[2, 1])
 
-    plot_sessions_over_time(df, ax_time)
-    plot_focus_trend(df, ax_focus_trend)
+    plot_sessions_over_time(weekly_minutes, ax_time)
+    plot_focus_trend(weekly_focus, ax_focus_trend)
     plot_focus_distribution(df, ax_focus_dist)
     plot_subject_breakdown(df, ax_subject)
     plot_best_hours(df, ax_hours)
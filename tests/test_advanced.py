@@ -1,6 +1,6 @@
 from src.db.database import DatabaseManager
 from src.models.session import SessionRecord
-from src.analytics import analytics
+from src.analytics import analytics, incremental, streaks
 
 
 def _make_db(path):
@@ -34,3 +34,25 @@ def test_focus_corr_and_recs(tmp_path):
     assert corr is not None
     recs = analytics.recommendations(df)
     assert isinstance(recs, list)
+
+
+def test_streak_family(tmp_path):
+    db_file = tmp_path / "adv3.sqlite"
+    db = _make_db(str(db_file))
+    db.add_session(SessionRecord(subject_id=1, date="2026-02-03", start_time="08:00", duration_minutes=20, focus_level=3))
+    db.add_session(SessionRecord(subject_id=2, date="2026-02-06", start_time="08:00", duration_minutes=20, focus_level=3))
+    df = analytics.df_from_db(db_path=str(db_file))
+
+    assert streaks.longest_streak(df) == 3
+    assert streaks.current_streak(df, today="2026-02-07") == 1
+    assert streaks.current_streak(df, today="2026-02-08") == 0
+    assert streaks.streak_histogram(df).to_dict() == {1: 1, 3: 1}
+
+    per_subject = streaks.subject_streaks(df, today="2026-02-06")
+    assert per_subject.loc["Math", "longest"] == 3
+    assert per_subject.loc["History", "longest"] == 1
+    assert per_subject.loc["History", "current"] == 1
+    assert per_subject.loc["Math", "current"] == 0
+
+    assert incremental.current_streak(db=db, today="2026-02-07") == 1
+    assert streaks.longest_streak(df.iloc[0:0]) == 0
@@ -1,6 +1,11 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
 from src.db.database import DatabaseManager
 from src.models.session import SessionRecord
-from src.analytics import analytics
+from src.analytics import analytics, backends, cohort, incremental, sql_analytics
 
 
 def _make_sample_db(path):
@@ -37,4 +42,316 @@ def test_subject_stats(tmp_path):
     df = analytics.df_from_db(db_path=str(db_file))
     stats = analytics.subject_stats(df)
     assert stats.loc["Math", "sessions"] == 2
-    assert stats.loc["History", "sessions"] == 1
\ No newline at end of file
+    assert stats.loc["History", "sessions"] == 1
+
+def test_sql_backend_matches_pandas(tmp_path):
+    db_file = tmp_path / "test_db3.sqlite"
+    db = _make_sample_db(str(db_file))
+    db.add_session(SessionRecord(subject_id=2, date="2026-02-04", start_time="11:00", duration_minutes=20, focus_level=2))
+    df = analytics.df_from_db(db_path=str(db_file))
+
+    expected = analytics.compute_overall_summary(df)
+    summary = sql_analytics.compute_overall_summary(db=db)
+    for key in ("total_sessions", "total_minutes", "avg_focus", "avg_score"):
+        assert summary[key] == pytest.approx(expected[key])
+    pd.testing.assert_series_equal(summary["sessions_per_subject"], expected["sessions_per_subject"])
+
+    pd.testing.assert_frame_equal(sql_analytics.subject_stats(db=db), analytics.subject_stats(df))
+    pd.testing.assert_series_equal(sql_analytics.top_subjects(n=1, db=db), analytics.top_subjects(df, n=1))
+    assert sql_analytics.weakest_subject(db=db) == analytics.weakest_subject(df)
+    assert sql_analytics.most_productive_subject(db=db) == analytics.most_productive_subject(df)
+
+
+def test_sql_backend_empty(tmp_path):
+    db = DatabaseManager(db_path=str(tmp_path / "empty.sqlite"))
+    db.migrate()
+    summary = sql_analytics.compute_overall_summary(db=db)
+    assert summary["total_sessions"] == 0
+    assert summary["total_minutes"] == 0
+    assert summary["avg_focus"] is None and summary["avg_score"] is None
+    assert sql_analytics.weakest_subject(db=db) is None
+    assert sql_analytics.most_productive_subject(db=db) is None
+
+
+def test_df_from_db_filters_and_projection(tmp_path):
+    db_file = tmp_path / "test_db4.sqlite"
+    db = _make_sample_db(str(db_file))
+
+    df = analytics.df_from_db(db=db, since="2026-02-02", until="2026-02-02")
+    assert df["subject_name"].tolist() == ["History"]
+
+    df = analytics.df_from_db(db=db, since="2026-02-02")
+    assert len(df) == 2
+
+    df = analytics.df_from_db(db=db, subject_ids=[1], columns=["start_timestamp", "duration_minutes"])
+    assert list(df.columns) == ["start_timestamp", "duration_minutes", "date", "week_start"]
+    assert df["duration_minutes"].sum() == 105
+
+    summary = sql_analytics.compute_overall_summary(db=db, until="2026-02-01")
+    assert summary["total_sessions"] == 1
+
+    with pytest.raises(ValueError):
+        analytics.df_from_db(db=db, columns=["bogus"])
+
+
+def test_rollups_track_writes_and_match_pandas(tmp_path):
+    db_file = tmp_path / "test_db5.sqlite"
+    db = _make_sample_db(str(db_file))
+    db.add_session(SessionRecord(subject_id=2, date="2026-02-20", start_time="11:00", duration_minutes=20, focus_level=2))
+    moved = db.get_session(2)
+    moved.date = "2026-03-02"
+    db.update_session(moved)
+    db.delete_session(1)
+
+    df = analytics.df_from_db(db=db)
+    pd.testing.assert_series_equal(sql_analytics.weekly_minutes(db=db), analytics.weekly_minutes(df),
+                                   check_index_type=False, check_freq=False)
+    pd.testing.assert_series_equal(sql_analytics.rolling_minutes(db=db), analytics.rolling_minutes(df),
+                                   check_index_type=False, check_freq=False, check_dtype=False)
+    pd.testing.assert_series_equal(sql_analytics.focus_trend(db=db), analytics.focus_trend(df),
+                                   check_index_type=False, check_freq=False)
+    assert sql_analytics.growth_rate(db=db) == analytics.growth_rate(df)
+    weekly_focus = df.set_index("start_timestamp").resample("W")["focus_level"].mean()
+    pd.testing.assert_series_equal(sql_analytics.weekly_focus(db=db), weekly_focus,
+                                   check_index_type=False, check_freq=False)
+    pd.testing.assert_series_equal(sql_analytics.weekly_minutes(db=db, since="2026-02-01"),
+                                   analytics.weekly_minutes(df[df["start_timestamp"] >= "2026-02-01"]),
+                                   check_index_type=False, check_freq=False)
+
+    with db.connection() as conn:
+        before = conn.execute("SELECT * FROM daily_rollups ORDER BY 1, 2").fetchall()
+    db.rebuild_rollups()
+    with db.connection() as conn:
+        after = conn.execute("SELECT * FROM daily_rollups ORDER BY 1, 2").fetchall()
+    assert [tuple(r) for r in before] == [tuple(r) for r in after]
+
+
+def test_cached_frame_reused_until_data_changes(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    db_file = tmp_path / "test_db6.sqlite"
+    db = _make_sample_db(str(db_file))
+    analytics.clear_frame_cache()
+    sql_loads = []
+    load_frame = analytics._load_frame
+    monkeypatch.setattr(analytics, "_load_frame", lambda *args: sql_loads.append(args[-1]) or load_frame(*args))
+
+    first = analytics.df_from_db(db=db, cache=True)
+    assert len(first) == 3
+    assert len(list(tmp_path.glob("test_db6.sqlite.frame-*.parquet"))) == 1
+
+    version = db.data_version()
+    first.drop(first.index, inplace=True)
+    assert len(analytics.df_from_db(db=db, cache=True)) == 3
+    assert len(sql_loads) == 1
+
+    # A fresh process only has the on-disk copies, one per column selection.
+    projected = analytics.df_from_db(db=db, cache=True, columns=["focus_level", "test_score"])
+    assert len(list(tmp_path.glob("test_db6.sqlite.frame-*.parquet"))) == 2
+    analytics.clear_frame_cache()
+    pd.testing.assert_frame_equal(analytics.df_from_db(db=db, cache=True), analytics.df_from_db(db=db))
+    pd.testing.assert_frame_equal(
+        analytics.df_from_db(db=db, cache=True, columns=["focus_level", "test_score"]), projected
+    )
+    assert len(sql_loads) == 3  # the two initial loads and the uncached comparison
+
+    db.add_session(SessionRecord(subject_id=1, date="2026-02-05", start_time="09:00", duration_minutes=20, focus_level=3))
+    assert db.data_version() != version
+    assert len(analytics.df_from_db(db=db, cache=True)) == 4
+    assert len(analytics.df_from_db(db=db, cache=True, subject_ids=[2])) == 1
+    # The previous version's files are replaced, not kept alongside.
+    assert len(list(tmp_path.glob("test_db6.sqlite.frame-*.parquet"))) == 1
+
+
+@pytest.mark.parametrize("fresh_process", [False, True])
+def test_cached_frame_not_reused_for_recreated_database(tmp_path, fresh_process):
+    db_file = tmp_path / "test_db6b.sqlite"
+    db = _make_sample_db(str(db_file))
+    analytics.clear_frame_cache()
+    assert analytics.df_from_db(db=db, cache=True)["subject_name"].tolist() == ["Math", "Math", "History"]
+    version = db.data_version()
+
+    # Same path and the same number of writes, so the counter matches again.
+    for suffix in ("", "-wal", "-shm"):
+        (tmp_path / f"test_db6b.sqlite{suffix}").unlink(missing_ok=True)
+    db = DatabaseManager(db_path=str(db_file))
+    db.migrate()
+    db.add_subject("Chem")
+    db.add_subject("Bio")
+    for day in ("2026-03-01", "2026-03-02", "2026-03-03"):
+        db.add_session(SessionRecord(subject_id=1, date=day, start_time="09:00", duration_minutes=99, focus_level=2))
+    assert db.data_version() == version
+    if fresh_process:
+        analytics.clear_frame_cache()
+
+    df = analytics.df_from_db(db=db, cache=True)
+    assert df["subject_name"].tolist() == ["Chem"] * 3
+    assert df["duration_minutes"].tolist() == [99] * 3
+
+
+def test_incremental_state_matches_pandas(tmp_path):
+    db_file = tmp_path / "test_db7.sqlite"
+    db = _make_sample_db(str(db_file))
+    extra = [
+        SessionRecord(subject_id=1, date="2026-02-04", start_time="10:00", duration_minutes=25, focus_level=2, test_score=55),
+        SessionRecord(subject_id=2, date="2026-02-06", start_time="21:00", duration_minutes=50, focus_level=5),
+        SessionRecord(subject_id=2, date="2026-02-07", start_time="10:30", duration_minutes=40, focus_level=4, test_score=88),
+    ]
+    ids = db.add_sessions(extra)
+    db.delete_session(ids[2])
+    moved = db.get_session(ids[1])
+    moved.date = "2026-02-05"
+    db.update_session(moved)
+
+    df = analytics.df_from_db(db=db)
+    expected = analytics.compute_overall_summary(df)
+    summary = incremental.compute_overall_summary(db=db)
+    for key in ("total_sessions", "total_minutes", "avg_focus", "avg_score"):
+        assert summary[key] == pytest.approx(expected[key])
+    pd.testing.assert_series_equal(summary["sessions_per_subject"], expected["sessions_per_subject"])
+
+    assert incremental.focus_score_corr(db=db) == pytest.approx(analytics.focus_score_corr(df))
+    assert incremental.best_hour(db=db) == analytics.best_hour(df)
+    assert incremental.best_weekday(db=db) == analytics.best_weekday(df)
+    assert incremental.longest_streak(db=db) == analytics.longest_streak(df) == 5
+
+    db.delete_session(3)  # 2026-02-02 splits the streak
+    assert incremental.longest_streak(db=db) == analytics.longest_streak(analytics.df_from_db(db=db)) == 3
+
+
+def test_incremental_state_matches_pandas_after_subject_delete(tmp_path):
+    db = _make_sample_db(str(tmp_path / "test_db7b.sqlite"))
+    db.add_session(SessionRecord(subject_id=2, date="2026-02-04", start_time="11:00", duration_minutes=20, focus_level=2, test_score=40))
+    db.delete_subject(1)
+
+    df = analytics.df_from_db(db=db)
+    expected = analytics.compute_overall_summary(df)
+    summary = incremental.compute_overall_summary(db=db)
+    assert summary["total_sessions"] == expected["total_sessions"] == 2
+    for key in ("total_minutes", "avg_focus", "avg_score"):
+        assert summary[key] == pytest.approx(expected[key])
+    pd.testing.assert_series_equal(summary["sessions_per_subject"], expected["sessions_per_subject"])
+    assert incremental.focus_score_corr(db=db) == pytest.approx(analytics.focus_score_corr(df))
+    assert incremental.longest_streak(db=db) == analytics.longest_streak(df) == 1
+
+    db.delete_subject(2)
+    assert incremental.compute_overall_summary(db=db)["total_sessions"] == 0
+    assert incremental.longest_streak(db=db) == 0
+
+
+def test_polars_backend_matches_pandas(tmp_path):
+    pytest.importorskip("polars")
+    db = _make_sample_db(str(tmp_path / "test_db_polars.sqlite"))
+    db.add_session(SessionRecord(subject_id=2, date="2026-03-20", start_time="11:00", duration_minutes=20, focus_level=2))
+    pandas_backend = backends.get_backend("pandas")
+    polars_backend = backends.get_backend("polars")
+    df = pandas_backend.load(db)
+    frame = polars_backend.load(db)
+
+    expected = pandas_backend.compute_overall_summary(df)
+    summary = polars_backend.compute_overall_summary(frame)
+    for key in ("total_sessions", "total_minutes", "avg_focus", "avg_score"):
+        assert summary[key] == pytest.approx(expected[key])
+    pd.testing.assert_series_equal(summary["sessions_per_subject"], expected["sessions_per_subject"])
+    pd.testing.assert_frame_equal(polars_backend.subject_stats(frame), pandas_backend.subject_stats(df))
+    for name in ("top_subjects", "weekly_minutes", "rolling_minutes", "focus_trend"):
+        pd.testing.assert_series_equal(getattr(polars_backend, name)(frame), getattr(pandas_backend, name)(df))
+    assert polars_backend.longest_streak(frame) == pandas_backend.longest_streak(df) == 3
+    for today in ("2026-02-04", "2026-03-21", "2026-03-22"):
+        assert polars_backend.current_streak(frame, today) == pandas_backend.current_streak(df, today)
+
+    frame = polars_backend.load(db, since="2026-03-01")
+    assert polars_backend.compute_overall_summary(frame)["total_sessions"] == 1
+    frame = polars_backend.load(db, columns=["start_timestamp"])
+    assert frame.columns == ["start_timestamp"]
+    assert polars_backend.longest_streak(frame) == 3
+
+
+def test_get_backend_from_env(monkeypatch):
+    monkeypatch.setenv("ANALYTICS_BACKEND", "pandas")
+    assert backends.get_backend().name == "pandas"
+    monkeypatch.setenv("ANALYTICS_BACKEND", "spark")
+    with pytest.raises(ValueError):
+        backends.get_backend()
+
+
+def test_cohort_summary_matches_per_learner(tmp_path):
+    db = _make_sample_db(str(tmp_path / "test_db_cohort.sqlite"))
+    physics = db.add_subject("Physics", learner_id=2)
+    math_2 = db.add_subject("Math", learner_id=2)
+    db.add_session(SessionRecord(subject_id=physics, date="2026-02-05", duration_minutes=50, focus_level=2, test_score=40))
+    db.add_session(SessionRecord(subject_id=math_2, date="2026-02-06", duration_minutes=20, focus_level=5))
+    db.add_subject("Art", learner_id=3)
+
+    summaries = sql_analytics.cohort_summary(db=db)
+    stats = sql_analytics.cohort_subject_stats(db=db)
+    assert sorted(summaries) == [1, 2]
+    for learner_id in (1, 2):
+        df = analytics.df_from_db(db=db, learner_ids=[learner_id])
+        expected = analytics.compute_overall_summary(df)
+        for key in ("total_sessions", "total_minutes", "avg_focus", "avg_score"):
+            assert summaries[learner_id][key] == pytest.approx(expected[key])
+        pd.testing.assert_series_equal(summaries[learner_id]["sessions_per_subject"], expected["sessions_per_subject"])
+        pd.testing.assert_frame_equal(stats.loc[learner_id], analytics.subject_stats(df))
+    assert sql_analytics.cohort_summary(db=db, learner_ids=[2])[2]["total_minutes"] == 70
+
+    # Without a learner filter both learners' "Math" is one subject, as in pandas.
+    df = analytics.df_from_db(db=db)
+    pd.testing.assert_frame_equal(sql_analytics.subject_stats(db=db), analytics.subject_stats(df))
+    pd.testing.assert_series_equal(
+        sql_analytics.compute_overall_summary(db=db)["sessions_per_subject"],
+        analytics.compute_overall_summary(df)["sessions_per_subject"],
+    )
+
+
+def test_cohort_run_by_learner_id(tmp_path):
+    db = _make_sample_db(str(tmp_path / "test_db_cohort_run.sqlite"))
+    physics = db.add_subject("Physics", learner_id=2)
+    db.add_session(SessionRecord(subject_id=physics, date="2026-02-05", duration_minutes=50, focus_level=2, test_score=40))
+
+    progress = []
+    records = cohort.run_cohort(
+        cohort.learner_tasks(db.db_path, [2, 1, 7]), workers=1, chunk_size=2,
+        progress=lambda *state: progress.append(state),
+    )
+    assert [r["learner"] for r in records] == [2, 1, 7]
+    assert all(r["status"] == "ok" for r in records)
+    assert records[0]["insights"]["total_minutes"] == 50
+    assert records[1]["insights"] == analytics.insights_json(analytics.compute_insights(analytics.df_from_db(db=db, learner_ids=[1])))
+    assert records[1]["subject_stats"]["History"] == {"sessions": 1, "total_minutes": 30, "avg_focus": 5.0, "avg_score": 92.0}
+    assert records[2]["insights"]["total_sessions"] == 0
+    assert progress == [(2, 3, 0), (3, 3, 0)]
+
+    out = tmp_path / "cohort.jsonl"
+    cohort.write_records(records, out)
+    assert len(out.read_text().splitlines()) == 3
+
+    # 0 means one worker per CPU, as for ml-train/ml-evaluate --jobs.
+    assert cohort.run_cohort(cohort.learner_tasks(db.db_path, [2, 1, 7]), workers=0) == records
+
+
+def test_cohort_run_reads_learner_files_without_migrating(tmp_path, monkeypatch):
+    from src.db import database
+
+    _make_sample_db(str(tmp_path / "current.sqlite"))
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS[:4])
+    old = DatabaseManager(db_path=str(tmp_path / "old.sqlite"))
+    old.migrate()
+    monkeypatch.undo()
+    # Learner files that use a rollback journal must keep it.
+    for name in ("current", "old"):
+        conn = sqlite3.connect(tmp_path / f"{name}.sqlite")
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+    records = cohort.run_cohort(cohort.file_tasks(tmp_path) + [(str(tmp_path / "missing.sqlite"), None)], workers=1)
+    by_name = {r["learner"]: r for r in records}
+    assert by_name["current"]["status"] == "ok"
+    assert by_name["old"]["status"] == "error"
+    assert "schema version 4" in by_name["old"]["error"]
+    assert old.schema_version() == 4
+    assert by_name["missing"]["status"] == "error"
+    assert not (tmp_path / "missing.sqlite").exists()
+    assert not list(tmp_path.glob("*.sqlite-wal")) and not list(tmp_path.glob("*.sqlite-shm"))
+    conn = sqlite3.connect(tmp_path / "current.sqlite")
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    conn.close()
@@ -1,3 +1,4 @@
+import json
 import subprocess
 import os
 import tempfile
@@ -36,6 +37,11 @@ def test_full_cli_flow():
         )
         assert "Added session" in r.stdout
 
+        r = run_cmd("python -m src.cli.main add-session 99 2026-02-11 --duration 60 --focus 4", env)
+        assert r.returncode == 1
+        assert "No subject found with id=99" in r.stdout
+        assert "Traceback" not in r.stderr
+
         r = run_cmd("python -m src.cli.main list-sessions", env)
         assert "2026-02-11" in r.stdout
 
@@ -44,3 +50,61 @@ def test_full_cli_flow():
 
         r = run_cmd("python -m src.cli.main delete-session 1", env)
         assert "Deleted" in r.stdout
+
+
+def test_import_sessions_cli():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "test.db")
+        env = os.environ.copy()
+        env["DB_PATH"] = db_path
+
+        run_cmd("python -m src.cli.main init", env)
+        run_cmd("python -m src.cli.main add-subject Math", env)
+
+        csv_path = os.path.join(tmp, "sessions.csv")
+        with open(csv_path, "w", encoding="utf-8") as f:
+            f.write("subject_id,date,start_time,duration_minutes,focus_level,test_score,notes\n")
+            f.write("1,2026-02-11,18:30,60,4,80,\n")
+            f.write("1,2026-02-12,,45,3,,review\n")
+
+        jsonl_path = os.path.join(tmp, "sessions.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            f.write('{"subject_id": 1, "date": "2026-02-13", "duration_minutes": 30, "focus_level": 5}\n')
+
+        r = run_cmd(f"python -m src.cli.main import-sessions {csv_path}", env)
+        assert "Imported 2 sessions" in r.stdout
+
+        r = run_cmd(f"python -m src.cli.main import-sessions {jsonl_path} --chunk-size 1", env)
+        assert "Imported 1 sessions" in r.stdout
+
+        r = run_cmd("python -m src.cli.main list-sessions --all", env)
+        assert "2026-02-13" in r.stdout
+
+        r = run_cmd("python -m src.cli.main list-sessions --after 2", env)
+        assert "2026-02-13" in r.stdout
+        assert "2026-02-11" not in r.stdout
+
+
+def test_cohort_run_cli():
+    with tempfile.TemporaryDirectory() as tmp:
+        learners = os.path.join(tmp, "learners")
+        os.mkdir(learners)
+        for name, duration in (("alice", 30), ("bob", 45)):
+            env = os.environ.copy()
+            env["DB_PATH"] = os.path.join(learners, f"{name}.sqlite")
+            run_cmd("python -m src.cli.main add-subject Math", env)
+            run_cmd(f"python -m src.cli.main add-session 1 2026-02-11 --duration {duration} --focus 4", env)
+        with open(os.path.join(learners, "broken.sqlite"), "w", encoding="utf-8") as f:
+            f.write("not a database")
+
+        env = os.environ.copy()
+        env["DB_PATH"] = os.path.join(tmp, "main.db")
+        out = os.path.join(tmp, "cohort.jsonl")
+        r = run_cmd(f"python -m src.cli.main cohort-run --dir {learners} --out {out} --workers 2 --chunk-size 1", env)
+        assert r.returncode == 1
+        assert "3/3 learners" in r.stderr
+        with open(out, encoding="utf-8") as f:
+            records = {rec["learner"]: rec for rec in map(json.loads, f)}
+        assert records["broken"]["status"] == "error"
+        assert records["alice"]["insights"]["total_minutes"] == 30
+        assert records["bob"]["subject_stats"]["Math"]["sessions"] == 1
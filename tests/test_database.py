@@ -1,9 +1,15 @@
 import os
+import sqlite3
 import tempfile
+import threading
 
+import pytest
+
+from src.db import database
 from src.db.database import DatabaseManager
 from src.models.session import SessionRecord
 
+
 def create_test_db():
     temp = tempfile.NamedTemporaryFile(delete=False)
     temp.close()
@@ -11,11 +17,13 @@ def create_test_db():
     db.migrate()
     return db, temp.name
 
+
 def test_database_init():
     db, path = create_test_db()
     assert os.path.exists(path)
     os.remove(path)
 
+
 def test_add_subject():
     db, path = create_test_db()
     subject_id = db.add_subject("Math")
@@ -26,6 +34,7 @@ def test_add_subject():
     assert subjects[0].name == "Math"
     os.remove(path)
 
+
 def test_add_session():
     db, path = create_test_db()
     db.add_subject("Physics")
@@ -54,6 +63,7 @@ def test_add_session():
     assert s.focus_level == 4
     os.remove(path)
 
+
 def test_get_single_session():
     db, path = create_test_db()
     db.add_subject("AI")
@@ -72,6 +82,7 @@ def test_get_single_session():
     assert loaded.focus_level == 5
     os.remove(path)
 
+
 def test_delete_subject():
     db, path = create_test_db()
 
@@ -86,6 +97,7 @@ def test_delete_subject():
 
     os.remove(path)
 
+
 def test_delete_session():
     db, path = create_test_db()
 
@@ -107,4 +119,378 @@ def test_delete_session():
     loaded = db.get_session(sid)
     assert loaded is None
 
-    os.remove(path)
\ No newline at end of file
+    os.remove(path)
+
+
+def test_pooled_connections_are_reused():
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    with DatabaseManager(db_path=temp.name, pool_size=2) as db:
+        db.migrate()
+        with db.connection() as first:
+            pass
+        with db.connection() as second:
+            pass
+        assert first is second
+
+        db.add_subject("Math")
+        assert len(db.get_subjects()) == 1
+    os.remove(temp.name)
+
+
+def test_pooled_connection_rolls_back_on_error():
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    with DatabaseManager(db_path=temp.name, pool_size=1) as db:
+        db.migrate()
+        try:
+            with db.connection() as conn:
+                conn.execute("INSERT INTO subjects (name) VALUES ('Ghost')")
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+        assert db.get_subjects() == []
+        with db.connection() as again:
+            assert again is conn
+    os.remove(temp.name)
+
+
+def test_close_releases_pooled_connections():
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    db = DatabaseManager(db_path=temp.name, pool_size=1)
+    db.migrate()
+    with db.connection() as conn:
+        pass
+    db.close()
+    try:
+        conn.execute("SELECT 1")
+        assert False, "Expected pooled connection to be closed"
+    except sqlite3.ProgrammingError:
+        pass
+    os.remove(temp.name)
+
+
+def test_add_sessions_bulk():
+    db, path = create_test_db()
+    db.add_subject("Math")
+
+    records = [
+        SessionRecord(subject_id=1, date="2026-02-11", duration_minutes=30 + i, focus_level=3)
+        for i in range(5)
+    ]
+    records.append({"subject_id": "1", "date": "2026-02-12", "duration_minutes": "45",
+                    "focus_level": "4", "test_score": "", "start_time": "09:30"})
+
+    ids = db.add_sessions(records, chunk_size=2)
+    assert ids == [1, 2, 3, 4, 5, 6]
+
+    loaded = db.get_session(6)
+    assert loaded.start_time == "09:30"
+    assert loaded.test_score is None
+    assert db.get_session(3).duration_minutes == 32
+    os.remove(path)
+
+
+def test_add_sessions_rolls_back_failing_chunk():
+    db, path = create_test_db()
+    db.add_subject("Math")
+
+    records = [
+        {"subject_id": 1, "date": "2026-02-11", "duration_minutes": 30, "focus_level": 3},
+        {"subject_id": 1, "date": "2026-02-11", "duration_minutes": 30, "focus_level": 3},
+        {"subject_id": 1, "date": "2026-02-11", "duration_minutes": 30, "focus_level": 9},
+    ]
+    try:
+        db.add_sessions(records, chunk_size=2)
+        assert False, "Expected ValueError for invalid focus_level"
+    except ValueError:
+        pass
+    assert len(db.list_sessions(limit=10)) == 2
+    os.remove(path)
+
+
+def test_profiles_set_wal_and_synchronous():
+    db, path = create_test_db()
+    with db.connection() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+
+    durable = DatabaseManager(db_path=path, profile="durable")
+    with durable.connection() as conn:
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+
+    try:
+        DatabaseManager(db_path=path, profile="reckless")
+        assert False, "Expected ValueError for unknown profile"
+    except ValueError:
+        pass
+    os.remove(path)
+
+
+def test_readers_continue_during_long_write_batch():
+    db, path = create_test_db()
+    db.add_subject("Math")
+    writing = threading.Event()
+    reader_done = threading.Event()
+    errors = []
+
+    def writer():
+        try:
+            with db.connection() as conn:
+                # A tiny page cache forces the batch to spill to disk mid-transaction,
+                # which takes an exclusive lock under the rollback journal.
+                conn.execute("PRAGMA cache_size = 10")
+                conn.executemany(
+                    "INSERT INTO learning_sessions (subject_id, start_timestamp, duration_minutes, focus_level) "
+                    "VALUES (1, '2026-02-11 09:00:00', ?, 3)",
+                    ((i % 120 + 1,) for i in range(20000)),
+                )
+                writing.set()
+                reader_done.wait(timeout=10)
+                conn.commit()
+        except Exception as e:
+            errors.append(e)
+            writing.set()
+
+    t = threading.Thread(target=writer)
+    t.start()
+    writing.wait(timeout=10)
+
+    reader = DatabaseManager(db_path=path)
+    with reader.connection() as conn:
+        conn.execute("PRAGMA busy_timeout = 0")
+        before = conn.execute("SELECT COUNT(*) FROM learning_sessions").fetchone()[0]
+    reader_done.set()
+    t.join()
+
+    assert not errors
+    assert before == 0
+    assert len(db.list_sessions(limit=30000)) == 20000
+    os.remove(path)
+
+
+def test_migrate_sets_user_version_and_indexes():
+    db, path = create_test_db()
+    db.migrate()
+    with db.connection() as conn:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        indexes = {row["name"] for row in conn.execute("PRAGMA index_list(learning_sessions)")}
+    assert version >= 1
+    assert {"idx_session_subject_start", "idx_session_subject_metrics"} <= indexes
+    os.remove(path)
+
+
+def test_explain_has_no_unexpected_full_scans():
+    db, path = create_test_db()
+    report = db.explain()
+    assert {entry["query"] for entry in report} >= {
+        "get_session", "list_sessions_for_subject", "add_session", "add_subject",
+        "subject_stats_filtered", "daily_rollups_filtered", "longest_streak",
+    }
+    for entry in report:
+        assert entry["plan"]
+        assert not entry["full_scan"] or entry["scan_expected"], entry
+    assert {entry["query"]: entry["full_scan"] for entry in report}["learner_ids"]
+    assert database.is_full_scan("SCAN subjects USING COVERING INDEX sqlite_autoindex_subjects_1")
+    assert not database.is_full_scan("SEARCH ls USING COVERING INDEX idx_session_learner_metrics (learner_id=?)")
+    os.remove(path)
+
+
+def test_migrate_is_noop_when_current():
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    with DatabaseManager(db_path=temp.name, pool_size=1) as db:
+        latest = db.migrate()
+        assert latest == database.MIGRATIONS[-1][0]
+
+        statements = []
+        with db.connection() as conn:
+            conn.set_trace_callback(statements.append)
+        assert db.migrate() == latest
+        assert statements == ["PRAGMA user_version"]
+    os.remove(temp.name)
+
+
+def test_failed_migration_step_keeps_previous_version(monkeypatch):
+    db, path = create_test_db()
+    latest = db.schema_version()
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise sqlite3.OperationalError("step failed")
+
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS + [(latest + 1, broken)])
+    try:
+        db.migrate()
+        assert False, "Expected the broken step to raise"
+    except sqlite3.OperationalError:
+        pass
+    assert db.schema_version() == latest
+    with db.connection() as conn:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'").fetchone() is None
+
+    monkeypatch.setattr(database, "MIGRATIONS", database.MIGRATIONS[:-1] + [
+        (latest + 1, "CREATE TABLE IF NOT EXISTS half_done (id INTEGER);"),
+    ])
+    assert db.migrate() == latest + 1
+    os.remove(path)
+
+
+def test_keyset_pagination_and_streaming():
+    db, path = create_test_db()
+    db.add_subject("Math")
+    db.add_sessions(
+        SessionRecord(subject_id=1, date="2026-02-11", duration_minutes=10 + i, focus_level=3)
+        for i in range(25)
+    )
+
+    page = db.list_sessions(limit=10)
+    assert [s.id for s in page] == list(range(1, 11))
+    page = db.list_sessions(limit=10, after_id=page[-1].id)
+    assert [s.id for s in page] == list(range(11, 21))
+
+    streamed = list(db.iter_sessions(after_id=5, batch_size=4))
+    assert [s.id for s in streamed] == list(range(6, 26))
+    os.remove(path)
+
+
+def test_load_session_batch():
+    db, path = create_test_db()
+    db.add_subject("Math")
+    db.add_sessions([
+        SessionRecord(subject_id=1, date="2026-02-11", start_time="18:30", duration_minutes=60, focus_level=4, test_score=80),
+        SessionRecord(subject_id=1, date="2026-02-12", duration_minutes=45, focus_level=3),
+    ])
+
+    batch = db.load_session_batch()
+    assert batch.ids.tolist() == [1, 2]
+    assert str(batch.starts[0]) == "2026-02-11T18:30:00"
+    assert batch.test_scores.mask.tolist() == [False, True]
+    assert len(db.load_session_batch(after_id=1)) == 1
+    os.remove(path)
+
+
+def test_session_batches_stream_and_insert():
+    db, path = create_test_db()
+    db.add_subject("Math")
+    db.add_subject("Art")
+    db.add_sessions([
+        SessionRecord(subject_id=1 + i % 2, date=f"2026-02-{i + 1:02d}", start_time="18:30",
+                      duration_minutes=30 + i, focus_level=1 + i % 5, test_score=None if i % 3 else 50 + i)
+        for i in range(7)
+    ])
+    batches = list(db.iter_session_batches(after_id=1, batch_size=3))
+    assert [len(batch) for batch in batches] == [3, 3]
+
+    copy, copy_path = create_test_db()
+    copy.add_subject("Math")
+    copy.add_subject("Art")
+    ids = []
+    for batch in batches:
+        ids.extend(copy.add_sessions(batch, chunk_size=2))
+    assert ids == list(range(1, 7))
+    assert [s.to_tuple() for s in copy.iter_sessions()] == [s.to_tuple() for s in db.iter_sessions(after_id=1)]
+    with pytest.raises(ValueError):
+        list(db.iter_session_batches(batch_size=0))
+    os.remove(path)
+    os.remove(copy_path)
+
+
+def test_learners_partition_subjects_and_sessions():
+    db, path = create_test_db()
+    math_1 = db.add_subject("Math")
+    math_2 = db.add_subject("Math", learner_id=2)
+    db.add_session(SessionRecord(subject_id=math_2, date="2026-02-01", duration_minutes=30, focus_level=3))
+    session_id = db.add_session(SessionRecord(subject_id=math_2, date="2026-02-02", duration_minutes=30, focus_level=3))
+
+    assert db.learner_ids() == [1, 2]
+    assert [s.id for s in db.get_subjects(learner_id=2)] == [math_2]
+    assert db.get_subject(math_2).learner_id == 2
+    with db.connection() as conn:
+        learners = [row[0] for row in conn.execute("SELECT learner_id FROM learning_sessions ORDER BY id")]
+    assert learners == [2, 2]
+
+    moved = db.get_session(session_id)
+    moved.subject_id = math_1
+    db.update_session(moved)
+    with db.connection() as conn:
+        assert conn.execute("SELECT learner_id FROM learning_sessions WHERE id = ?", (session_id,)).fetchone()[0] == 1
+    os.remove(path)
+
+
+def test_learner_migration_keeps_existing_data(monkeypatch):
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    db = DatabaseManager(db_path=temp.name)
+    monkeypatch.setattr(database, "MIGRATIONS", [m for m in database.MIGRATIONS if m[0] < 5])
+    db.migrate()
+    with db.connection() as conn:
+        conn.execute("INSERT INTO subjects (name) VALUES ('Math'), ('Art')")
+        conn.execute("DELETE FROM subjects WHERE name = 'Art'")
+        conn.execute(
+            "INSERT INTO learning_sessions (subject_id, start_timestamp, duration_minutes, focus_level) "
+            "VALUES (1, '2026-02-01 09:00:00', 30, 3)"
+        )
+        conn.commit()
+    monkeypatch.undo()
+
+    assert db.migrate() == database.MIGRATIONS[-1][0]
+    assert [(s.id, s.name, s.learner_id) for s in db.get_subjects()] == [(1, "Math", 1)]
+    assert db.get_session(1).subject_id == 1
+    # AUTOINCREMENT does not hand out the deleted id again.
+    assert db.add_subject("Music") == 3
+    version = db.data_version()
+    db.update_subject(1, "Maths")
+    assert db.data_version() > version
+    os.remove(temp.name)
+
+
+def test_orphaned_sessions_quarantined_on_migrate(monkeypatch, caplog):
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    db = DatabaseManager(db_path=temp.name)
+    monkeypatch.setattr(database, "MIGRATIONS", [m for m in database.MIGRATIONS if m[0] < 7])
+    db.migrate()
+    db.add_subject("Math")
+    db.add_subject("Art")
+    db.add_session(SessionRecord(subject_id=1, date="2026-02-01", duration_minutes=30, focus_level=3))
+    db.add_session(SessionRecord(subject_id=2, date="2026-02-02", duration_minutes=60, focus_level=4))
+    with db.connection() as conn:
+        # How subjects were deleted before foreign keys were enabled.
+        conn.execute("PRAGMA foreign_keys = OFF")
+        conn.execute("DELETE FROM subjects WHERE id = 2")
+        conn.commit()
+        conn.execute("PRAGMA foreign_keys = ON")
+    monkeypatch.undo()
+
+    with caplog.at_level("WARNING", logger="src.db.database"):
+        assert db.migrate() == database.MIGRATIONS[-1][0]
+    assert "Moved 1 sessions" in caplog.text
+    assert [s.subject_id for s in db.iter_sessions()] == [1]
+    with db.connection() as conn:
+        assert tuple(conn.execute("SELECT sessions, minutes FROM session_totals").fetchone()) == (1, 30)
+        orphans = conn.execute("SELECT id, subject_id, duration_minutes FROM orphaned_sessions").fetchall()
+        assert [tuple(row) for row in orphans] == [(2, 2, 60)]
+    os.remove(temp.name)
+
+
+def test_migrations_rerun_on_current_schema():
+    temp = tempfile.NamedTemporaryFile(delete=False)
+    temp.close()
+    db = DatabaseManager(db_path=temp.name)
+    db.migrate()
+    db.add_subject("Math", learner_id=2)
+    db.add_session(SessionRecord(subject_id=1, date="2026-02-01", duration_minutes=30, focus_level=3))
+    with db.connection() as conn:
+        # A database whose user_version was lost, e.g. restored from a dump.
+        conn.execute("PRAGMA user_version = 0")
+        conn.commit()
+
+    assert db.migrate() == database.MIGRATIONS[-1][0]
+    assert [(s.id, s.learner_id) for s in db.get_subjects()] == [(1, 2)]
+    assert [s.subject_id for s in db.iter_sessions()] == [1]
+    with db.connection() as conn:
+        assert [tuple(r) for r in conn.execute("SELECT learner_id FROM learning_sessions")] == [(2,)]
+        assert tuple(conn.execute("SELECT sessions, minutes FROM session_totals").fetchone()) == (1, 30)
+    os.remove(temp.name)
@@ -48,4 +48,19 @@ def test_focus_trend_empty_and_single(tmp_path):
     db2.add_session(s)
     df2 = analytics.df_from_db(db_path=str(db2_file))
     trend2 = analytics.focus_trend(df2)
-    assert not trend2.empty
\ No newline at end of file
+    assert not trend2.empty
+
+def test_compute_insights_matches_individual_metrics(tmp_path):
+    db_file = tmp_path / "insights_all.sqlite"
+    _make_sample_db(str(db_file))
+    df = analytics.df_from_db(db_path=str(db_file))
+
+    insights = analytics.compute_insights(df)
+    summary = analytics.compute_overall_summary(df)
+    for key in ("total_sessions", "total_minutes", "avg_focus", "avg_score"):
+        assert insights[key] == summary[key]
+    assert insights["sessions_per_subject"].equals(summary["sessions_per_subject"])
+    assert insights["best_hour"] == analytics.best_hour(df)
+    assert insights["weakest_subject"] == analytics.weakest_subject(df)
+    assert insights["most_productive_subject"] == analytics.most_productive_subject(df)
+    assert insights["productivity_index"] == analytics.productivity_index(df)
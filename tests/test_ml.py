@@ -0,0 +1,222 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import cross_val_score
+
+from src.ml import train
+
+
+def _data(n=120):
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({"focus_level": rng.integers(1, 6, n), "duration_minutes": rng.integers(10, 120, n)})
+    y = X["focus_level"] * 12 + X["duration_minutes"] * 0.2 + rng.normal(0, 3, n)
+    return X, y
+
+
+def test_cross_validate_model_matches_separate_passes():
+    X, y = _data()
+    model_obj = train.LinearModel()
+    metrics = train.cross_validate_model(model_obj, X, y, cv_folds=4)
+    r2 = cross_val_score(model_obj.model, X, y, cv=4, scoring="r2")
+    rmse = np.sqrt(-cross_val_score(model_obj.model, X, y, cv=4, scoring="neg_mean_squared_error"))
+    assert metrics["r2_mean"] == np.float64(r2.mean())
+    assert np.isclose(metrics["rmse_std"], rmse.std())
+
+
+def test_parallel_training_and_cv_match_sequential():
+    X, y = _data()
+    sequential = train.train_all_models(X, y, jobs=1)
+    parallel = train.train_all_models(X, y, jobs=3)
+    assert list(parallel) == list(train.MODEL_CLASSES)
+    for name, model_obj in parallel.items():
+        assert model_obj.is_trained
+        np.testing.assert_allclose(model_obj.predict(X), sequential[name].predict(X))
+    assert parallel["RandomForest"].model.n_jobs == -1
+
+    cv_sequential = train.cross_validate_all_models(X, y, cv_folds=3, jobs=1)
+    cv_parallel = train.cross_validate_all_models(X, y, cv_folds=3, jobs=0)
+    assert cv_parallel == cv_sequential
+
+
+def test_random_forest_small_batch_uses_sklearn_predict():
+    X, y = _data()
+    model_obj = train.RandomForestModel()
+    model_obj.train(X, y)
+    n_jobs = model_obj.model.n_jobs
+    assert np.array_equal(model_obj.predict(X.head(3)), model_obj.model.predict(X.head(3)))
+    assert model_obj.model.n_jobs == n_jobs
+    with pytest.raises(ValueError):
+        model_obj.predict(X.rename(columns={"focus_level": "focus"}).head(3))
+
+
+def test_pipeline_artifact_round_trip(tmp_path, monkeypatch):
+    from src.ml import pipeline, predict, preprocessing
+
+    X, y = _data()
+    X_train, X_test, scaler = preprocessing.scale_features(X, X)
+    models = train.train_all_models(X_train, y, jobs=1)
+    cleaner = preprocessing.cleaner_params(X)
+    pipelines = {name: pipeline.InferencePipeline(m, scaler, cleaner) for name, m in models.items()}
+    predict.save_all_models(pipelines, tmp_path)
+
+    loaded = predict.load_all_pipelines(list(pipelines), tmp_path)
+    frame = X.assign(notes="x")
+    frame.loc[0, "focus_level"] = None
+    expected = X.copy()
+    expected.loc[0, "focus_level"] = cleaner["fill"]["focus_level"]
+    np.testing.assert_allclose(
+        loaded["LinearRegression"].predict(frame), models["LinearRegression"].predict(scaler.transform(expected))
+    )
+
+    calls = []
+    transform = pipeline.InferencePipeline.transform
+    monkeypatch.setattr(pipeline.InferencePipeline, "transform", lambda self, df: calls.append(1) or transform(self, df))
+    averaged = predict.ensemble_predict(loaded, frame)
+    assert len(calls) == 1
+    np.testing.assert_allclose(averaged, np.mean([p.predict_transformed(p.transform(frame)) for p in loaded.values()], axis=0))
+
+    predict.save_model(models["RandomForest"], "Legacy", tmp_path)
+    with pytest.raises(ValueError, match="retrain"):
+        predict.load_pipeline("Legacy", tmp_path)
+
+
+def test_registry_index_and_load_cache(tmp_path, monkeypatch):
+    from src.ml import registry
+
+    X, y = _data()
+    models = train.train_all_models(X, y, jobs=1)
+    reg = registry.ModelRegistry(tmp_path, cache_size=1)
+    fingerprint = registry.data_fingerprint(X, y)
+    reg.save("RandomForest", models["RandomForest"], {"r2": 0.5}, fingerprint)
+    reg.save("Ridge", models["LinearRegression"])
+    (tmp_path / "Old.pkl").write_bytes(b"not a pickle")
+
+    # Listing never unpickles, so the unindexed legacy file is harmless.
+    monkeypatch.setattr(registry.joblib, "load", None)
+    entries = registry.ModelRegistry(tmp_path).entries()
+    assert list(entries) == ["Old", "RandomForest", "Ridge"]
+    assert entries["RandomForest"]["metrics"] == {"r2": 0.5}
+    assert entries["RandomForest"]["data_fingerprint"] == fingerprint != registry.data_fingerprint(X, y + 1)
+    assert entries["RandomForest"]["size_bytes"] == (tmp_path / "RandomForest.pkl").stat().st_size
+    assert "version" not in entries["Old"]
+    monkeypatch.undo()
+
+    forest = reg.load("RandomForest")
+    np.testing.assert_allclose(forest.predict(X), models["RandomForest"].predict(X))
+    assert reg.load("RandomForest") is forest
+    reg.load("Ridge")
+    assert reg.load("RandomForest") is not forest  # evicted by the cache limit
+    forest = reg.load("RandomForest")
+
+    reg.save("RandomForest", models["GradientBoosting"])
+    assert reg.info("RandomForest")["version"] == 2
+    assert reg.load("RandomForest") is not forest
+    assert reg.delete("Ridge") and "Ridge" not in reg.entries()
+    assert not reg.delete("Ridge")
+
+    # Saving over a file replaces it instead of rewriting arrays that an
+    # already loaded, memory-mapped object still reads.
+    reg.save("Scaler", {"mean_": np.arange(4096, dtype="float64")})
+    mapped = reg.load("Scaler")["mean_"]
+    assert isinstance(mapped, np.memmap)
+    reg.save("Scaler", {"mean_": np.full(16, -1.0)})
+    np.testing.assert_array_equal(mapped, np.arange(4096, dtype="float64"))
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_micro_batcher_merges_concurrent_requests():
+    import asyncio
+    from src.ml.server import MicroBatcher
+
+    calls = []
+
+    def predict_fn(df):
+        calls.append(len(df))
+        if (df["focus_level"] < 0).any():
+            raise ValueError("bad row")
+        return df["focus_level"] * 10
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_rows=5)
+        requests = [np.array([[i, 0.0]] * (1 + i % 2)) for i in range(6)]
+        results = await asyncio.gather(*(batcher.predict(X) for X in requests))
+        assert results == [[i * 10.0] * (1 + i % 2) for i in range(6)]
+        with pytest.raises(ValueError, match="bad row"):
+            await batcher.predict(np.array([[-1.0, 0.0]]))
+        batcher.close()
+
+    asyncio.run(run())
+    # The 9 rows go out in batches of at most 5 without splitting a request,
+    # then the failing request on its own.
+    assert calls == [4, 5, 1]
+
+
+def test_micro_batcher_predicts_off_the_event_loop():
+    import asyncio
+    import threading
+    from src.ml.server import MicroBatcher
+
+    started, release, calls = threading.Event(), threading.Event(), []
+
+    def predict_fn(df):
+        calls.append(len(df))
+        started.set()
+        if not release.wait(5):
+            raise TimeoutError("the event loop was blocked")
+        return df["focus_level"]
+
+    async def run():
+        batcher = MicroBatcher(predict_fn)
+        first = asyncio.ensure_future(batcher.predict(np.array([[1.0, 0.0]])))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # The first batch is still predicting; these queue up meanwhile.
+        later = [asyncio.ensure_future(batcher.predict(np.array([[i, 0.0]]))) for i in (2.0, 3.0)]
+        await asyncio.sleep(0)
+        release.set()
+        assert await first == [1.0]
+        assert await asyncio.gather(*later) == [[2.0], [3.0]]
+        batcher.close()
+
+    asyncio.run(run())
+    assert calls == [1, 2]
+
+
+def test_prediction_server_round_trip(tmp_path):
+    import asyncio
+    import threading
+    from src.ml import client, pipeline, predict, preprocessing, server
+
+    X, y = _data()
+    X_train, _, scaler = preprocessing.scale_features(X, X)
+    models = train.train_all_models(X_train, y, jobs=1)
+    cleaner = preprocessing.cleaner_params(X)
+    model_dir = tmp_path / "models"
+    for name, m in models.items():
+        predict.save_model(pipeline.InferencePipeline(m, scaler, cleaner), name, model_dir)
+
+    address = str(tmp_path / "predict.sock")
+    started = threading.Event()
+    listeners = []
+
+    def ready(listener):
+        listeners.append((listener, asyncio.get_running_loop()))
+        started.set()
+
+    thread = threading.Thread(target=server.serve, args=(address, model_dir), kwargs={"ready": ready})
+    thread.start()
+    assert started.wait(30)
+    try:
+        rows = X.head(3).to_dict("records")
+        with client.PredictionClient(address) as c:
+            np.testing.assert_allclose(c.predict(rows), models["RandomForest"].predict(X_train.head(3)))
+            assert len(c.predict(rows, "ensemble")) == 3
+            assert c.predict([{}], "GradientBoosting")  # missing features are filled
+            with pytest.raises(ValueError, match="not served"):
+                c.predict(rows, "LinearRegression")
+            assert c.predict([]) == []
+    finally:
+        listener, loop = listeners[0]
+        loop.call_soon_threadsafe(listener.close)
+        thread.join(30)
+    assert not thread.is_alive()
+    assert not (tmp_path / "predict.sock").exists()
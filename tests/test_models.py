@@ -1,5 +1,6 @@
 from src.models.subject import Subject
 from src.models.session import SessionRecord
+from src.models.session_batch import SessionBatch
 
 
 def test_subject_creation():
@@ -61,3 +62,47 @@ def test_session_repr():
     assert "2026-02-12" in r
     assert "30" in r
     assert "3" in r
+
+
+def test_trusted_row_matches_validated_row():
+    row = {
+        "id": 7,
+        "subject_id": 2,
+        "start_timestamp": "2026-02-12 18:30:00",
+        "duration_minutes": 45,
+        "focus_level": 4,
+        "test_score": None,
+        "notes": "review",
+    }
+
+    assert SessionRecord.from_trusted_row(row) == SessionRecord.from_row(row)
+
+
+def test_models_are_slotted():
+    session = SessionRecord(subject_id=1, date="2026-02-12", duration_minutes=30, focus_level=3)
+
+    assert not hasattr(session, "__dict__")
+    assert not hasattr(Subject(name="Math"), "__dict__")
+
+
+def test_session_batch_columns_and_pandas_view():
+    import sqlite3
+    import numpy as np
+
+    conn = sqlite3.connect(":memory:")
+    cur = conn.execute(
+        "SELECT 1, 2, 1770834600, 60, 4, 80 UNION ALL SELECT 2, 3, 1770921000, 45, 3, -1"
+    )
+    batch = SessionBatch.from_cursor(cur, chunk_size=1)
+
+    assert len(batch) == 2
+    assert batch.subject_ids.dtype == np.int32
+    assert batch.durations.dtype == np.int16
+    assert batch.focus_levels.dtype == np.int8
+    assert batch.test_scores.mask.tolist() == [False, True]
+    assert str(batch.starts[0]) == "2026-02-11T18:30:00"
+
+    df = batch.to_pandas()
+    assert np.shares_memory(df["duration_minutes"].to_numpy(), batch.durations)
+    assert df["test_score"].isna().tolist() == [False, True]
+    assert SessionBatch.empty().to_pandas().empty
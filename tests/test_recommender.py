@@ -1,5 +1,6 @@
 import pytest
-from src.recommender.recommender import RecommendationEngine, Recommendation
+import pandas as pd
+from src.recommender.recommender import RecommendationEngine, Recommendation, cohort_recommendations
 from src.db.database import DatabaseManager
 from src.models.subject import Subject
 from src.models.session import SessionRecord
@@ -114,3 +115,114 @@ def test_empty_no_crash(tmp_path):
     text = engine.get_text_advice()
     assert isinstance(text, str)
     assert len(text) > 0
+
+
+def test_cohort_recommendations_match_single_learner(engine_with_data, test_db_path):
+    db = DatabaseManager(db_path=test_db_path)
+    other = db.add_subject("Math", learner_id=2)
+    db.add_session(SessionRecord(subject_id=other, date="2026-02-01", duration_minutes=30, focus_level=2, test_score=40))
+    db.add_session(SessionRecord(subject_id=other, date="2026-02-02", duration_minutes=30, focus_level=2, test_score=45))
+
+    results = cohort_recommendations(db=db, learner_ids=[1, 2, 3])
+    assert results[3] == []
+    for learner_id in (1, 2):
+        expected = RecommendationEngine(db_path=test_db_path, learner_ids=[learner_id]).analyze()
+        assert results[learner_id] == expected
+    assert any(r.title == "Boost Math" for r in results[2])
+
+
+def test_analysis_and_context_are_computed_once(engine_with_data, monkeypatch):
+    from src.recommender import recommender
+
+    calls = []
+    original_features = recommender.rules.feature_tables
+    original_evaluate = recommender.rules.evaluate
+    monkeypatch.setattr(recommender.rules, "feature_tables", lambda *a, **k: calls.append("features") or original_features(*a, **k))
+    monkeypatch.setattr(recommender.rules, "evaluate", lambda *a, **k: calls.append("rules") or original_evaluate(*a, **k))
+
+    first = engine_with_data.analyze()
+    dashboard = engine_with_data.get_dashboard()
+    engine_with_data.generate_daily_plan()
+    engine_with_data.generate_weekly_plan()
+    assert engine_with_data.analyze() == first
+    # The dashboard reads the same feature tables the rules were evaluated on.
+    assert calls == ["features", "rules"]
+    assert dashboard["metrics"]["study_consistency"] == engine_with_data.df["date"].nunique()
+
+    engine_with_data.df = engine_with_data.df[engine_with_data.df["subject_name"] == "History"]
+    assert engine_with_data.analyze() != first
+    engine_with_data.get_dashboard()
+    assert calls == ["features", "rules", "features", "rules"]
+
+
+def test_rules_evaluate_many_learners_in_one_pass():
+    from src.recommender import rules
+
+    base = pd.Timestamp("2026-03-01 09:00")
+    rows = []
+    for learner_id, focus, score in ((1, 2, 40), (2, 4, 90), (3, 3, 55)):
+        for i in range(4):
+            rows.append({
+                "learner_id": learner_id,
+                "subject_name": "Math",
+                "start_timestamp": base + pd.Timedelta(days=i),
+                "duration_minutes": 40,
+                "focus_level": focus,
+                "test_score": float(score),
+            })
+    df = pd.DataFrame(rows)
+    df["date"] = df["start_timestamp"].dt.date
+
+    results = rules.evaluate(df)
+    assert [r.title for r in results[1]] == ["Low Focus Detected", "Boost Math"]
+    assert results[2] == []
+    assert [r.title for r in results[3]] == ["Boost Math"]
+    assert results[3][0].advice.startswith("Your score in Math is low (55%)")
+
+    strict = rules.RULES + [
+        rules.Rule("long_sessions", "learner", lambda f: f["recent_duration"] >= 40, "schedule", "Long Sessions", "Split them up.", 3),
+    ]
+    assert [r.title for r in rules.evaluate(df, rules=strict)[2]] == ["Long Sessions"]
+    assert list(rules.evaluate(df, by=None)) == [1]
+
+
+def _planner_frame():
+    rows = []
+    # Learner 1 focuses best at 07:00, is weak at Math and has not touched Art for weeks.
+    for day, hour, subject, focus, score in (
+        (20, 7, "Math", 5, 40.0), (21, 7, "Math", 5, 45.0), (21, 13, "History", 3, 90.0),
+        (22, 16, "History", 2, 85.0), (2, 16, "Art", 2, None),
+    ):
+        rows.append({
+            "learner_id": 1, "subject_name": subject, "focus_level": focus, "test_score": score,
+            "start_timestamp": pd.Timestamp(f"2026-03-{day:02d} {hour:02d}:00"), "duration_minutes": 40,
+        })
+    rows.append({
+        "learner_id": 2, "subject_name": "Chemistry", "focus_level": 1, "test_score": 30.0,
+        "start_timestamp": pd.Timestamp("2026-03-22 10:00"), "duration_minutes": 20,
+    })
+    return pd.DataFrame(rows)
+
+
+def test_planner_allocates_weak_and_stale_subjects_to_best_hours():
+    from src.recommender import planner
+
+    df = _planner_frame()
+    priorities = planner.subject_priorities(df, start="2026-03-23").loc[1]
+    assert priorities.loc["Art", "days_since"] == 21
+    assert priorities["weight"].idxmax() in ("Math", "Art")
+
+    day = planner.plan(df[df["learner_id"] == 1], start="2026-03-23")[0]
+    assert day["date"] == "2026-03-23"
+    assert day["total_time"] == planner.DAILY_CAP
+    # The stale, unscored subject gets the best-focus hour; History is strong and recent.
+    assert [(s["time"], s["subject"]) for s in day["sessions"]] == [("07:00", "Art"), ("13:00", "Math"), ("16:00", "Art")]
+
+    week = planner.plan_cohort(df, start="2026-03-23", days=7, daily_cap=80)
+    assert all(d["total_time"] <= 80 for d in week[1])
+    summary = planner.weekly_summary(week[1])
+    assert {e["subject"] for e in summary} == {"Math", "Art", "History"}
+    assert summary[-1]["subject"] == "History"
+    # Low focus shortens sessions; one subject is capped at two sessions a day.
+    assert [(s["time"], s["duration"]) for s in week[2][0]["sessions"]] == [("09:00", 25), ("10:00", 25)]
+    assert planner.plan(df[df["learner_id"] == 2], start="2026-03-23") == week[2][:1]